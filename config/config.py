@@ -6,7 +6,242 @@ Carga y valida la configuración desde archivos .env
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, NamedTuple
+
+
+class ConfigSnapshot(NamedTuple):
+    """
+    Valores de configuración ya leídos y tipados.
+    Es inmutable: al recargar se sustituye entera por una nueva instancia,
+    de modo que el código en caliente (callbacks de audio) solo lee atributos.
+    """
+    whisper_model: str
+    whisper_language: str
+    whisper_use_gpu: bool
+    vad_sensitivity: int
+    vad_silence_duration: float
+    vad_min_speech_duration: float
+    vad_cascade: bool
+    vad_adaptive: bool
+    vad_noise_margin: float
+    vad_min_speech_ratio: float
+    vad_pre_roll: float
+    vad_hangover: float
+    max_utterance_duration: float
+    cut_search_window: float
+    llm_enabled: bool
+    openai_api_key: Optional[str]
+    openai_model: str
+    llm_provider: str
+    llm_base_url: Optional[str]
+    sample_rate: int
+    chunk_size: int
+    channels: int
+    audio_input_device: Optional[str]
+    output_dir: str
+    output_format: str
+    include_timestamp: bool
+    realtime_display: bool
+    debug_mode: bool
+    use_colors: bool
+    llm_prompt_cleanup: str
+    llm_prompt_summary: str
+    llm_prompt_tasks: str
+    llm_prompt_email: str
+    performance_profile: str
+    whisper_autotune: bool
+    whisper_tuning_cache: str
+    whisper_cpu_threads: Optional[int]
+    whisper_num_workers: Optional[int]
+    whisper_model_dir: str
+    whisper_offline: bool
+    language_detection_confidence: float
+    language_recheck_logprob: float
+    segment_no_speech_threshold: float
+    segment_logprob_threshold: float
+    transcription_cache: bool
+    transcription_cache_dir: str
+    transcription_cache_entries: int
+    transcription_cache_max_mb: float
+    transcription_pool_size: Optional[int]
+    web_threads: Optional[int]
+    whisper_max_concurrent: Optional[int]
+    whisper_max_queue: int
+    llm_max_concurrent: int
+    llm_max_queue: int
+    admission_queue_timeout: float
+    postprocess_timeout: float
+    llm_combined: bool
+    llm_cache: bool
+    llm_cache_path: str
+    llm_cache_entries: int
+    llm_cache_ttl_hours: float
+    llm_max_connections: int
+    llm_keepalive_expiry: float
+    llm_connect_timeout: float
+    llm_read_timeout: float
+    llm_max_retries: int
+    llm_prewarm: bool
+    llm_summary_chunk_tokens: int
+    llm_summary_workers: int
+    llm_deadline: float
+    llm_endpoints: tuple
+    llm_hedge: bool
+    speculative_postprocess: bool
+    speculative_fields: tuple
+    speculative_min_interval: float
+    speculative_token_budget: int
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+def _env_optional(name: str) -> Optional[str]:
+    value = os.getenv(name)
+    return value if value and value.strip() else None
+
+
+def _env_optional_int(name: str) -> Optional[int]:
+    value = _env_optional(name)
+    return int(value) if value is not None else None
+
+
+def _parse_llm_endpoints() -> tuple:
+    """
+    LLM_ENDPOINTS=nombre=url,nombre=url. La API key y el modelo de cada uno
+    se leen de LLM_API_KEY_<NOMBRE> y LLM_MODEL_<NOMBRE> (vacíos = los generales).
+    """
+    endpoints = []
+    for item in (os.getenv("LLM_ENDPOINTS") or "").split(","):
+        name, sep, url = item.strip().partition("=")
+        name = name.strip()
+        if not sep or not name or not url.strip():
+            continue
+        suffix = name.upper().replace("-", "_")
+        endpoints.append({
+            "name": name,
+            "base_url": url.strip(),
+            "api_key": _env_optional(f"LLM_API_KEY_{suffix}"),
+            "model": _env_optional(f"LLM_MODEL_{suffix}"),
+        })
+    return tuple(endpoints)
+
+
+# Reparto de CPU por perfil: hilos de Whisper (OpenMP), decodificaciones en
+# paralelo, tamaño del pool de transcripción e hilos HTTP
+PERFORMANCE_PROFILES = ["low-latency", "throughput", "low-memory"]
+
+
+def _profile_budget(profile: str, cores: int) -> Dict[str, int]:
+    if profile == "throughput":
+        workers = 2 if cores >= 4 else 1
+        return {
+            "cpu_threads": max(1, cores // workers),
+            "num_workers": workers,
+            "transcription_pool_size": workers,
+            "web_threads": 8,
+        }
+    if profile == "low-memory":
+        return {
+            "cpu_threads": max(1, min(4, cores // 2)),
+            "num_workers": 1,
+            "transcription_pool_size": 1,
+            "web_threads": 2,
+        }
+    # low-latency: una sola decodificación con casi todos los núcleos, dejando
+    # margen para el callback de audio, Flask y las llamadas al LLM
+    return {
+        "cpu_threads": max(1, cores - 2),
+        "num_workers": 1,
+        "transcription_pool_size": 1,
+        "web_threads": 4,
+    }
+
+
+def _read_snapshot() -> ConfigSnapshot:
+    """Lee y convierte una sola vez todas las variables de entorno"""
+    return ConfigSnapshot(
+        whisper_model=os.getenv("WHISPER_MODEL", "base"),
+        whisper_language=os.getenv("WHISPER_LANGUAGE", "es"),
+        whisper_use_gpu=_env_bool("WHISPER_USE_GPU", "true"),
+        vad_sensitivity=int(os.getenv("VAD_SENSITIVITY", "2")),
+        vad_silence_duration=float(os.getenv("VAD_SILENCE_DURATION", "1.0")),
+        vad_min_speech_duration=float(os.getenv("VAD_MIN_SPEECH_DURATION", "0.5")),
+        vad_cascade=_env_bool("VAD_CASCADE", "false"),
+        vad_adaptive=_env_bool("VAD_ADAPTIVE", "true"),
+        vad_noise_margin=float(os.getenv("VAD_NOISE_MARGIN", "3.0")),
+        vad_min_speech_ratio=float(os.getenv("VAD_MIN_SPEECH_RATIO", "0.3")),
+        vad_pre_roll=float(os.getenv("VAD_PRE_ROLL", "0.3")),
+        vad_hangover=float(os.getenv("VAD_HANGOVER", "0.2")),
+        max_utterance_duration=float(os.getenv("MAX_UTTERANCE_DURATION", "25.0")),
+        cut_search_window=float(os.getenv("CUT_SEARCH_WINDOW", "2.0")),
+        llm_enabled=_env_bool("LLM_ENABLED", "false"),
+        openai_api_key=_env_optional("OPENAI_API_KEY"),
+        openai_model=os.getenv("OPENAI_MODEL", "openai/gpt-4o-mini"),
+        llm_provider=os.getenv("LLM_PROVIDER", "openrouter"),
+        llm_base_url=_env_optional("LLM_BASE_URL"),
+        sample_rate=int(os.getenv("SAMPLE_RATE", "16000")),
+        chunk_size=int(os.getenv("CHUNK_SIZE", "1024")),
+        channels=int(os.getenv("CHANNELS", "1")),
+        audio_input_device=_env_optional("AUDIO_INPUT_DEVICE"),
+        output_dir=os.getenv("OUTPUT_DIR", "data/transcriptions"),
+        output_format=os.getenv("OUTPUT_FORMAT", "txt"),
+        include_timestamp=_env_bool("INCLUDE_TIMESTAMP", "true"),
+        realtime_display=_env_bool("REALTIME_DISPLAY", "true"),
+        debug_mode=_env_bool("DEBUG_MODE", "false"),
+        use_colors=_env_bool("USE_COLORS", "true"),
+        llm_prompt_cleanup=os.getenv("LLM_PROMPT_CLEANUP", "Mejora la puntuación y formato de este texto transcrito, manteniendo el contenido original:"),
+        llm_prompt_summary=os.getenv("LLM_PROMPT_SUMMARY", "Crea un resumen conciso de este texto:"),
+        llm_prompt_tasks=os.getenv("LLM_PROMPT_TASKS", "Extrae las tareas y puntos importantes de este texto en formato de lista:"),
+        llm_prompt_email=os.getenv("LLM_PROMPT_EMAIL", "Formatea este texto como un email profesional:"),
+        performance_profile=os.getenv("PERFORMANCE_PROFILE", "low-latency"),
+        whisper_autotune=_env_bool("WHISPER_AUTOTUNE", "false"),
+        whisper_tuning_cache=os.getenv("WHISPER_TUNING_CACHE", "data/cache/whisper_tuning.json"),
+        whisper_cpu_threads=_env_optional_int("WHISPER_CPU_THREADS"),
+        whisper_num_workers=_env_optional_int("WHISPER_NUM_WORKERS"),
+        whisper_model_dir=os.getenv("WHISPER_MODEL_DIR", "data/models"),
+        whisper_offline=_env_bool("WHISPER_OFFLINE", "false"),
+        language_detection_confidence=float(os.getenv("LANGUAGE_DETECTION_CONFIDENCE", "0.8")),
+        language_recheck_logprob=float(os.getenv("LANGUAGE_RECHECK_LOGPROB", "-1.0")),
+        segment_no_speech_threshold=float(os.getenv("SEGMENT_NO_SPEECH_THRESHOLD", "0.6")),
+        segment_logprob_threshold=float(os.getenv("SEGMENT_LOGPROB_THRESHOLD", "-1.0")),
+        transcription_cache=_env_bool("TRANSCRIPTION_CACHE", "true"),
+        transcription_cache_dir=os.getenv("TRANSCRIPTION_CACHE_DIR", ""),
+        transcription_cache_entries=int(os.getenv("TRANSCRIPTION_CACHE_ENTRIES", "64")),
+        transcription_cache_max_mb=float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "100")),
+        transcription_pool_size=_env_optional_int("TRANSCRIPTION_POOL_SIZE"),
+        web_threads=_env_optional_int("WEB_THREADS"),
+        whisper_max_concurrent=_env_optional_int("WHISPER_MAX_CONCURRENT"),
+        whisper_max_queue=int(os.getenv("WHISPER_MAX_QUEUE", "2")),
+        llm_max_concurrent=int(os.getenv("LLM_MAX_CONCURRENT", "4")),
+        llm_max_queue=int(os.getenv("LLM_MAX_QUEUE", "8")),
+        admission_queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30")),
+        postprocess_timeout=float(os.getenv("POSTPROCESS_TIMEOUT", "30")),
+        llm_combined=_env_bool("LLM_COMBINED", "true"),
+        llm_cache=_env_bool("LLM_CACHE", "true"),
+        llm_cache_path=os.getenv("LLM_CACHE_PATH", "data/cache/llm_responses.sqlite3"),
+        llm_cache_entries=int(os.getenv("LLM_CACHE_ENTRIES", "256")),
+        llm_cache_ttl_hours=float(os.getenv("LLM_CACHE_TTL_HOURS", "168")),
+        llm_max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "10")),
+        llm_keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60")),
+        llm_connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "5")),
+        llm_read_timeout=float(os.getenv("LLM_READ_TIMEOUT", "60")),
+        llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        llm_prewarm=_env_bool("LLM_PREWARM", "true"),
+        llm_summary_chunk_tokens=int(os.getenv("LLM_SUMMARY_CHUNK_TOKENS", "3000")),
+        llm_summary_workers=int(os.getenv("LLM_SUMMARY_WORKERS", "4")),
+        llm_deadline=float(os.getenv("LLM_DEADLINE", "8")),
+        llm_endpoints=_parse_llm_endpoints(),
+        llm_hedge=_env_bool("LLM_HEDGE", "false"),
+        speculative_postprocess=_env_bool("SPECULATIVE_POSTPROCESS", "false"),
+        speculative_fields=tuple(
+            field.strip() for field in os.getenv("SPECULATIVE_FIELDS", "summary,translation_en").split(",")
+            if field.strip()
+        ),
+        speculative_min_interval=float(os.getenv("SPECULATIVE_MIN_INTERVAL", "10")),
+        speculative_token_budget=int(os.getenv("SPECULATIVE_TOKEN_BUDGET", "50000"))
+    )
 
 
 class Config:
@@ -15,9 +250,23 @@ class Config:
     def __init__(self, config_file: Optional[str] = None):
         """Inicializa la configuración"""
         self.config_file = config_file or ".env"
+        self._snapshot: Optional[ConfigSnapshot] = None
         self._load_config()
     
-    def _load_config(self):
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """Instantánea inmutable de la configuración actual"""
+        return self._snapshot
+    
+    def reload(self) -> ConfigSnapshot:
+        """
+        Vuelve a leer el archivo .env y sustituye la instantánea de una vez.
+        Quien haya guardado la instantánea anterior sigue viendo valores coherentes.
+        """
+        self._load_config(override=True)
+        return self._snapshot
+    
+    def _load_config(self, override: bool = False):
         """Carga la configuración desde el archivo .env"""
         # Buscar archivo .env en el directorio actual
         env_path = Path(self.config_file)
@@ -28,14 +277,16 @@ class Config:
             if template_path.exists():
                 print(f"⚠️  Archivo {self.config_file} no encontrado. Usando configuración por defecto.")
                 print(f"💡 Copia config/config_template.env a {self.config_file} para personalizar.")
-                load_dotenv(template_path)
+                load_dotenv(template_path, override=override)
             else:
                 print("❌ No se encontró archivo de configuración.")
                 self._set_defaults()
         else:
-            load_dotenv(env_path)
+            load_dotenv(env_path, override=override)
         
         self._validate_config()
+        # Asignación única: los lectores ven la instantánea anterior o la nueva
+        self._snapshot = _read_snapshot()
     
     def _set_defaults(self):
         """Establece valores por defecto si no hay configuración"""
@@ -46,6 +297,14 @@ class Config:
             "VAD_SENSITIVITY": "2",
             "VAD_SILENCE_DURATION": "1.0",
             "VAD_MIN_SPEECH_DURATION": "0.5",
+            "VAD_CASCADE": "false",
+            "VAD_ADAPTIVE": "true",
+            "VAD_NOISE_MARGIN": "3.0",
+            "VAD_MIN_SPEECH_RATIO": "0.3",
+            "VAD_PRE_ROLL": "0.3",
+            "VAD_HANGOVER": "0.2",
+            "MAX_UTTERANCE_DURATION": "25.0",
+            "CUT_SEARCH_WINDOW": "2.0",
             "LLM_ENABLED": "false",
             "OPENAI_MODEL": "gpt-4o-mini",
             "SAMPLE_RATE": "16000",
@@ -66,21 +325,23 @@ class Config:
         """Valida la configuración cargada"""
         # Validar modelo de Whisper
         valid_models = ["tiny", "base", "small", "medium", "large"]
-        if self.whisper_model not in valid_models:
-            print(f"⚠️  Modelo de Whisper inválido: {self.whisper_model}")
+        whisper_model = os.getenv("WHISPER_MODEL", "base")
+        if whisper_model not in valid_models:
+            print(f"⚠️  Modelo de Whisper inválido: {whisper_model}")
             print(f"💡 Usando 'base' por defecto. Modelos válidos: {valid_models}")
             os.environ["WHISPER_MODEL"] = "base"
         
         # Validar idioma
         valid_languages = ["es", "en", "auto"]
-        if self.whisper_language not in valid_languages:
-            print(f"⚠️  Idioma inválido: {self.whisper_language}")
+        whisper_language = os.getenv("WHISPER_LANGUAGE", "es")
+        if whisper_language not in valid_languages:
+            print(f"⚠️  Idioma inválido: {whisper_language}")
             print(f"💡 Usando 'es' por defecto. Idiomas válidos: {valid_languages}")
             os.environ["WHISPER_LANGUAGE"] = "es"
         
         # Validar sensibilidad VAD
         try:
-            sensitivity = int(self.vad_sensitivity)
+            sensitivity = int(os.getenv("VAD_SENSITIVITY", "2"))
             if not 0 <= sensitivity <= 3:
                 print(f"⚠️  Sensibilidad VAD inválida: {sensitivity}")
                 print("💡 Usando 2 por defecto. Rango válido: 0-3")
@@ -88,110 +349,254 @@ class Config:
         except ValueError:
             print("⚠️  Sensibilidad VAD debe ser un número")
             os.environ["VAD_SENSITIVITY"] = "2"
+        
+        # Validar perfil de rendimiento
+        profile = os.getenv("PERFORMANCE_PROFILE", "low-latency")
+        if profile not in PERFORMANCE_PROFILES:
+            print(f"⚠️  Perfil de rendimiento inválido: {profile}")
+            print(f"💡 Usando 'low-latency' por defecto. Perfiles válidos: {PERFORMANCE_PROFILES}")
+            os.environ["PERFORMANCE_PROFILE"] = "low-latency"
     
     @property
     def whisper_model(self) -> str:
-        return os.getenv("WHISPER_MODEL", "base")
+        return self._snapshot.whisper_model
     
     @property
     def whisper_language(self) -> str:
-        return os.getenv("WHISPER_LANGUAGE", "es")
+        return self._snapshot.whisper_language
     
     @property
     def whisper_use_gpu(self) -> bool:
-        return os.getenv("WHISPER_USE_GPU", "true").lower() == "true"
+        return self._snapshot.whisper_use_gpu
     
     @property
     def vad_sensitivity(self) -> int:
-        return int(os.getenv("VAD_SENSITIVITY", "2"))
+        return self._snapshot.vad_sensitivity
     
     @property
     def vad_silence_duration(self) -> float:
-        return float(os.getenv("VAD_SILENCE_DURATION", "1.0"))
+        return self._snapshot.vad_silence_duration
     
     @property
     def vad_min_speech_duration(self) -> float:
-        return float(os.getenv("VAD_MIN_SPEECH_DURATION", "0.5"))
+        return self._snapshot.vad_min_speech_duration
+    
+    @property
+    def vad_cascade(self) -> bool:
+        return self._snapshot.vad_cascade
+    
+    @property
+    def vad_adaptive(self) -> bool:
+        return self._snapshot.vad_adaptive
+    
+    @property
+    def vad_noise_margin(self) -> float:
+        return self._snapshot.vad_noise_margin
+    
+    @property
+    def vad_min_speech_ratio(self) -> float:
+        return self._snapshot.vad_min_speech_ratio
+    
+    @property
+    def vad_pre_roll(self) -> float:
+        return self._snapshot.vad_pre_roll
+    
+    @property
+    def vad_hangover(self) -> float:
+        return self._snapshot.vad_hangover
+    
+    @property
+    def max_utterance_duration(self) -> float:
+        return self._snapshot.max_utterance_duration
+    
+    @property
+    def cut_search_window(self) -> float:
+        return self._snapshot.cut_search_window
     
     @property
     def llm_enabled(self) -> bool:
-        return os.getenv("LLM_ENABLED", "false").lower() == "true"
+        return self._snapshot.llm_enabled
     
     @property
     def openai_api_key(self) -> Optional[str]:
-        key = os.getenv("OPENAI_API_KEY")
-        return key if key and key.strip() else None
+        return self._snapshot.openai_api_key
     
     @property
     def openai_model(self) -> str:
-        return os.getenv("OPENAI_MODEL", "openai/gpt-4o-mini")
+        return self._snapshot.openai_model
     
     @property
     def llm_provider(self) -> str:
-        return os.getenv("LLM_PROVIDER", "openrouter")
+        return self._snapshot.llm_provider
     
     @property
     def llm_base_url(self) -> Optional[str]:
-        url = os.getenv("LLM_BASE_URL")
-        return url if url and url.strip() else None
+        return self._snapshot.llm_base_url
     
     @property
     def sample_rate(self) -> int:
-        return int(os.getenv("SAMPLE_RATE", "16000"))
+        return self._snapshot.sample_rate
     
     @property
     def chunk_size(self) -> int:
-        return int(os.getenv("CHUNK_SIZE", "1024"))
+        return self._snapshot.chunk_size
     
     @property
     def channels(self) -> int:
-        return int(os.getenv("CHANNELS", "1"))
+        return self._snapshot.channels
     
     @property
     def audio_input_device(self) -> Optional[str]:
-        device = os.getenv("AUDIO_INPUT_DEVICE")
-        return device if device and device.strip() else None
+        return self._snapshot.audio_input_device
     
     @property
     def output_dir(self) -> str:
-        return os.getenv("OUTPUT_DIR", "data/transcriptions")
+        return self._snapshot.output_dir
     
     @property
     def output_format(self) -> str:
-        return os.getenv("OUTPUT_FORMAT", "txt")
+        return self._snapshot.output_format
     
     @property
     def include_timestamp(self) -> bool:
-        return os.getenv("INCLUDE_TIMESTAMP", "true").lower() == "true"
+        return self._snapshot.include_timestamp
     
     @property
     def realtime_display(self) -> bool:
-        return os.getenv("REALTIME_DISPLAY", "true").lower() == "true"
+        return self._snapshot.realtime_display
     
     @property
     def debug_mode(self) -> bool:
-        return os.getenv("DEBUG_MODE", "false").lower() == "true"
+        return self._snapshot.debug_mode
     
     @property
     def use_colors(self) -> bool:
-        return os.getenv("USE_COLORS", "true").lower() == "true"
+        return self._snapshot.use_colors
     
     @property
     def llm_prompt_cleanup(self) -> str:
-        return os.getenv("LLM_PROMPT_CLEANUP", 
-                        "Mejora la puntuación y formato de este texto transcrito, manteniendo el contenido original:")
+        return self._snapshot.llm_prompt_cleanup
     
     @property
     def llm_prompt_summary(self) -> str:
-        return os.getenv("LLM_PROMPT_SUMMARY", "Crea un resumen conciso de este texto:")
+        return self._snapshot.llm_prompt_summary
     
     @property
     def llm_prompt_tasks(self) -> str:
-        return os.getenv("LLM_PROMPT_TASKS", "Extrae las tareas y puntos importantes de este texto en formato de lista:")
+        return self._snapshot.llm_prompt_tasks
     
     @property
     def llm_prompt_email(self) -> str:
-        return os.getenv("LLM_PROMPT_EMAIL", "Formatea este texto como un email profesional:")
+        return self._snapshot.llm_prompt_email
+    
+    @property
+    def performance_profile(self) -> str:
+        return self._snapshot.performance_profile
+    
+    @property
+    def whisper_autotune(self) -> bool:
+        return self._snapshot.whisper_autotune
+    
+    @property
+    def whisper_tuning_cache(self) -> str:
+        return self._snapshot.whisper_tuning_cache
+    
+    @property
+    def whisper_model_dir(self) -> str:
+        return self._snapshot.whisper_model_dir
+    
+    @property
+    def whisper_offline(self) -> bool:
+        return self._snapshot.whisper_offline
+    
+    @property
+    def language_detection_confidence(self) -> float:
+        return self._snapshot.language_detection_confidence
+    
+    @property
+    def language_recheck_logprob(self) -> float:
+        return self._snapshot.language_recheck_logprob
+    
+    @property
+    def segment_no_speech_threshold(self) -> float:
+        return self._snapshot.segment_no_speech_threshold
+    
+    @property
+    def segment_logprob_threshold(self) -> float:
+        return self._snapshot.segment_logprob_threshold
+    
+    @property
+    def postprocess_timeout(self) -> float:
+        return self._snapshot.postprocess_timeout
+    
+    @property
+    def llm_combined(self) -> bool:
+        return self._snapshot.llm_combined
+    
+    @property
+    def transcription_cache(self) -> bool:
+        return self._snapshot.transcription_cache
+    
+    def get_transcription_cache_config(self) -> Dict[str, Any]:
+        """Retorna configuración de la cache de transcripciones como diccionario"""
+        return {
+            "enabled": self._snapshot.transcription_cache,
+            "cache_dir": self._snapshot.transcription_cache_dir,
+            "max_entries": self._snapshot.transcription_cache_entries,
+            "max_disk_bytes": int(self._snapshot.transcription_cache_max_mb * 1024 * 1024)
+        }
+    
+    def get_llm_cache_config(self) -> Dict[str, Any]:
+        """Retorna configuración de la cache de respuestas del LLM como diccionario"""
+        return {
+            "enabled": self._snapshot.llm_cache,
+            "db_path": self._snapshot.llm_cache_path or None,
+            "max_entries": self._snapshot.llm_cache_entries,
+            "ttl_seconds": self._snapshot.llm_cache_ttl_hours * 3600
+        }
+    
+    def get_llm_client_config(self) -> Dict[str, Any]:
+        """Retorna pool, timeouts y reintentos del cliente HTTP del LLM como diccionario"""
+        return {
+            "max_connections": self._snapshot.llm_max_connections,
+            "keepalive_expiry": self._snapshot.llm_keepalive_expiry,
+            "connect_timeout": self._snapshot.llm_connect_timeout,
+            "read_timeout": self._snapshot.llm_read_timeout,
+            "max_retries": self._snapshot.llm_max_retries
+        }
+    
+    def get_llm_endpoints(self) -> list:
+        """Endpoints del LLM entre los que enrutar (vacío = solo el proveedor principal)"""
+        return [dict(endpoint) for endpoint in self._snapshot.llm_endpoints]
+    
+    @property
+    def llm_hedge(self) -> bool:
+        return self._snapshot.llm_hedge
+    
+    def get_speculative_config(self) -> Dict[str, Any]:
+        """Retorna la configuración del post-procesado especulativo como diccionario"""
+        return {
+            "enabled": self._snapshot.speculative_postprocess,
+            "fields": list(self._snapshot.speculative_fields),
+            "min_interval": self._snapshot.speculative_min_interval,
+            "token_budget": self._snapshot.speculative_token_budget
+        }
+    
+    @property
+    def llm_prewarm(self) -> bool:
+        return self._snapshot.llm_prewarm
+    
+    @property
+    def llm_summary_chunk_tokens(self) -> int:
+        return self._snapshot.llm_summary_chunk_tokens
+    
+    @property
+    def llm_summary_workers(self) -> int:
+        return self._snapshot.llm_summary_workers
+    
+    @property
+    def llm_deadline(self) -> float:
+        return self._snapshot.llm_deadline
     
     def get_audio_config(self) -> Dict[str, Any]:
         """Retorna configuración de audio como diccionario"""
@@ -207,7 +612,11 @@ class Config:
         return {
             "model": self.whisper_model,
             "language": self.whisper_language,
-            "use_gpu": self.whisper_use_gpu
+            "use_gpu": self.whisper_use_gpu,
+            "autotune": self.whisper_autotune,
+            "tuning_cache": self.whisper_tuning_cache,
+            "model_dir": self.whisper_model_dir,
+            "offline": self.whisper_offline
         }
     
     def get_vad_config(self) -> Dict[str, Any]:
@@ -215,7 +624,48 @@ class Config:
         return {
             "sensitivity": self.vad_sensitivity,
             "silence_duration": self.vad_silence_duration,
-            "min_speech_duration": self.vad_min_speech_duration
+            "min_speech_duration": self.vad_min_speech_duration,
+            "cascade": self.vad_cascade,
+            "adaptive": self.vad_adaptive,
+            "noise_margin": self.vad_noise_margin,
+            "min_speech_ratio": self.vad_min_speech_ratio,
+            "max_utterance_duration": self.max_utterance_duration,
+            "cut_search_window": self.cut_search_window
+        }
+    
+    def get_performance_budget(self) -> Dict[str, Any]:
+        """
+        Retorna el reparto de CPU del perfil activo. Las variables
+        WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS, TRANSCRIPTION_POOL_SIZE y
+        WEB_THREADS, si están definidas, tienen prioridad sobre el perfil.
+        """
+        snapshot = self._snapshot
+        budget = _profile_budget(snapshot.performance_profile, os.cpu_count() or 1)
+        overrides = {
+            "cpu_threads": snapshot.whisper_cpu_threads,
+            "num_workers": snapshot.whisper_num_workers,
+            "transcription_pool_size": snapshot.transcription_pool_size,
+            "web_threads": snapshot.web_threads,
+        }
+        budget.update({key: value for key, value in overrides.items() if value is not None})
+        budget["profile"] = snapshot.performance_profile
+        return budget
+    
+    def get_admission_config(self) -> Dict[str, Any]:
+        """
+        Retorna los límites de admisión por recurso. Si WHISPER_MAX_CONCURRENT
+        no está definido se usa el tamaño del pool de transcripción del perfil.
+        """
+        snapshot = self._snapshot
+        whisper_concurrent = snapshot.whisper_max_concurrent
+        if whisper_concurrent is None:
+            whisper_concurrent = self.get_performance_budget()["transcription_pool_size"]
+        return {
+            "limits": {
+                "whisper": {"max_concurrent": whisper_concurrent, "max_queue": snapshot.whisper_max_queue},
+                "llm": {"max_concurrent": snapshot.llm_max_concurrent, "max_queue": snapshot.llm_max_queue},
+            },
+            "queue_timeout": snapshot.admission_queue_timeout
         }
     
     def print_config(self):
@@ -228,6 +678,7 @@ class Config:
         print(f"   LLM habilitado: {self.llm_enabled}")
         print(f"   Directorio salida: {self.output_dir}")
         print(f"   Formato salida: {self.output_format}")
+        print(f"   Perfil de rendimiento: {self.performance_profile}")
         if self.debug_mode:
             print(f"   Modo debug: {self.debug_mode}")
 
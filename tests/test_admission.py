@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Pruebas del control de admision (limites por recurso y cola acotada).
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.admission import AdmissionController, AdmissionRejected, ResourceLimiter
+from utils.jobs import CancelToken, JobCancelled
+
+
+def _hold(limiter, release: threading.Event, started: threading.Event = None):
+    """Ocupa un hueco del recurso en otro hilo hasta que se active `release`"""
+    def run():
+        with limiter.acquire():
+            if started:
+                started.set()
+            release.wait(5)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    """Sin hueco ni sitio en la cola se rechaza al momento"""
+    limiter = ResourceLimiter("llm", max_concurrent=1, max_queue=0)
+    release, started = threading.Event(), threading.Event()
+    holder = _hold(limiter, release, started)
+    started.wait(5)
+
+    with pytest.raises(AdmissionRejected) as error:
+        limiter.acquire()
+    assert error.value.resource == "llm" and error.value.retry_after >= 1
+
+    release.set()
+    holder.join()
+    stats = limiter.get_stats()
+    assert stats["admitted"] == 1 and stats["rejected"] == 1 and stats["active"] == 0
+
+
+def test_queued_request_waits_for_slot():
+    """Una peticion en cola entra cuando se libera el hueco y se mide su espera"""
+    limiter = ResourceLimiter("whisper", max_concurrent=1, max_queue=1)
+    release, started = threading.Event(), threading.Event()
+    holder = _hold(limiter, release, started)
+    started.wait(5)
+
+    threading.Timer(0.05, release.set).start()
+    with limiter.acquire() as slot:
+        assert slot.wait_seconds >= 0.04
+    holder.join()
+    assert limiter.get_stats()["queue_wait_max_ms"] >= 40
+
+
+def test_queue_timeout_rejects():
+    """Si la espera en cola supera el limite se rechaza"""
+    limiter = ResourceLimiter("whisper", max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    release, started = threading.Event(), threading.Event()
+    holder = _hold(limiter, release, started)
+    started.wait(5)
+
+    with pytest.raises(AdmissionRejected):
+        limiter.acquire()
+    assert limiter.get_stats()["waiting"] == 0
+    release.set()
+    holder.join()
+
+
+def test_cancel_leaves_queue():
+    """Cancelar el trabajo lo saca de la cola"""
+    limiter = ResourceLimiter("llm", max_concurrent=1, max_queue=1)
+    release, started = threading.Event(), threading.Event()
+    holder = _hold(limiter, release, started)
+    started.wait(5)
+
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(JobCancelled):
+        limiter.acquire(cancel=token)
+    release.set()
+    holder.join()
+
+
+def test_try_acquire_only_takes_a_free_slot():
+    """try_acquire no espera ni se cuela por delante de la cola"""
+    limiter = ResourceLimiter("llm", max_concurrent=2, max_queue=1)
+    first = limiter.try_acquire()
+    assert first is not None and limiter.try_acquire() is not None
+    assert limiter.try_acquire() is None
+
+    waiter = threading.Thread(target=lambda: limiter.acquire().release())
+    waiter.start()
+    deadline = time.monotonic() + 2
+    while limiter.get_stats()["waiting"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    first.release()
+    assert limiter.try_acquire() is None  # El hueco es para el que esperaba
+    waiter.join(2)
+
+
+def test_internal_work_ignores_queue_limit():
+    """El trabajo interno espera su turno aunque la cola este llena"""
+    limiter = ResourceLimiter("whisper", max_concurrent=1, max_queue=0, queue_timeout=0.01)
+    release, started = threading.Event(), threading.Event()
+    holder = _hold(limiter, release, started)
+    started.wait(5)
+
+    threading.Timer(0.05, release.set).start()
+    with limiter.acquire(enforce_queue_limit=False):
+        pass
+    holder.join()
+
+
+def test_controller_stats_per_resource():
+    controller = AdmissionController({
+        "whisper": {"max_concurrent": 1, "max_queue": 2},
+        "llm": {"max_concurrent": 4, "max_queue": 8},
+    })
+    with controller.acquire("llm"):
+        assert controller.get_stats()["llm"]["active"] == 1
+    stats = controller.get_stats()
+    assert stats["whisper"]["max_queue"] == 2 and stats["llm"]["admitted"] == 1
+
+
+
+def test_multiple_slots_are_granted_together():
+    """Varios huecos se conceden a la vez (nunca una parte) y sin pasar del limite"""
+    limiter = ResourceLimiter("llm", max_concurrent=2, max_queue=4, queue_timeout=1.0)
+    with limiter.acquire(count=5) as slot:
+        assert slot.count == 2 and limiter.get_stats()["active"] == 2
+    assert limiter.get_stats()["active"] == 0
+
+    single = limiter.acquire()
+    entered = threading.Event()
+
+    def wide():
+        with limiter.acquire(count=2):
+            entered.set()
+
+    thread = threading.Thread(target=wide)
+    thread.start()
+    # Con un hueco libre no entra: espera a tener los dos
+    assert not entered.wait(0.1) and limiter.get_stats()["active"] == 1
+    single.release()
+    assert entered.wait(1)
+    thread.join()
+    assert limiter.get_stats()["active"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas del buffer de captura con pre-roll.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.audio_buffer import AudioSegmentBuffer
+
+SAMPLE_RATE = 16000
+
+
+def _ramp(start: int, length: int) -> np.ndarray:
+    """Bloque cuyo valor es su posicion absoluta (para comprobar los cortes)"""
+    return np.arange(start, start + length, dtype=np.float32)
+
+
+def _fill(buffer: AudioSegmentBuffer, total: int, block: int = 1024, idle: bool = True) -> None:
+    for start in range(buffer.total_samples, total, block):
+        buffer.append(_ramp(start, min(block, total - start)))
+        if idle:
+            buffer.retain_pre_roll()
+
+
+def test_segment_is_a_view():
+    """Los segmentos se extraen sin copiar el audio"""
+    buffer = AudioSegmentBuffer(SAMPLE_RATE, pre_roll=0.3, capacity_seconds=2.0)
+    _fill(buffer, 8000, idle=False)
+
+    segment = buffer.segment(1000, 3000)
+    assert segment.base is not None
+    assert segment[0] == 1000 and segment[-1] == 2999
+
+
+def test_idle_buffer_keeps_only_pre_roll():
+    """En reposo el buffer no crece y conserva el pre-roll mas reciente"""
+    buffer = AudioSegmentBuffer(SAMPLE_RATE, pre_roll=0.3, capacity_seconds=2.0)
+    _fill(buffer, SAMPLE_RATE * 20)
+
+    assert len(buffer._data) == SAMPLE_RATE * 2
+    assert len(buffer) <= buffer.retain_samples + 1024
+    onset = buffer.total_samples - 100
+    segment = buffer.segment(onset - buffer.pre_roll_samples, buffer.total_samples)
+    assert segment[0] == onset - buffer.pre_roll_samples
+
+
+def test_long_utterance_is_never_dropped():
+    """Una frase mas larga que la capacidad hace crecer el buffer sin perder audio"""
+    buffer = AudioSegmentBuffer(SAMPLE_RATE, pre_roll=0.3, capacity_seconds=1.0)
+    _fill(buffer, SAMPLE_RATE)
+    onset = buffer.total_samples - 200
+    _fill(buffer, SAMPLE_RATE * 5, idle=False)
+
+    segment = buffer.segment(onset - buffer.pre_roll_samples, buffer.total_samples)
+    assert len(segment) == buffer.total_samples - onset + buffer.pre_roll_samples
+    assert np.array_equal(segment, _ramp(onset - buffer.pre_roll_samples, len(segment)))
+
+    buffer.release(buffer.total_samples)
+    assert len(buffer) == 0
+
+
+def test_quietest_point_finds_pause():
+    """El punto de corte cae en el frame de menor energia"""
+    buffer = AudioSegmentBuffer(SAMPLE_RATE, pre_roll=0.0, capacity_seconds=2.0)
+    audio = np.full(SAMPLE_RATE, 0.5, dtype=np.float32)
+    audio[9600:10080] = 0.0
+    buffer.append(audio)
+
+    cut = buffer.quietest_point(0, SAMPLE_RATE)
+    assert 9600 <= cut < 10080
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la instantánea de configuración.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from config.config import Config, ConfigSnapshot
+
+
+def test_snapshot_is_immutable_and_typed(tmp_path):
+    """La instantánea tiene valores ya convertidos y no admite cambios"""
+    env_file = tmp_path / ".env"
+    env_file.write_text("SAMPLE_RATE=16000\nREALTIME_DISPLAY=false\n", encoding="utf-8")
+    cfg = Config(str(env_file))
+
+    snapshot = cfg.snapshot
+    assert isinstance(snapshot, ConfigSnapshot)
+    assert snapshot.sample_rate == 16000 and isinstance(snapshot.sample_rate, int)
+    assert not hasattr(snapshot, "__dict__")
+    try:
+        snapshot.sample_rate = 8000
+        assert False, "La instantánea no debería ser modificable"
+    except AttributeError:
+        pass
+
+
+def test_properties_do_not_read_environment(tmp_path, monkeypatch):
+    """Los cambios en el entorno solo se ven tras reload()"""
+    env_file = tmp_path / ".env"
+    env_file.write_text("WHISPER_LANGUAGE=es\n", encoding="utf-8")
+    monkeypatch.setenv("WHISPER_LANGUAGE", "es")
+    cfg = Config(str(env_file))
+    old_snapshot = cfg.snapshot
+
+    env_file.write_text("WHISPER_LANGUAGE=en\n", encoding="utf-8")
+    assert cfg.whisper_language == "es"
+
+    new_snapshot = cfg.reload()
+    assert cfg.whisper_language == "en"
+    assert new_snapshot is cfg.snapshot
+    assert old_snapshot.whisper_language == "es"
+
+
+def test_performance_profiles(tmp_path, monkeypatch):
+    """Cada perfil fija un reparto de hilos y las variables explícitas lo ajustan"""
+    import config.config as config_module
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("", encoding="utf-8")
+    monkeypatch.setattr(config_module.os, "cpu_count", lambda: 8)
+
+    monkeypatch.setenv("PERFORMANCE_PROFILE", "throughput")
+    budget = Config(str(env_file)).get_performance_budget()
+    assert budget["num_workers"] == 2 and budget["cpu_threads"] == 4
+    assert budget["transcription_pool_size"] == budget["num_workers"]
+
+    monkeypatch.setenv("PERFORMANCE_PROFILE", "low-latency")
+    monkeypatch.setenv("WEB_THREADS", "3")
+    budget = Config(str(env_file)).get_performance_budget()
+    assert budget == {"cpu_threads": 6, "num_workers": 1, "transcription_pool_size": 1,
+                      "web_threads": 3, "profile": "low-latency"}
+
+    monkeypatch.setenv("PERFORMANCE_PROFILE", "turbo")
+    assert Config(str(env_file)).performance_profile == "low-latency"
+
+
+def test_startup_defaults_are_conservative(tmp_path, monkeypatch):
+    """Por defecto no se calibra Whisper al arrancar ni se guardan transcripciones en disco"""
+    env_file = tmp_path / ".env"
+    env_file.write_text("", encoding="utf-8")
+    monkeypatch.delenv("WHISPER_AUTOTUNE", raising=False)
+    monkeypatch.delenv("TRANSCRIPTION_CACHE_DIR", raising=False)
+
+    cfg = Config(str(env_file))
+    assert cfg.whisper_autotune is False
+    assert cfg.get_transcription_cache_config()["cache_dir"] == ""
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Pruebas de TextProcessor contra el servidor LLM local (sin red ni API key).
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+pytest.importorskip("openai")
+
+from utils.fake_llm_server import FakeLLMServer
+from utils.llm_cache import LLMResponseCache
+from utils.llm_client import close_llm_clients
+from utils.text_processor import TextProcessor
+
+
+@pytest.fixture
+def fake_llm():
+    servers = []
+
+    def start(**settings):
+        settings.setdefault("latency", 0.0)
+        settings.setdefault("jitter", 0.0)
+        settings.setdefault("tokens_per_second", 0.0)
+        server = FakeLLMServer(seed=1, **settings)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    close_llm_clients()
+    for server in servers:
+        server.stop()
+
+
+def _processor(server, cache=None, max_retries=0):
+    return TextProcessor(api_key="local", model="fake-llm", provider="openai",
+                         base_url=server.base_url, cache=cache,
+                         client_settings={"max_retries": max_retries, "read_timeout": 5.0})
+
+
+def test_completion_and_cache(fake_llm):
+    server = fake_llm()
+    processor = _processor(server, cache=LLMResponseCache())
+
+    assert processor.improve_text("hola que tal") == "hola que tal"
+    assert processor.improve_text("hola que tal") == "hola que tal"
+    assert server.get_stats()["requests"] == 1
+
+
+def test_streaming_delivers_tokens_progressively(fake_llm):
+    server = fake_llm(tokens_per_second=200.0)
+    stream = _processor(server).improve_text_stream("uno dos tres cuatro", "summary")
+
+    chunks = list(stream)
+    assert len(chunks) == 4
+    assert stream.text == "uno dos tres cuatro"
+    assert server.get_stats()["streams"] == 1
+
+
+def test_combined_json_response(fake_llm):
+    server = fake_llm()
+    results = _processor(server).process_combined("texto de prueba", ["summary", "tasks"])
+    assert results == {"summary": "texto de prueba", "tasks": "texto de prueba"}
+    assert server.get_stats()["requests"] == 1
+
+
+def test_latency_and_errors(fake_llm):
+    slow = fake_llm(latency=0.2)
+    start = time.monotonic()
+    assert _processor(slow).improve_text("despacio") == "despacio"
+    assert time.monotonic() - start >= 0.2
+
+    broken = fake_llm(error_rate=1.0)
+    assert _processor(broken, max_retries=1).improve_text("falla") is None
+    # El SDK reintenta el 500 una vez
+    assert broken.get_stats() == {"requests": 2, "errors": 2, "streams": 0, "max_in_flight": 1}
+
+
+def test_cancelled_calls_abort_and_free_workers(fake_llm):
+    """Cancelar corta la conexion: las llamadas siguientes no esperan a las abandonadas"""
+    from utils.jobs import CancelToken, JobCancelled
+
+    server = fake_llm(tokens_per_second=10.0)
+    processor = _processor(server)
+    long_text = " ".join(["palabra"] * 100)  # 10 s a 10 tokens/s
+
+    outcomes = []
+
+    def call(cancel):
+        try:
+            outcomes.append(processor.improve_text(long_text, cancel=cancel))
+        except JobCancelled:
+            outcomes.append("cancelada")
+
+    tokens = [CancelToken() for _ in range(6)]
+    threads = [threading.Thread(target=call, args=(token,)) for token in tokens]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    for token in tokens:
+        token.cancel()
+    for thread in threads:
+        thread.join(2)
+    assert outcomes == ["cancelada"] * 6
+
+    started = time.monotonic()
+    assert processor.improve_text("corto", cancel=CancelToken()) == "corto"
+    assert time.monotonic() - started < 1.0
+
+    # El servidor ve cerrarse las conexiones abandonadas
+    deadline = time.monotonic() + 2
+    while server.in_flight and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert server.in_flight == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de tiempo de importacion: los puntos de entrada no deben cargar
+faster-whisper, CTranslate2, sounddevice, openai ni numpy al importarse.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+# Modulos pesados que solo se cargan al inicializar los componentes
+HEAVY_MODULES = {"faster_whisper", "ctranslate2", "sounddevice", "openai", "numpy", "httpx"}
+
+# Presupuestos (segundos, acumulado del modulo) holgados para maquinas lentas
+IMPORT_BUDGETS = {
+    "whisper_dictado": 1.0,
+    "web_server": 2.5,  # incluye Flask
+}
+
+
+def _import_profile(module: str) -> dict:
+    """Ejecuta `python -X importtime` y devuelve {modulo: microsegundos acumulados}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(project_root), capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            profile[name.strip()] = int(cumulative.strip())
+        except ValueError:
+            continue  # Cabecera
+    return profile
+
+
+def _check_entry_point(module: str) -> None:
+    profile = _import_profile(module)
+    loaded = {name.split(".")[0] for name in profile}
+
+    assert not loaded & HEAVY_MODULES, f"{module} importa {sorted(loaded & HEAVY_MODULES)}"
+    assert profile[module] / 1e6 < IMPORT_BUDGETS[module]
+
+
+def test_cli_import_is_light():
+    """El CLI se importa sin dependencias pesadas (--help y la configuracion son instantaneos)"""
+    _check_entry_point("whisper_dictado")
+
+
+def test_web_server_import_is_light():
+    """El servidor web solo paga Flask al importarse"""
+    _check_entry_point("web_server")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los trabajos cancelables (Whisper y LLM simulados).
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.jobs import CancelToken, JobCancelled, JobRegistry
+from utils.text_processor import TextProcessor
+from utils.transcriber import Transcriber
+from utils.transcription_cache import TranscriptionCache
+
+
+class CountingWhisperModel:
+    """Cuenta cuantos segmentos se llegan a decodificar"""
+
+    def __init__(self, n_segments: int = 5):
+        self.n_segments = n_segments
+        self.decoded = 0
+
+    def transcribe(self, audio, **kwargs):
+        def segments():
+            for i in range(self.n_segments):
+                self.decoded += 1
+                yield SimpleNamespace(text=f" parte {i}", start=i * 30.0, end=i * 30.0 + 30.0,
+                                      avg_logprob=-0.2, no_speech_prob=0.01)
+        return segments(), SimpleNamespace(language="es", language_probability=0.99)
+
+
+class SlowCompletions:
+    """Imita client.chat.completions con una respuesta lenta"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="mejorado"))])
+
+
+def _processor(delay: float) -> TextProcessor:
+    processor = TextProcessor()
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions(delay)))
+    return processor
+
+
+def test_cancel_stops_consuming_segments():
+    """Al cancelar no se decodifican mas ventanas ni se guarda en la cache"""
+    model = CountingWhisperModel()
+    cache = TranscriptionCache()
+    transcriber = Transcriber(model, "base", language="es", cache=cache)
+    token = CancelToken()
+
+    stream = transcriber.transcribe_stream(np.zeros(16000, dtype=np.float32), cancel=token)
+    segments = iter(stream)
+    next(segments)
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        next(segments)
+
+    assert model.decoded == 1
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_cancelled_token_skips_pending_llm_call():
+    """Una llamada al LLM pendiente no se lanza si el trabajo ya se cancelo"""
+    processor = _processor(0.0)
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        processor.improve_text("hola", cancel=token)
+    assert processor.client.chat.completions.calls == 0
+
+
+def test_cancel_releases_caller_during_llm_call():
+    """Cancelar durante la llamada al LLM libera al llamante sin esperar la respuesta"""
+    processor = _processor(2.0)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+
+    start = time.perf_counter()
+    with pytest.raises(JobCancelled):
+        processor.improve_text("hola", cancel=token)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_registry_tracks_status():
+    registry = JobRegistry()
+    done, cancelled = registry.create("dictation"), registry.create("dictation")
+    registry.finish(done)
+    registry.cancel(cancelled.id)
+
+    assert done.status == "done" and cancelled.status == "cancelled"
+    assert registry.active() == []
+    assert registry.cancel("no-existe") is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
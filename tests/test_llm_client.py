@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Pruebas del cliente HTTP compartido del LLM (contra un servidor local).
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+pytest.importorskip("openai")
+
+from utils.llm_client import close_llm_clients, get_llm_client, prewarm_llm_client
+
+
+@pytest.fixture
+def provider():
+    """Servidor local compatible con GET /v1/models que anota cada conexion"""
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            connections.append(self.client_address)
+            body = json.dumps({"object": "list", "data": []}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1", connections
+    close_llm_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_is_shared_per_key_and_url(provider):
+    url, _ = provider
+    client = get_llm_client("clave", "openai", url)
+    assert get_llm_client("clave", "openai", url + "/") is client
+    assert get_llm_client("otra", "openai", url) is not client
+
+
+def test_settings_and_base_url_are_applied(provider):
+    url, _ = provider
+    client = get_llm_client("clave", "openai", url, read_timeout=12.0, connect_timeout=2.0, max_retries=1)
+    assert str(client.base_url).rstrip("/") == url
+    assert client.max_retries == 1
+    assert client.timeout.read == 12.0 and client.timeout.connect == 2.0
+
+
+def test_prewarmed_connection_is_reused(provider):
+    """La conexion abierta al precalentar se reutiliza (keep-alive)"""
+    url, connections = provider
+    client = get_llm_client("clave", "openai", url)
+    prewarm_llm_client(client, background=False)
+    client.models.list()
+    assert len(connections) == 2 and connections[0] == connections[1]
+
+
+def test_prewarm_ignores_unreachable_provider():
+    client = get_llm_client("clave", "openai", "http://127.0.0.1:9/v1", connect_timeout=0.5, max_retries=0)
+    try:
+        prewarm_llm_client(client, background=False)
+    finally:
+        close_llm_clients()
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Pruebas del enrutado entre varios endpoints del LLM.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.llm_router import Endpoint, LLMRouter
+
+
+class FakeStream:
+    """Respuesta en streaming que anota si se ha cerrado"""
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """Cliente con la forma del de OpenAI: responde tras `delay` o falla"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.requests = []
+        self.streams = []
+        self.options = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options = options
+        return self
+
+    def create(self, **params):
+        self.requests.append(params)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} caido")
+        if params.get("stream"):
+            self.streams.append(FakeStream(self.name))
+            return self.streams[-1]
+        return self.name
+
+
+def _router(*clients, **kwargs):
+    return LLMRouter([Endpoint(c.name, c, f"modelo-{c.name}") for c in clients], **kwargs)
+
+
+def test_fastest_healthy_endpoint_is_preferred():
+    slow, fast = FakeClient("lento", delay=0.05), FakeClient("rapido", delay=0.0)
+    router = _router(slow, fast)
+
+    # Las primeras peticiones miden cada endpoint; despues gana el rapido
+    for _ in range(6):
+        router.chat.completions.create(messages=[])
+    assert [e.name for e in router.ranked()] == ["rapido", "lento"]
+    assert router.chat.completions.create(messages=[]) == "rapido"
+    assert fast.requests[-1]["model"] == "modelo-rapido"
+
+
+def test_failing_endpoint_falls_back_and_is_demoted():
+    broken, backup = FakeClient("roto", fail=True), FakeClient("respaldo", delay=0.01)
+    router = _router(broken, backup, cooldown=60)
+
+    for _ in range(4):
+        assert router.chat.completions.create(messages=[]) == "respaldo"
+
+    stats = router.get_stats()
+    assert stats["roto"]["error_rate"] >= 0.5
+    assert router.ranked()[0].name == "respaldo"
+    # Caido y sin cumplir el cooldown: ya no recibe peticiones
+    calls = len(broken.requests)
+    router.chat.completions.create(messages=[])
+    assert len(broken.requests) == calls
+
+
+def test_all_endpoints_failing_raises_last_error():
+    router = _router(FakeClient("a", fail=True), FakeClient("b", fail=True))
+    with pytest.raises(RuntimeError):
+        router.chat.completions.create(messages=[])
+
+
+def test_hedged_request_goes_to_backup_after_p95():
+    primary, backup = FakeClient("primario"), FakeClient("respaldo", delay=0.02)
+    router = _router(primary, backup, hedge=True)
+    endpoint = router.endpoints[0]
+    endpoint.latency = 0.001
+    endpoint.latencies.extend([0.01] * 20)
+    router.endpoints[1].latency = 0.02
+
+    # El primario se degrada: la copia al respaldo responde antes
+    primary.delay = 1.0
+    start = time.monotonic()
+    assert router.chat.completions.create(messages=[]) == "respaldo"
+    assert time.monotonic() - start < 0.5
+    assert router.get_stats()["primario"]["hedges"] == 1
+
+
+def test_hedged_stream_closes_the_losing_copy():
+    primary, backup = FakeClient("primario", delay=0.3), FakeClient("respaldo")
+    router = _router(primary, backup, hedge=True)
+    router.endpoints[0].latency = 0.001
+    router.endpoints[0].latencies.extend([0.01] * 20)
+    router.endpoints[1].latency = 0.02
+
+    winner = router.chat.completions.create(messages=[], stream=True)
+    assert winner.name == "respaldo" and not winner.closed
+
+    # El primario responde tarde: su stream se cierra sin leerlo
+    deadline = time.monotonic() + 2
+    while not (primary.streams and primary.streams[0].closed) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert primary.streams[0].closed
+
+
+def test_endpoint_headers_are_merged():
+    client = FakeClient("openrouter")
+    router = LLMRouter([Endpoint("openrouter", client, "m", {"X-Title": "Whisper Dictation"})])
+    router.chat.completions.create(messages=[], extra_headers={"X-Otra": "1"})
+    assert client.requests[0]["extra_headers"] == {"X-Title": "Whisper Dictation", "X-Otra": "1"}
+
+
+def test_text_processor_routes_through_endpoints(monkeypatch):
+    from utils import text_processor as tp
+
+    clients = {}
+
+    def fake_get_llm_client(api_key, provider, base_url, **settings):
+        clients[base_url] = FakeClient(base_url)
+        return clients[base_url]
+
+    monkeypatch.setattr(tp, "_load_openai", lambda: object())
+    monkeypatch.setattr(tp, "get_llm_client", fake_get_llm_client)
+    processor = tp.TextProcessor(api_key="clave", model="general", endpoints=[
+        {"name": "uno", "base_url": "http://uno/v1", "api_key": None, "model": None},
+        {"name": "dos", "base_url": "http://dos/v1", "api_key": "otra", "model": "propio"},
+    ])
+
+    assert processor.router is not None
+    assert len(processor.llm_clients()) == 2
+    assert [e.model for e in processor.router.endpoints] == ["general", "propio"]
+    # La conmutacion la hace el router; el SDK no reintenta por su cuenta
+    assert all(client.options == {"max_retries": 0} for client in clients.values())
+
+
+def test_cache_key_covers_the_route_set(monkeypatch):
+    from utils import text_processor as tp
+
+    monkeypatch.setattr(tp, "_load_openai", lambda: object())
+    monkeypatch.setattr(tp, "get_llm_client", lambda api_key, provider, base_url, **s: FakeClient(base_url))
+
+    def processor(*models):
+        return tp.TextProcessor(api_key="clave", model="general", endpoints=[
+            {"name": f"e{i}", "base_url": f"http://e{i}/v1", "api_key": None, "model": model}
+            for i, model in enumerate(models)
+        ])
+
+    params = {"temperature": 0.3}
+    key = processor("a", "b")._cache_key("summary", "hola", params)
+    assert processor("a", "b")._cache_key("summary", "hola", params) == key
+    assert processor("a", "c")._cache_key("summary", "hola", params) != key
+    assert tp.TextProcessor(model="a")._cache_key("summary", "hola", params) != key
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Pruebas del almacen local de modelos (sin red: descargador simulado).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.model_store import ModelStore, ModelStoreError, main
+from utils.whisper_loader import resolve_model_path
+
+
+def _fake_download(name: str, output_dir: str) -> str:
+    """Simula los archivos de un modelo de faster-whisper y la cache del hub"""
+    target = Path(output_dir)
+    (target / "model.bin").write_bytes(b"pesos-" + name.encode() * 1000)
+    (target / "config.json").write_text('{"name": "%s"}' % name)
+    (target / ".cache").mkdir(exist_ok=True)
+    (target / ".cache" / "lock").write_text("tmp")
+    return output_dir
+
+
+def test_prefetch_writes_manifest(tmp_path):
+    """El manifiesto registra tamano y checksum de cada archivo del modelo"""
+    store = ModelStore(str(tmp_path))
+    entry = store.prefetch("base", downloader=_fake_download)
+
+    assert set(entry["files"]) == {"model.bin", "config.json"}
+    assert entry["files"]["model.bin"]["size"] == (tmp_path / "base" / "model.bin").stat().st_size
+    assert ModelStore(str(tmp_path)).local_path("base") == str(tmp_path / "base")
+
+
+def test_verify_detects_corruption(tmp_path):
+    """Un archivo modificado o ausente se detecta en la verificacion"""
+    store = ModelStore(str(tmp_path))
+    store.prefetch("base", downloader=_fake_download)
+    assert store.verify() == {}
+
+    model_bin = tmp_path / "base" / "model.bin"
+    data = bytearray(model_bin.read_bytes())
+    data[0] ^= 0xFF
+    model_bin.write_bytes(bytes(data))
+    assert "checksum" in store.verify()["base"][0]
+
+    model_bin.unlink()
+    with pytest.raises(ModelStoreError):
+        store.local_path("base")
+
+
+def test_offline_requires_store(tmp_path):
+    """En modo offline un modelo que no esta en el almacen falla al arrancar"""
+    with pytest.raises(ModelStoreError):
+        resolve_model_path("small", str(tmp_path), offline=True)
+
+    ModelStore(str(tmp_path)).prefetch("small", downloader=_fake_download)
+    assert resolve_model_path("small", str(tmp_path), offline=True) == (str(tmp_path / "small"), True)
+    # Sin almacen ni modo offline se resuelve por nombre, como antes
+    assert resolve_model_path("tiny", str(tmp_path)) == ("tiny", False)
+
+
+def test_verify_command_checks_required_models(tmp_path):
+    """`verify` falla si el almacen no contiene todos los modelos pedidos"""
+    ModelStore(str(tmp_path)).prefetch("base", downloader=_fake_download)
+
+    assert main(["--dir", str(tmp_path), "verify", "base"]) == 0
+    assert main(["--dir", str(tmp_path), "verify", "base", "small"]) == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
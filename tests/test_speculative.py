@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Pruebas del post-procesado especulativo en segundo plano.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.jobs import JobCancelled
+from utils.speculative import SpeculativeDeferred, SpeculativeWorker
+
+
+class Recorder:
+    """Anota cada trabajo procesado y avisa al terminar"""
+
+    def __init__(self):
+        self.done = []
+        self.event = threading.Event()
+
+    def __call__(self, key, text, cancel):
+        self.done.append((key, text, time.monotonic()))
+        self.event.set()
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_waits_for_idle_before_processing():
+    recorder = Recorder()
+    idle = threading.Event()
+    worker = SpeculativeWorker(recorder, idle.is_set, min_interval=0, poll_interval=0.02)
+    try:
+        worker.submit("d1", "hola", cost=10)
+        assert not recorder.event.wait(0.1)
+
+        idle.set()
+        assert recorder.event.wait(1)
+        assert recorder.done[0][:2] == ("d1", "hola")
+        assert _wait_for(lambda: worker.get_stats()["completed"] == 1)
+    finally:
+        worker.stop()
+
+
+def test_jobs_are_rate_limited():
+    recorder = Recorder()
+    worker = SpeculativeWorker(recorder, lambda: True, min_interval=0.2, poll_interval=0.02)
+    try:
+        worker.submit("d1", "uno", cost=1)
+        worker.submit("d2", "dos", cost=1)
+        assert _wait_for(lambda: len(recorder.done) == 2)
+        assert recorder.done[1][2] - recorder.done[0][2] >= 0.19
+    finally:
+        worker.stop()
+
+
+def test_token_budget_caps_cost():
+    recorder = Recorder()
+    worker = SpeculativeWorker(recorder, lambda: False, min_interval=0, token_budget=100,
+                               poll_interval=0.02)
+    try:
+        worker.submit("d1", "uno", cost=60)
+        worker.submit("d2", "dos", cost=60)
+        worker.submit("d3", "tres", cost=30)
+        worker._is_idle = lambda: True
+
+        assert _wait_for(lambda: worker.get_stats()["pending"] == 0 and len(recorder.done) == 2)
+        assert [key for key, _, _ in recorder.done] == ["d1", "d3"]
+        stats = worker.get_stats()
+        assert stats["over_budget"] == 1 and stats["tokens_spent"] == 90
+    finally:
+        worker.stop()
+
+
+def test_resubmit_replaces_pending_text_and_queue_is_bounded():
+    recorder = Recorder()
+    worker = SpeculativeWorker(recorder, lambda: False, max_pending=2)
+    try:
+        worker.submit("d1", "viejo", cost=1)
+        worker.submit("d1", "nuevo", cost=1)
+        worker.submit("d2", "dos", cost=1)
+        worker.submit("d3", "tres", cost=1)
+        stats = worker.get_stats()
+        assert stats["pending"] == 2 and stats["dropped"] == 1
+
+        worker.discard("d2")
+        worker._is_idle = lambda: True
+        assert recorder.event.wait(1)
+        assert [key for key, _, _ in recorder.done] == ["d3"]
+    finally:
+        worker.stop()
+
+
+def test_failures_are_counted_and_worker_continues():
+    calls = []
+
+    def process(key, text, cancel):
+        calls.append(key)
+        if key == "malo":
+            raise RuntimeError("fallo del LLM")
+
+    worker = SpeculativeWorker(process, lambda: True, min_interval=0)
+    try:
+        worker.submit("malo", "x", cost=1)
+        worker.submit("bueno", "y", cost=1)
+        assert _wait_for(lambda: worker.get_stats()["completed"] == 1)
+        assert calls == ["malo", "bueno"] and worker.get_stats()["failed"] == 1
+    finally:
+        worker.stop()
+
+
+def test_deferred_job_is_requeued_without_spending_budget():
+    calls = []
+
+    def process(key, text, cancel):
+        calls.append(key)
+        if len(calls) == 1:
+            raise SpeculativeDeferred("sin hueco")
+
+    worker = SpeculativeWorker(process, lambda: True, min_interval=0, token_budget=100,
+                               poll_interval=0.02)
+    try:
+        worker.submit("d1", "uno", cost=60)
+        assert _wait_for(lambda: worker.get_stats()["completed"] == 1)
+        stats = worker.get_stats()
+        assert calls == ["d1", "d1"]
+        assert stats["deferred"] == 1 and stats["failed"] == 0 and stats["tokens_spent"] == 60
+    finally:
+        worker.stop()
+
+
+def test_preempted_job_is_cancelled_and_retried():
+    started = threading.Event()
+    calls = []
+
+    def process(key, text, cancel):
+        calls.append(key)
+        if len(calls) == 1:
+            started.set()
+            cancel.wait(5)
+            cancel.raise_if_cancelled()
+
+    worker = SpeculativeWorker(process, lambda: True, min_interval=0, poll_interval=0.02)
+    try:
+        worker.submit("d1", "uno", cost=10)
+        assert started.wait(1)
+        worker.preempt()
+        assert _wait_for(lambda: worker.get_stats()["completed"] == 1)
+        stats = worker.get_stats()
+        assert calls == ["d1", "d1"]
+        assert stats["preempted"] == 1 and stats["failed"] == 0 and stats["tokens_spent"] == 10
+    finally:
+        worker.stop()
+
+
+def test_stop_cancels_running_job():
+    started = threading.Event()
+    seen = []
+
+    def process(key, text, cancel):
+        started.set()
+        cancel.wait(5)
+        seen.append(cancel.cancelled)
+        cancel.raise_if_cancelled()
+
+    worker = SpeculativeWorker(process, lambda: True, min_interval=0)
+    worker.submit("d1", "uno", cost=1)
+    assert started.wait(1)
+    begun = time.monotonic()
+    worker.stop()
+    assert time.monotonic() - begun < 1 and seen == [True]
+    assert worker.get_stats()["preempted"] == 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
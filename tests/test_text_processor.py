@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Pruebas del procesador de texto con un cliente LLM simulado.
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.llm_cache import LLMResponseCache
+from utils.jobs import CancelToken, JobCancelled
+from utils.text_processor import TextProcessor, estimate_tokens, split_into_chunks
+
+
+class ScriptedCompletions:
+    """Imita client.chat.completions: responde con `replies` en orden"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        reply = self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+class StreamingCompletions(ScriptedCompletions):
+    """Con stream=True entrega la respuesta en fragmentos de `chunk` caracteres"""
+
+    def __init__(self, replies, chunk=4):
+        super().__init__(replies)
+        self.chunk = chunk
+        self.delivered = 0
+        self.closed = False
+
+    def create(self, stream=False, **params):
+        if not stream:
+            return super().create(**params)
+        self.calls.append(params)
+        reply = self.replies.pop(0)
+        return self._chunks(reply)
+
+    def _chunks(self, reply):
+        try:
+            for i in range(0, len(reply), self.chunk):
+                self.delivered += 1
+                delta = SimpleNamespace(content=reply[i:i + self.chunk])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        finally:
+            self.closed = True
+
+
+def _processor(replies, cache=None):
+    processor = TextProcessor(cache=cache)
+    completions = ScriptedCompletions(replies)
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return processor, completions
+
+
+def test_combined_mode_uses_a_single_call():
+    """Todas las salidas llegan en una sola respuesta JSON"""
+    reply = json.dumps({
+        "cleaned": "Hola, mundo.",
+        "summary": "Un saludo.",
+        "translation_en": "Hello, world.",
+        "tasks": ["Saludar"],
+    })
+    processor, completions = _processor([reply])
+    result = processor.process_combined("hola mundo", ["cleaned", "summary", "translation_en", "tasks"])
+
+    assert result == {"cleaned": "Hola, mundo.", "summary": "Un saludo.",
+                      "translation_en": "Hello, world.", "tasks": "- Saludar"}
+    assert len(completions.calls) == 1
+    assert completions.calls[0]["response_format"] == {"type": "json_object"}
+    assert completions.calls[0]["messages"][1]["content"].count("hola mundo") == 1
+
+
+def test_missing_field_falls_back_to_individual_call():
+    """Un campo ausente se pide con su llamada normal; el resto se conserva"""
+    reply = '```json\n{"summary": "Un saludo."}\n```'
+    processor, completions = _processor([reply, "Hello, world."])
+    result = processor.process_combined("hola mundo", ["summary", "translation_en"])
+
+    assert result == {"summary": "Un saludo.", "translation_en": "Hello, world."}
+    assert len(completions.calls) == 2
+    assert "response_format" not in completions.calls[1]
+
+
+def test_unparseable_reply_falls_back_for_every_field():
+    processor, completions = _processor(["no es json", "Un saludo.", "Hello, world."])
+    result = processor.process_combined("hola mundo", ["summary", "translation_en"])
+
+    assert result == {"summary": "Un saludo.", "translation_en": "Hello, world."}
+    assert len(completions.calls) == 3
+
+
+
+def test_repeated_request_is_served_from_cache():
+    """El mismo resumen del mismo texto no vuelve a llamar al proveedor"""
+    cache = LLMResponseCache()
+    processor, completions = _processor(["Un saludo."], cache=cache)
+
+    assert processor.improve_text("hola mundo", "summary") == "Un saludo."
+    assert processor.improve_text("hola mundo", "summary") == "Un saludo."
+    assert len(completions.calls) == 1
+    assert cache.get_stats()["hits"] == 1 and cache.get_stats()["hit_rate"] == 0.5
+
+
+def test_cache_key_separates_prompt_type_and_model():
+    cache = LLMResponseCache()
+    processor, completions = _processor(["Un saludo.", "- Saludar", "Otro resumen"], cache=cache)
+
+    processor.improve_text("hola mundo", "summary")
+    processor.improve_text("hola mundo", "tasks")
+    processor.model = "otro-modelo"
+    assert processor.improve_text("hola mundo", "summary") == "Otro resumen"
+    assert len(completions.calls) == 3
+
+
+def test_incomplete_combined_reply_is_not_cached():
+    """Una respuesta combinada a la que le faltan campos no se guarda"""
+    cache = LLMResponseCache()
+    processor, completions = _processor(['{"summary": "Un saludo."}', "Hello."], cache=cache)
+    processor.process_combined("hola", ["summary", "translation_en"])
+
+    reply = '{"summary": "Un saludo.", "translation_en": "Hello."}'
+    completions.replies = [reply]
+    processor.process_combined("hola", ["summary", "translation_en"])
+    processor.process_combined("hola", ["summary", "translation_en"])
+    assert len(completions.calls) == 3
+
+
+def test_disk_tier_survives_restart_and_expires(tmp_path, monkeypatch):
+    """El nivel SQLite sobrevive a un reinicio y respeta el TTL"""
+    db_path = str(tmp_path / "llm.sqlite3")
+    LLMResponseCache(db_path=db_path, ttl_seconds=60).put("clave", "respuesta")
+
+    restarted = LLMResponseCache(db_path=db_path, ttl_seconds=60)
+    assert restarted.get("clave") == "respuesta"
+    assert restarted.get_stats()["disk_hits"] == 1
+
+    import utils.llm_cache as llm_cache
+    later = llm_cache.time.time() + 120
+    monkeypatch.setattr(llm_cache.time, "time", lambda: later)
+    assert LLMResponseCache(db_path=db_path, ttl_seconds=60).get("clave") is None
+
+
+
+def _streaming_processor(replies, cache=None):
+    processor = TextProcessor(cache=cache)
+    completions = StreamingCompletions(replies)
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return processor, completions
+
+
+def test_stream_yields_fragments_and_assembles_text():
+    """Los fragmentos llegan segun se generan y `text` tiene la respuesta completa"""
+    cache = LLMResponseCache()
+    processor, completions = _streaming_processor(["Hola, mundo entero."], cache=cache)
+    stream = processor.improve_text_stream("hola mundo entero", "cleanup")
+
+    first = next(iter(stream))
+    assert first == "Hola" and completions.delivered == 1
+    assert first + "".join(stream) == "Hola, mundo entero."
+    assert stream.text == "Hola, mundo entero."
+
+    # La respuesta completa queda en cache para la version sin streaming
+    assert processor.improve_text("hola mundo entero", "cleanup") == "Hola, mundo entero."
+    assert len(completions.calls) == 1
+
+
+def test_cancelled_stream_closes_the_response():
+    processor, completions = _streaming_processor(["Una respuesta bastante larga."])
+    cancel = CancelToken()
+    stream = processor.translate_text_stream("hola", "en", cancel=cancel)
+
+    next(iter(stream))
+    cancel.cancel()
+    with pytest.raises(JobCancelled):
+        next(iter(stream))
+    assert completions.closed and completions.delivered == 2
+    assert stream.text is None
+
+
+
+class SummaryCompletions:
+    """Resume cada trozo como 'R<n>' anotando cuantas llamadas hay a la vez"""
+
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def create(self, **params):
+        prompt = params["messages"][1]["content"]
+        with self._lock:
+            self.calls.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+        if prompt.startswith("Resume de forma concisa esta parte"):
+            reply = "R" + prompt.split("(")[1].split(" ")[0]
+        else:
+            reply = "final: " + prompt.split("\n\n", 1)[1].replace("\n\n", "+")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+def _long_text(sentences: int) -> str:
+    return " ".join(f"Frase numero {i} del dictado con algo de contenido." for i in range(sentences))
+
+
+def test_chunks_respect_sentence_boundaries_and_budget():
+    text = _long_text(200)
+    chunks = split_into_chunks(text, 200)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_long_summary_is_map_reduced_in_parallel():
+    """Un texto largo se resume por trozos en paralelo y se combina en orden"""
+    processor = TextProcessor(summary_chunk_tokens=200, summary_workers=3)
+    completions = SummaryCompletions()
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    summary = processor.improve_text(_long_text(60), "summary")
+    parts = len(completions.calls) - 1
+    assert parts == len(split_into_chunks(_long_text(60), 200)) and parts > 3
+    assert summary == "final: " + "+".join(f"R{i}" for i in range(1, parts + 1))
+    assert completions.max_active == 3
+
+
+def test_map_phase_only_uses_free_admission_slots():
+    """Con control de admision, los trozos en paralelo no superan el limite del LLM"""
+    from utils.admission import AdmissionController
+
+    admission = AdmissionController({"llm": {"max_concurrent": 2, "max_queue": 4}})
+    processor = TextProcessor(summary_chunk_tokens=200, summary_workers=4,
+                              acquire_slot=lambda: admission.try_acquire("llm"))
+    completions = SummaryCompletions()
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    with admission.acquire("llm"):  # El hueco de la peticion
+        summary = processor.improve_text(_long_text(60), "summary")
+        assert admission.get_stats()["llm"]["active"] == 1
+    parts = len(completions.calls) - 1
+    assert summary == "final: " + "+".join(f"R{i}" for i in range(1, parts + 1))
+    assert completions.max_active == 2
+
+
+def test_replaced_llm_executor_is_shut_down():
+    """Al crecer el pool compartido, los hilos del anterior terminan"""
+    from utils import text_processor
+
+    small = text_processor._get_llm_executor(1)
+    assert small.submit(lambda: "hecho").result(1) == "hecho"
+    threads = list(small._threads)
+
+    larger = text_processor._get_llm_executor(text_processor._llm_executor_size + 1)
+    assert larger is not small
+    for thread in threads:
+        thread.join(2)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_short_summary_is_a_single_call():
+    processor = TextProcessor(summary_chunk_tokens=200)
+    completions = SummaryCompletions()
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    processor.improve_text("Una frase corta.", "summary")
+    assert len(completions.calls) == 1
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
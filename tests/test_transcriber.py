@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Pruebas del transcriptor (modelo Whisper simulado).
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.transcriber import Transcriber
+
+
+class ScriptedWhisperModel:
+    """
+    Modelo simulado: el idioma hablado cambia segun `spoken`; si se fuerza un
+    idioma distinto, los segmentos salen con avg_logprob muy bajo.
+    """
+
+    def __init__(self, spoken: str = "es"):
+        self.spoken = spoken
+        self.calls = []
+
+    def transcribe(self, audio, language=None, **kwargs):
+        self.calls.append(language)
+        logprob = -0.2 if language in (None, self.spoken) else -1.8
+        segments = iter([SimpleNamespace(text=" texto", start=0.0, end=1.0,
+                                         avg_logprob=logprob, no_speech_prob=0.01)])
+        info = SimpleNamespace(language=language or self.spoken,
+                               language_probability=1.0 if language else 0.95)
+        return segments, info
+
+
+def _audio(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(16000) * 0.1).astype(np.float32)
+
+
+def test_auto_language_is_detected_once():
+    """En modo auto el idioma se detecta una vez y se reutiliza"""
+    model = ScriptedWhisperModel("es")
+    transcriber = Transcriber(model, "base", language="auto")
+
+    for seed in range(4):
+        transcriber.transcribe(_audio(seed))
+
+    assert model.calls == [None, "es", "es", "es"]
+    assert transcriber.session.get_stats()["reused"] == 3
+
+
+def test_low_confidence_segment_triggers_redetection():
+    """Un segmento dudoso con el idioma fijado vuelve a detectar el idioma"""
+    model = ScriptedWhisperModel("es")
+    transcriber = Transcriber(model, "base", language="auto")
+    transcriber.transcribe(_audio(0))
+
+    model.spoken = "en"
+    result = transcriber.transcribe(_audio(1))
+    assert model.calls == [None, "es", None]
+    assert result.language == "en"
+
+    transcriber.transcribe(_audio(2))
+    assert model.calls[-1] == "en"
+
+
+def test_uncertain_detection_is_not_reused():
+    """Una deteccion por debajo de la confianza exigida no fija el idioma"""
+    model = ScriptedWhisperModel("es")
+    transcriber = Transcriber(model, "base", language="auto", language_confidence=0.99)
+
+    transcriber.transcribe(_audio(0))
+    transcriber.transcribe(_audio(1))
+    assert model.calls == [None, None]
+
+
+def test_sessions_are_independent():
+    """Cada cliente web tiene su propia sesion de idioma"""
+    model = ScriptedWhisperModel("es")
+    transcriber = Transcriber(model, "base", language="auto")
+    transcriber.transcribe(_audio(0))
+
+    other = transcriber.new_session()
+    transcriber.transcribe(_audio(1), session=other)
+    assert model.calls == [None, None]
+
+
+def test_fixed_language_never_detects():
+    """Con un idioma configurado no hay deteccion"""
+    model = ScriptedWhisperModel("es")
+    transcriber = Transcriber(model, "base", language="es")
+    transcriber.transcribe(_audio(0))
+    assert model.calls == ["es"]
+
+
+class FixedSegmentsModel:
+    """Modelo simulado que devuelve siempre los mismos segmentos"""
+
+    def __init__(self, segments):
+        self.segments = segments
+
+    def transcribe(self, audio, language=None, **kwargs):
+        segments = (SimpleNamespace(**s) for s in self.segments)
+        return segments, SimpleNamespace(language=language or "es", language_probability=0.9)
+
+
+def _segment(text, avg_logprob, no_speech_prob, start=0.0, end=1.0):
+    return dict(text=text, start=start, end=end, avg_logprob=avg_logprob, no_speech_prob=no_speech_prob)
+
+
+def test_noise_segments_are_dropped():
+    """Los segmentos inventados sobre ruido se descartan y se cuentan"""
+    model = FixedSegmentsModel([
+        _segment(" Hola a todos.", -0.3, 0.05, 0.0, 2.0),
+        _segment(" Subtitulos por la comunidad", -1.4, 0.9, 2.0, 4.0),
+    ])
+    transcriber = Transcriber(model, "base", language="es")
+    result = transcriber.transcribe(_audio(0))
+
+    assert result.text == "Hola a todos."
+    assert result.dropped_segments == 1 and transcriber.dropped_segments == 1
+    assert not result.low_confidence
+
+
+def test_redetection_counts_dropped_segments_once():
+    """Al volver a decodificar por idioma dudoso, el ruido descartado se cuenta una vez"""
+    model = FixedSegmentsModel([
+        _segment(" mmm eh", -1.6, 0.2, 0.0, 2.0),
+        _segment(" Subtitulos por la comunidad", -1.4, 0.9, 2.0, 4.0),
+    ])
+    transcriber = Transcriber(model, "base", language="auto")
+    transcriber.session.observe("es", 0.99)
+    result = transcriber.transcribe(_audio(0))
+
+    assert transcriber.session.get_stats()["detections"] == 2  # Hubo segunda decodificacion
+    assert result.dropped_segments == 1 and transcriber.dropped_segments == 1
+
+
+def test_low_confidence_text_is_flagged():
+    """Si lo que queda tiene avg_logprob bajo el resultado se marca como dudoso"""
+    model = FixedSegmentsModel([_segment(" mmm eh", -1.6, 0.2)])
+    result = Transcriber(model, "base", language="es").transcribe(_audio(0))
+
+    assert result.text == "mmm eh"
+    assert result.dropped_segments == 0 and result.low_confidence
+
+
+def test_filter_is_applied_to_cached_results():
+    """La cache guarda los segmentos sin filtrar: cambiar umbrales no la invalida"""
+    from utils.transcription_cache import TranscriptionCache
+
+    model = FixedSegmentsModel([_segment(" ruido", -1.2, 0.7)])
+    cache = TranscriptionCache()
+    assert Transcriber(model, "base", language="es", cache=cache).transcribe(_audio(0)).text == ""
+
+    lenient = Transcriber(model, "base", language="es", cache=cache, no_speech_threshold=0.8)
+    result = lenient.transcribe(_audio(0))
+    assert result.cached and result.text == "ruido"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
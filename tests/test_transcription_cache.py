@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la cache de transcripciones (modelo Whisper simulado).
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.transcriber import Transcriber
+from utils.transcription_cache import TranscriptionCache, audio_cache_key
+
+
+class FakeWhisperModel:
+    """Imita WhisperModel.transcribe: generador perezoso de segmentos + info"""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        segments = (SimpleNamespace(text=f" hola {i}", start=float(i), end=i + 1.0,
+                                    avg_logprob=-0.2, no_speech_prob=0.01) for i in range(2))
+        return segments, SimpleNamespace(language=kwargs.get("language") or "es",
+                                         language_probability=0.99)
+
+
+def _audio(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(16000) * 0.1).astype(np.float32)
+
+
+def test_repeated_audio_is_served_from_cache():
+    """El mismo audio no se vuelve a decodificar"""
+    model = FakeWhisperModel()
+    transcriber = Transcriber(model, "base", language="es", cache=TranscriptionCache())
+
+    first = transcriber.transcribe(_audio())
+    second = transcriber.transcribe(_audio())
+
+    assert len(model.calls) == 1
+    assert not first.cached and second.cached
+    assert second.text == first.text == "hola 0 hola 1"
+    assert second.segments == first.segments
+
+
+def test_key_depends_on_decode_parameters():
+    """Cambiar idioma o modelo invalida la entrada"""
+    pcm = (_audio() * 32767).astype(np.int16)
+    base = audio_cache_key(pcm, model="base", language="es", beam_size=5)
+
+    assert base == audio_cache_key(pcm.copy(), model="base", language="es", beam_size=5)
+    assert base != audio_cache_key(pcm, model="base", language="en", beam_size=5)
+    assert base != audio_cache_key(pcm, model="small", language="es", beam_size=5)
+    assert base != audio_cache_key(pcm[:-1], model="base", language="es", beam_size=5)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Una cache nueva sobre el mismo directorio recupera los resultados"""
+    model = FakeWhisperModel()
+    Transcriber(model, "base", cache=TranscriptionCache(cache_dir=str(tmp_path))).transcribe(_audio())
+
+    cache = TranscriptionCache(cache_dir=str(tmp_path))
+    result = Transcriber(model, "base", cache=cache).transcribe(_audio())
+
+    assert len(model.calls) == 1
+    assert result.cached and cache.get_stats()["disk_hits"] == 1
+
+
+def test_memory_and_disk_tiers_are_bounded(tmp_path):
+    """El LRU en memoria y el directorio en disco respetan sus limites"""
+    value = {"text": "x" * 1000, "segments": []}
+    cache = TranscriptionCache(max_entries=2, cache_dir=str(tmp_path), max_disk_bytes=5000)
+    for i in range(10):
+        cache.put(f"{i:02d}clave", value)
+
+    assert cache.get_stats()["entries"] == 2
+    files = list(tmp_path.glob("*/*.json"))
+    assert sum(p.stat().st_size for p in files) <= 5000
+    assert (tmp_path / "09" / "09clave.json").exists()
+
+
+def test_overwrite_is_counted_once(tmp_path):
+    """Sobrescribir una clave no suma su tamano dos veces"""
+    cache = TranscriptionCache(cache_dir=str(tmp_path))
+    cache.put("aaclave", {"text": "x" * 100, "segments": []})
+    cache.put("aaclave", {"text": "x" * 100, "segments": []})
+
+    size = (tmp_path / "aa" / "aaclave.json").stat().st_size
+    assert cache.get_stats()["disk_bytes"] == size
+
+
+def test_discard_removes_both_tiers(tmp_path):
+    """Las claves de un resultado permiten borrarlo de memoria y de disco"""
+    cache = TranscriptionCache(cache_dir=str(tmp_path))
+    result = Transcriber(FakeWhisperModel(), "base", language="es", cache=cache).transcribe(_audio())
+    assert len(result.cache_keys) == 1
+
+    cache.discard(result.cache_keys)
+    assert list(tmp_path.glob("*/*.json")) == []
+    stats = cache.get_stats()
+    assert stats["entries"] == 0 and stats["disk_bytes"] == 0
+    assert cache.get(result.cache_keys[0]) is None
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
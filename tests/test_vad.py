@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los detectores de actividad de voz (VAD) con audio sintético.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 480  # 30 ms
+
+
+def _noise(seconds: float, level: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(SAMPLE_RATE * seconds)) * level).astype(np.float32)
+
+
+def _voice(seconds: float, level: float = 0.3) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    # Tono con armónicos modulado en amplitud (aproximación grosera a una vocal)
+    tone = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 720, 1440)))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (tone * envelope * level / 2).astype(np.float32)
+
+
+def test_noise_floor_tracks_background():
+    """El nivel de ruido converge al ruido de fondo y no sigue picos aislados"""
+    from utils.simple_vad import NoiseFloorEstimator
+
+    estimator = NoiseFloorEstimator()
+    for _ in range(200):
+        estimator.update(0.01)
+    assert abs(estimator.floor - 0.01) < 1e-3
+
+    estimator.update(0.5)
+    assert estimator.floor < 0.02
+
+
+def test_cascade_rejects_silence_with_energy_gate():
+    """En silencio, el filtro de energía descarta la mayoría de frames sin consultar webrtcvad"""
+    from utils.vad_detector import CascadeVADDetector
+
+    detector = CascadeVADDetector(SAMPLE_RATE, sensitivity=2)
+    audio = _noise(3.0, 0.001)
+    for i in range(0, len(audio) - FRAME_SIZE, FRAME_SIZE):
+        assert not detector.is_speech(audio[i:i + FRAME_SIZE])
+
+    stats = detector.get_stats()
+    assert stats['speech_frames'] == 0
+    assert stats['energy_rejected'] > stats['frames_total'] * 0.9
+
+
+def test_cascade_passes_loud_frames_to_webrtc():
+    """Los frames por encima del nivel de ruido llegan al segundo nivel"""
+    from utils.vad_detector import CascadeVADDetector
+
+    detector = CascadeVADDetector(SAMPLE_RATE, sensitivity=0)
+    audio = np.concatenate([_noise(1.0, 0.001), _voice(1.0)])
+    for i in range(0, len(audio) - FRAME_SIZE, FRAME_SIZE):
+        detector.is_speech(audio[i:i + FRAME_SIZE])
+
+    stats = detector.get_stats()
+    assert stats['frames_total'] - stats['energy_rejected'] >= int(SAMPLE_RATE / FRAME_SIZE) - 1
+
+
+def _feed(vad, audio: np.ndarray, block_size: int = 1024) -> list:
+    """Alimenta el VAD en bloques como lo hace el callback de audio"""
+    return [vad.process_frame(audio[i:i + block_size]) for i in range(0, len(audio), block_size)]
+
+
+def test_adaptive_threshold_follows_noise():
+    """En una sala ruidosa el umbral sube por encima del ruido de fondo"""
+    from utils import simple_vad
+
+    vad = simple_vad.RealTimeSimpleVAD(SAMPLE_RATE, sensitivity=0.005)
+    results = _feed(vad, _noise(3.0, 0.03))
+
+    assert vad.get_stats()['threshold'] > 0.03
+    assert not any(r.get('speech_ended') for r in results[-20:])
+
+
+def test_sparse_segment_is_rejected():
+    """Un segmento con muy pocos frames de voz no llega a transcripción"""
+    from utils import simple_vad
+
+    vad = simple_vad.RealTimeSimpleVAD(SAMPLE_RATE, sensitivity=0.01, min_speech_duration=0.3,
+                                       min_silence_duration=0.5, min_speech_ratio=0.5)
+    # Chasquidos aislados separados por silencios cortos
+    click = _voice(0.03, level=0.5)
+    gap = _noise(0.3, 0.001)
+    audio = np.concatenate([_noise(1.0, 0.001)] + [click, gap] * 4 + [_noise(1.0, 0.001)])
+    results = _feed(vad, audio)
+
+    assert not any(r.get('speech_ended') for r in results)
+    assert any(r.get('segment_rejected') for r in results)
+    assert vad.get_stats()['suppressed_segments'] == 1
+
+
+def test_continuous_speech_is_accepted():
+    """Un segmento de voz continuo se entrega como fin de voz"""
+    from utils import simple_vad
+
+    vad = simple_vad.RealTimeSimpleVAD(SAMPLE_RATE, sensitivity=0.01, min_silence_duration=0.5)
+    audio = np.concatenate([_noise(1.0, 0.001), _voice(1.5), _noise(1.0, 0.001)])
+    results = _feed(vad, audio)
+
+    ended = [r for r in results if r.get('speech_ended')]
+    assert len(ended) == 1
+    assert vad.get_stats()['suppressed_segments'] == 0
+
+    # Las posiciones del segmento son absolutas y corresponden a la voz
+    assert abs(ended[0]['speech_start_sample'] - SAMPLE_RATE) <= FRAME_SIZE
+    assert abs(ended[0]['speech_end_sample'] - int(2.5 * SAMPLE_RATE)) <= FRAME_SIZE
+
+
+def test_long_continuous_speech_is_one_segment():
+    """20 s de voz sin pausas no elevan el umbral hasta tomarla por silencio"""
+    from utils import simple_vad
+
+    vad = simple_vad.RealTimeSimpleVAD(SAMPLE_RATE, sensitivity=0.01, min_silence_duration=0.5)
+    audio = np.concatenate([_noise(1.0, 0.001), _voice(20.0), _noise(1.0, 0.001)])
+    ended = [r for r in _feed(vad, audio) if r.get('speech_ended')]
+
+    assert len(ended) == 1
+    assert abs(ended[0]['speech_start_sample'] - SAMPLE_RATE) <= FRAME_SIZE
+    assert abs(ended[0]['speech_end_sample'] - 21 * SAMPLE_RATE) <= FRAME_SIZE
+
+
+def test_realtime_vad_consumes_whole_blocks():
+    """El VAD analiza todos los frames de cada bloque sin acumular retraso"""
+    from utils.vad_detector import RealTimeVAD
+
+    vad = RealTimeVAD(SAMPLE_RATE, sensitivity=2)
+    audio = _noise(2.0, 0.001)
+    _feed(vad, audio)
+
+    assert len(vad.audio_buffer) < FRAME_SIZE
+    assert vad.samples_processed + len(vad.audio_buffer) == len(audio)
+
+
+def test_long_utterance_is_force_cut_without_gaps():
+    """Una frase sin pausas se corta en trozos contiguos de longitud acotada"""
+    from utils.simple_vad import RealTimeSimpleVAD
+
+    vad = RealTimeSimpleVAD(SAMPLE_RATE, sensitivity=0.01, min_silence_duration=0.5,
+                            max_utterance_duration=2.0, cut_search_window=0.5)
+    audio = np.concatenate([_noise(0.5, 0.001), _voice(7.0), _noise(1.0, 0.001)])
+    events = [r for r in _feed(vad, audio) if r.get('speech_ended')]
+
+    assert len(events) >= 4
+    assert all(e.get('forced_cut') for e in events[:-1])
+    assert not events[-1].get('forced_cut') and events[-1]['continued']
+    for previous, current in zip(events, events[1:]):
+        assert current['speech_start_sample'] == previous['speech_end_sample']
+    for event in events[:-1]:
+        length = event['speech_end_sample'] - event['speech_start_sample']
+        assert 1.5 * SAMPLE_RATE - FRAME_SIZE <= length <= 2.0 * SAMPLE_RATE
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
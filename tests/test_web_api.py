@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la API del servidor web con el cliente de pruebas de Flask
+(modelo Whisper simulado, sin microfono).
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils.audio_buffer import AudioSegmentBuffer
+from utils.transcriber import Transcriber
+
+SAMPLE_RATE = 16000
+
+
+class LazyWhisperModel:
+    """Genera los segmentos de forma perezosa, como faster-whisper"""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.decoded = 0
+
+    def transcribe(self, audio, **kwargs):
+        def segments():
+            for i, text in enumerate(self.texts):
+                self.decoded += 1
+                yield SimpleNamespace(text=" " + text, start=i * 30.0, end=i * 30.0 + 5.0,
+                                      avg_logprob=-0.2, no_speech_prob=0.01)
+        return segments(), SimpleNamespace(language="es", language_probability=0.99)
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    import web_server
+
+    # Caches y dictados en un directorio temporal, no en el del repositorio
+    tmp = tmp_path_factory.mktemp("web")
+    snapshot = web_server.config._snapshot
+    web_server.config._snapshot = snapshot._replace(
+        llm_cache_path=str(tmp / "llm_responses.sqlite3"),
+        transcription_cache_dir=str(tmp / "transcriptions"),
+        output_dir=str(tmp / "output"),
+    )
+    try:
+        instance = web_server.WebDictationServer()
+        instance.audio_handler = None
+        instance._save_dictation = lambda text, duration: "dictado-prueba"
+        instance._cleanup_old_dictations = lambda: None
+        yield instance
+    finally:
+        web_server.config._snapshot = snapshot
+
+
+def _fake_recording(server, texts, seconds: float = 2.0):
+    """Deja el servidor como si acabara de grabar `seconds` de audio"""
+    model = LazyWhisperModel(texts)
+    server.transcriber = Transcriber(model, "base", language="es")
+    server._language_session = server.transcriber.session
+    server.audio_buffer = AudioSegmentBuffer(SAMPLE_RATE, pre_roll=0.0)
+    server.audio_buffer.append(np.full(int(SAMPLE_RATE * seconds), 0.1, dtype=np.float32))
+    server._chunk_futures = []
+    server._chunk_start = 0
+    server._current_use_llm = False
+    server._current_job = server.jobs.create('dictation')
+    server.is_recording = True
+    return model
+
+
+def test_stop_recording_stream_yields_segments_first(server):
+    """El endpoint NDJSON entrega cada segmento antes de decodificar el siguiente"""
+    model = _fake_recording(server, ["uno", "dos", "tres"])
+    response = server.app.test_client().post('/api/stop_recording/stream', json={})
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = response.response  # Iterador de la respuesta en streaming
+    first = json.loads(next(iter(lines)))
+    assert first == {'type': 'segment', 'text': 'uno', 'start': 0.0, 'end': 5.0}
+    assert model.decoded == 1
+
+    events = [first] + [json.loads(line) for line in lines]
+    assert [e['text'] for e in events if e['type'] == 'segment'] == ['uno', 'dos', 'tres']
+    assert events[-1]['type'] == 'result'
+    assert events[-1]['result']['original_text'] == 'uno dos tres'
+
+
+def test_stop_recording_keeps_json_response(server):
+    """/api/stop_recording sigue devolviendo un unico JSON"""
+    _fake_recording(server, ["hola"])
+    data = server.app.test_client().post('/api/stop_recording', json={}).get_json()
+    assert data['status'] == 'success'
+    assert data['result']['success'] and data['result']['original_text'] == 'hola'
+
+
+def test_client_disconnect_cancels_job(server):
+    """Si el cliente cierra la conexion a mitad, Whisper deja de decodificar"""
+    model = _fake_recording(server, ["uno", "dos", "tres", "cuatro"])
+    job = server._current_job
+    response = server.app.test_client().post('/api/stop_recording/stream', json={})
+
+    next(iter(response.response))
+    response.close()
+
+    assert job.status == 'cancelled' and job.token.reason == 'cliente desconectado'
+    assert model.decoded == 1
+
+
+def test_unread_stream_releases_whisper_slot(server):
+    """Si el cliente cierra el stream sin leer nada, el hueco de Whisper se libera"""
+    from werkzeug.test import EnvironBuilder
+
+    _fake_recording(server, ["hola"])
+    job = server._current_job
+    # Directamente por WSGI: el cliente de pruebas siempre lee el primer fragmento
+    environ = EnvironBuilder(path='/api/stop_recording/stream', method='POST', json={}).get_environ()
+    app_iter = server.app(environ, lambda status, headers, exc_info=None: None)
+    assert server.admission.get_stats()['whisper']['active'] == 1
+
+    app_iter.close()
+
+    assert server.admission.get_stats()['whisper']['active'] == 0
+    assert job.status == 'cancelled'
+
+
+def test_delete_job_cancels_transcription(server):
+    """DELETE /api/jobs/<id> cancela el trabajo en curso"""
+    model = _fake_recording(server, ["uno", "dos", "tres"])
+    client = server.app.test_client()
+    job_id = server._current_job.id
+    response = client.post('/api/stop_recording/stream', json={})
+    lines = iter(response.response)
+    next(lines)
+
+    deleted = client.delete(f'/api/jobs/{job_id}')
+    assert deleted.status_code == 200 and deleted.get_json()['job']['status'] == 'cancelled'
+
+    events = [json.loads(line) for line in lines]
+    assert events[-1]['result']['cancelled']
+    assert model.decoded == 1
+    assert client.get(f'/api/jobs/{job_id}').get_json()['job']['status'] == 'cancelled'
+
+
+def test_unknown_job_returns_404(server):
+    assert server.app.test_client().delete('/api/jobs/no-existe').status_code == 404
+
+
+def test_language_sessions_are_per_client_and_bounded(server, monkeypatch):
+    """El idioma se recuerda por id de cliente (no por IP) y solo para los ultimos clientes"""
+    import web_server
+
+    class FakeAudioHandler:
+        def start_recording(self, callback):
+            pass
+
+        def stop_recording(self):
+            pass
+
+    _fake_recording(server, ["hola"])
+    monkeypatch.setattr(server, 'audio_handler', FakeAudioHandler())
+    monkeypatch.setattr(server, '_language_sessions', web_server.OrderedDict())
+    monkeypatch.setattr(web_server, 'MAX_LANGUAGE_SESSIONS', 2)
+    client = server.app.test_client()
+
+    def start(client_id):
+        server.is_recording = False
+        assert client.post('/api/start_recording', json={'client_id': client_id}).status_code == 200
+        return server._language_session
+
+    first = start('navegador-a')
+    assert start('navegador-b') is not first
+    assert start('navegador-a') is first
+    start('navegador-c')
+    assert list(server._language_sessions) == ['navegador-a', 'navegador-c']
+
+    server._cancel_job(server._current_job.id, 'fin de la prueba')
+    server.is_recording = False
+
+
+def test_saturated_whisper_returns_429(server, monkeypatch):
+    """Con Whisper ocupado y la cola llena se responde 429 y la grabacion sigue"""
+    from utils.admission import AdmissionController
+
+    monkeypatch.setattr(server, 'admission', AdmissionController({
+        'whisper': {'max_concurrent': 1, 'max_queue': 0},
+        'llm': {'max_concurrent': 1, 'max_queue': 0},
+    }))
+    _fake_recording(server, ["hola"])
+    client = server.app.test_client()
+
+    busy = server.admission.acquire('whisper')
+    response = client.post('/api/stop_recording', json={})
+    assert response.status_code == 429 and int(response.headers['Retry-After']) >= 1
+    assert server.is_recording
+
+    busy.release()
+    data = client.post('/api/stop_recording', json={}).get_json()
+    assert data['result']['original_text'] == 'hola'
+
+    stats = client.get('/api/status').get_json()['admission']['whisper']
+    assert stats['rejected'] == 1 and stats['admitted'] == 2 and stats['active'] == 0
+
+
+
+class SlowTextProcessor:
+    """LLM simulado: cada operacion tarda `delays[op]` segundos (None = no responde)"""
+
+    def __init__(self, delays):
+        self.delays = delays
+
+    def is_available(self):
+        return True
+
+    def _answer(self, op, text, cancel):
+        delay = self.delays[op]
+        if cancel.wait(delay if delay is not None else 5):
+            cancel.raise_if_cancelled()
+        return f"{op}: {text}"
+
+    def improve_text(self, text, prompt_type="cleanup", cancel=None):
+        return self._answer(prompt_type, text, cancel)
+
+    def translate_text(self, text, target_lang="en", cancel=None):
+        return self._answer("translate", text, cancel)
+
+    def process_field(self, field, text, cancel=None):
+        if field == "translation_en":
+            return self.translate_text(text, "en", cancel=cancel)
+        return self.improve_text(text, field, cancel=cancel)
+
+
+def test_postprocess_runs_operations_concurrently(server, monkeypatch):
+    """Resumen y traduccion tardan lo que la mas lenta, no la suma"""
+    monkeypatch.setattr(server, 'text_processor', SlowTextProcessor({'summary': 0.3, 'translate': 0.3}))
+    monkeypatch.setattr(server, 'llm_combined', False)
+    started = time.monotonic()
+    data = server.app.test_client().post('/api/postprocess', json={
+        'text': 'hola', 'do_summary': True, 'do_translate_en': True}).get_json()
+
+    assert time.monotonic() - started < 0.55
+    assert data['result'] == {'summary': 'summary: hola', 'translation_en': 'translate: hola'}
+    assert 'errors' not in data
+
+
+def test_postprocess_returns_partial_results_on_timeout(server, monkeypatch):
+    """Si una operacion se agota se devuelve la otra y se informa del error"""
+    monkeypatch.setattr(server, 'text_processor', SlowTextProcessor({'summary': 0.0, 'translate': None}))
+    monkeypatch.setattr(server, 'llm_combined', False)
+    monkeypatch.setattr(server, 'postprocess_timeout', 0.2)
+    data = server.app.test_client().post('/api/postprocess', json={
+        'text': 'hola', 'do_summary': True, 'do_translate_en': True}).get_json()
+
+    assert data['result'] == {'summary': 'summary: hola', 'translation_en': None}
+    assert data['errors'] == {'translation_en': 'tiempo agotado'}
+
+    # La operacion agotada se cancela y devuelve su hueco de LLM
+    deadline = time.monotonic() + 1.0
+    while server.admission.get_stats()['llm']['active'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.admission.get_stats()['llm']['active'] == 0
+
+
+
+def test_postprocess_with_more_operations_than_llm_slots(server, monkeypatch):
+    """Con LLM_MAX_CONCURRENT=1, dos operaciones se hacen una tras otra sin 429"""
+    from utils.admission import AdmissionController
+
+    admission = AdmissionController({'llm': {'max_concurrent': 1, 'max_queue': 2},
+                                     'whisper': {'max_concurrent': 1, 'max_queue': 2}},
+                                    queue_timeout=3.0)
+    monkeypatch.setattr(server, 'admission', admission)
+    monkeypatch.setattr(server, 'text_processor', SlowTextProcessor({'summary': 0.05, 'translate': 0.05}))
+    monkeypatch.setattr(server, 'llm_combined', False)
+    client = server.app.test_client()
+
+    started = time.monotonic()
+    data = client.post('/api/postprocess', json={
+        'text': 'hola', 'do_summary': True, 'do_translate_en': True}).get_json()
+    assert time.monotonic() - started < 1.0
+    assert data['result'] == {'summary': 'summary: hola', 'translation_en': 'translate: hola'}
+
+    deadline = time.monotonic() + 1.0
+    while admission.get_stats()['llm']['active'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = admission.get_stats()['llm']
+    assert stats['active'] == 0 and stats['rejected'] == 0
+
+
+def test_postprocess_combined_mode_makes_one_call(server, monkeypatch):
+    """Con LLM_COMBINED varias salidas se piden en una sola llamada"""
+    calls = []
+
+    class CombinedProcessor(SlowTextProcessor):
+        def process_combined(self, text, fields, cancel=None):
+            calls.append(fields)
+            return {"summary": "resumen", "translation_en": None}
+
+    monkeypatch.setattr(server, 'text_processor', CombinedProcessor({}))
+    monkeypatch.setattr(server, 'llm_combined', True)
+    data = server.app.test_client().post('/api/postprocess', json={
+        'text': 'hola', 'do_summary': True, 'do_translate_en': True}).get_json()
+
+    assert calls == [['summary', 'translation_en']]
+    assert data['result'] == {'summary': 'resumen', 'translation_en': None}
+    assert data['errors'] == {'translation_en': 'sin respuesta del LLM'}
+
+
+
+def test_status_answers_while_streams_hold_every_llm_slot(server, monkeypatch):
+    """Con los huecos del LLM ocupados por streams y su cola llena, /api/status sigue respondiendo"""
+    import threading
+    import urllib.request
+    import web_server
+    from utils.admission import AdmissionController
+
+    release = threading.Event()
+
+    class BlockingStream:
+        text = "fin"
+
+        def __iter__(self):
+            yield "inicio"
+            release.wait(5)
+
+    class StreamingProcessor(SlowTextProcessor):
+        cache = None
+
+        def process_field_stream(self, field, text, cancel=None):
+            return BlockingStream()
+
+    monkeypatch.setattr(server, 'admission', AdmissionController({
+        'whisper': {'max_concurrent': 1, 'max_queue': 0},
+        'llm': {'max_concurrent': 2, 'max_queue': 1},
+    }, queue_timeout=5.0))
+    monkeypatch.setattr(server, 'text_processor', StreamingProcessor({}))
+    monkeypatch.setattr(server, 'performance_budget', dict(server.performance_budget, web_threads=1))
+
+    http = web_server.PooledWSGIServer('127.0.0.1', 0, server.app, threads=server.http_threads())
+    threading.Thread(target=http.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{http.server_port}"
+
+    def open_stream():
+        request = urllib.request.Request(f"{base}/api/postprocess/stream", method='POST',
+                                         data=json.dumps({'text': 'hola', 'operation': 'summary'}).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            response.read()
+
+    streams = [threading.Thread(target=open_stream) for _ in range(3)]
+    try:
+        for stream in streams:
+            stream.start()
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            stats = server.admission.get_stats()['llm']
+            if stats['active'] == 2 and stats['waiting'] == 1:
+                break
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        with urllib.request.urlopen(f"{base}/api/status", timeout=2) as response:
+            assert response.status == 200
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+        for stream in streams:
+            stream.join(5)
+        http.shutdown()
+        http.server_close()
+
+
+def _streaming_text_processor(reply):
+    """TextProcessor real con un cliente que responde `reply` en fragmentos"""
+    from utils.text_processor import TextProcessor
+
+    def create(stream=False, **params):
+        pieces = [reply[i:i + 5] for i in range(0, len(reply), 5)]
+        return iter(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=p))]) for p in pieces)
+
+    processor = TextProcessor()
+    processor.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return processor
+
+
+def test_postprocess_stream_sends_sse_deltas(server, monkeypatch):
+    """/api/postprocess/stream entrega el resumen en eventos SSE"""
+    monkeypatch.setattr(server, 'text_processor', _streaming_text_processor("Un saludo breve."))
+    response = server.app.test_client().post('/api/postprocess/stream',
+                                             json={'text': 'hola', 'operation': 'summary'})
+    assert response.mimetype == 'text/event-stream'
+
+    messages = [m for m in response.get_data(as_text=True).split('\n\n') if m]
+    events = [(m.split('\n')[0][7:], json.loads(m.split('\n')[1][6:])) for m in messages]
+    assert ''.join(data['text'] for name, data in events if name == 'delta') == 'Un saludo breve.'
+    assert events[-1] == ('done', {'text': 'Un saludo breve.'})
+    assert server.admission.get_stats()['llm']['active'] == 0
+
+
+def test_stop_recording_stream_forwards_llm_fragments(server, monkeypatch):
+    """Con LLM, el NDJSON incluye los fragmentos del texto mejorado"""
+    import web_server
+
+    monkeypatch.setattr(web_server.config, '_snapshot', web_server.config._snapshot._replace(llm_enabled=True))
+    monkeypatch.setattr(server, 'text_processor', _streaming_text_processor("Hola, mundo."))
+    _fake_recording(server, ["hola mundo"])
+    server._current_use_llm = True
+    response = server.app.test_client().post('/api/stop_recording/stream', json={})
+
+    events = [json.loads(line) for line in response.response]
+    assert ''.join(e['text'] for e in events if e['type'] == 'llm') == 'Hola, mundo.'
+    assert events[-1]['result']['text'] == 'Hola, mundo.'
+
+
+
+def test_llm_deadline_returns_cleaned_text_and_attaches_later(server, monkeypatch):
+    """Si el LLM no llega a tiempo se entrega el texto limpio y el suyo se anade despues"""
+    import threading
+    import web_server
+
+    release = threading.Event()
+    processor = _streaming_text_processor("Hola, mundo.")
+    create = processor.client.chat.completions.create
+
+    def slow_create(**params):
+        release.wait(5)
+        return create(**params)
+
+    processor.client.chat.completions.create = slow_create
+    attached = threading.Event()
+    results = {}
+
+    def attach(dictation_id, future):
+        results[dictation_id] = future.result()
+        attached.set()
+
+    monkeypatch.setattr(web_server.config, '_snapshot', web_server.config._snapshot._replace(llm_enabled=True))
+    monkeypatch.setattr(server, 'text_processor', processor)
+    monkeypatch.setattr(server, 'llm_deadline', 0.1)
+    monkeypatch.setattr(server, '_attach_llm_result', attach)
+    _fake_recording(server, ["hola mundo"])
+    server._current_use_llm = True
+
+    started = time.monotonic()
+    data = server.app.test_client().post('/api/stop_recording', json={}).get_json()
+    assert time.monotonic() - started < 2
+    assert data['result']['text'] == 'Hola mundo' and data['result']['llm_pending']
+
+    release.set()
+    assert attached.wait(5)
+    assert results == {'dictado-prueba': 'Hola, mundo.'}
+
+
+
+def test_speculative_outputs_are_stored_and_served(server, monkeypatch):
+    """Las salidas calculadas en segundo plano se guardan en el dictado y se sirven sin LLM"""
+    from utils.speculative import SpeculativeWorker
+
+    processor = SlowTextProcessor({'summary': 0.0, 'translate': 0.0})
+    monkeypatch.setattr(server, 'text_processor', processor)
+    monkeypatch.setattr(server, 'llm_combined', False)
+    monkeypatch.setattr(server, 'speculative_fields', ['summary', 'translation_en'])
+    worker = SpeculativeWorker(server._speculate, server._llm_idle, min_interval=0)
+    monkeypatch.setattr(server, 'speculative', worker)
+    dictation_id = server.transcription_manager.add_transcription('texto especulativo')
+    dictation = server.transcription_manager.get_transcription(dictation_id)
+    try:
+        server._queue_speculative(dictation_id, 'texto especulativo')
+        deadline = time.monotonic() + 2
+        while worker.get_stats()['completed'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert dictation['metadata']['postprocess'] == {
+            'summary': 'summary: texto especulativo',
+            'translation_en': 'translate: texto especulativo',
+        }
+
+        # Sin LLM: solo puede responder lo guardado
+        monkeypatch.setattr(server, 'text_processor', None)
+        client = server.app.test_client()
+        data = client.post('/api/postprocess', json={
+            'text': 'texto especulativo', 'do_summary': True, 'do_translate_en': True}).get_json()
+        assert data['result'] == dictation['metadata']['postprocess']
+        assert data['precomputed'] == ['summary', 'translation_en']
+
+        response = client.post('/api/postprocess/stream', json={
+            'text': 'texto especulativo', 'operation': 'summary', 'dictation_id': dictation_id})
+        assert response.get_data(as_text=True).endswith(
+            'event: done\ndata: {"text": "summary: texto especulativo"}\n\n')
+    finally:
+        worker.stop()
+        server.transcription_manager.transcriptions.remove(dictation)
+
+
+def test_deleting_a_dictation_drops_its_speculative_job(server, monkeypatch):
+    """Un dictado borrado no se post-procesa despues"""
+    from utils.speculative import SpeculativeWorker
+
+    monkeypatch.setattr(server, 'text_processor', SlowTextProcessor({}))
+    worker = SpeculativeWorker(server._speculate, lambda: False)
+    monkeypatch.setattr(server, 'speculative', worker)
+    dictation_id = server.transcription_manager.add_transcription('dictado a borrar')
+    try:
+        server._queue_speculative(dictation_id, 'dictado a borrar')
+        assert worker.get_stats()['pending'] == 1
+
+        response = server.app.test_client().delete(f'/api/dictations/{dictation_id}')
+        assert response.status_code == 200
+        assert worker.get_stats()['pending'] == 0
+    finally:
+        worker.stop()
+
+
+def test_deleting_a_dictation_purges_its_cached_transcription(server, monkeypatch, tmp_path):
+    """El texto de un dictado borrado no queda en la cache de transcripciones"""
+    from utils.transcription_cache import TranscriptionCache
+
+    monkeypatch.delattr(server, '_save_dictation')  # El real, en el output_dir temporal
+    _fake_recording(server, ["secreto"])
+    cache = TranscriptionCache(cache_dir=str(tmp_path))
+    server.transcriber.cache = cache
+
+    client = server.app.test_client()
+    dictation_id = client.post('/api/stop_recording', json={}).get_json()['result']['dictation_id']
+    assert len(list(tmp_path.glob('*/*.json'))) == 1 and cache.get_stats()['entries'] == 1
+
+    assert client.delete(f'/api/dictations/{dictation_id}').status_code == 200
+    assert list(tmp_path.glob('*/*.json')) == []
+    stats = cache.get_stats()
+    assert stats['entries'] == 0 and stats['disk_bytes'] == 0
+
+
+def test_speculative_waits_while_recording(server, monkeypatch):
+    """Mientras se graba o el LLM esta ocupado no se lanza trabajo especulativo"""
+    monkeypatch.setattr(server, 'is_recording', True)
+    assert not server._llm_idle()
+    monkeypatch.setattr(server, 'is_recording', False)
+    assert server._llm_idle()
+    with server.admission.acquire('llm'):
+        assert not server._llm_idle()
+
+
+def test_speculative_defers_while_llm_slots_are_taken(server, monkeypatch):
+    """Sin hueco libre el trabajo especulativo no espera en la cola ni gasta presupuesto"""
+    from utils.speculative import SpeculativeWorker
+    from utils.text_processor import estimate_tokens
+
+    monkeypatch.setattr(server, 'text_processor', SlowTextProcessor({'summary': 0.0}))
+    monkeypatch.setattr(server, 'speculative_fields', ['summary'])
+    worker = SpeculativeWorker(server._speculate, lambda: True, min_interval=0, poll_interval=0.02)
+    monkeypatch.setattr(server, 'speculative', worker)
+    dictation_id = server.transcription_manager.add_transcription('texto aplazado')
+    dictation = server.transcription_manager.get_transcription(dictation_id)
+    busy = server.admission.acquire('llm', count=server.admission.resources['llm'].max_concurrent)
+    try:
+        server._queue_speculative(dictation_id, 'texto aplazado')
+        deadline = time.monotonic() + 2
+        while worker.get_stats()['deferred'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = worker.get_stats()
+        assert stats['deferred'] >= 1 and stats['completed'] == 0 and stats['failed'] == 0
+        assert server.admission.get_stats()['llm']['waiting'] == 0
+
+        busy.release()
+        deadline = time.monotonic() + 2
+        while worker.get_stats()['completed'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert dictation['metadata']['postprocess'] == {'summary': 'summary: texto aplazado'}
+        # Solo se cobra el intento que llego a hacerse
+        assert worker.get_stats()['tokens_spent'] == estimate_tokens('texto aplazado') * 2
+    finally:
+        busy.release()
+        worker.stop()
+        server.transcription_manager.transcriptions.remove(dictation)
+
+
+def test_interactive_postprocess_preempts_speculative_call(server, monkeypatch):
+    """Una peticion del usuario cancela la llamada especulativa en curso y la reencola"""
+    from utils.admission import AdmissionController
+    from utils.speculative import SpeculativeWorker
+
+    admission = AdmissionController({'llm': {'max_concurrent': 1, 'max_queue': 2},
+                                     'whisper': {'max_concurrent': 1, 'max_queue': 2}},
+                                    queue_timeout=3.0)
+    monkeypatch.setattr(server, 'admission', admission)
+    processor = SlowTextProcessor({'summary': None})
+    monkeypatch.setattr(server, 'text_processor', processor)
+    monkeypatch.setattr(server, 'llm_combined', False)
+    monkeypatch.setattr(server, 'speculative_fields', ['summary'])
+    worker = SpeculativeWorker(server._speculate, server._llm_idle, min_interval=0, poll_interval=0.02)
+    monkeypatch.setattr(server, 'speculative', worker)
+    dictation_id = server.transcription_manager.add_transcription('texto largo')
+    dictation = server.transcription_manager.get_transcription(dictation_id)
+    try:
+        server._queue_speculative(dictation_id, 'texto largo')
+        deadline = time.monotonic() + 2
+        while admission.get_stats()['llm']['active'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert admission.get_stats()['llm']['active'] == 1
+
+        processor.delays['summary'] = 0.0
+        started = time.monotonic()
+        data = server.app.test_client().post('/api/postprocess', json={
+            'text': 'otra cosa', 'do_summary': True}).get_json()
+        assert time.monotonic() - started < 1.0
+        assert data['result']['summary'] == 'summary: otra cosa'
+
+        # El trabajo desplazado vuelve a la cola y se completa despues
+        deadline = time.monotonic() + 2
+        while worker.get_stats()['completed'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = worker.get_stats()
+        assert stats['preempted'] == 1 and stats['failed'] == 0
+        assert dictation['metadata']['postprocess'] == {'summary': 'summary: texto largo'}
+    finally:
+        worker.stop()
+        server.transcription_manager.transcriptions.remove(dictation)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la calibración de Whisper en CPU (con un benchmark simulado).
+"""
+
+import sys
+from pathlib import Path
+
+# Agregar directorios al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / "config"))
+sys.path.append(str(project_root / "utils"))
+
+from utils import whisper_tuning
+
+
+def test_picks_fastest_and_caches(tmp_path, monkeypatch):
+    """Se elige la combinación más rápida y no se vuelve a medir"""
+    monkeypatch.setattr(whisper_tuning, "supported_compute_types", lambda: ["int8", "int16", "float32"])
+    speed = {"int8": 1.0, "int16": 0.8, "float32": 2.0}
+    calls = []
+
+    def fake_benchmark(compute_type, threads):
+        calls.append((compute_type, threads))
+        # Con 8 hilos hay contención: 6 hilos es algo más rápido
+        return speed[compute_type] * (0.9 if threads == 6 else 1.0)
+
+    cache = tmp_path / "tuning.json"
+    result = whisper_tuning.tune_cpu_settings("base", 8, str(cache), benchmark=fake_benchmark)
+    assert result["compute_type"] == "int16"
+    assert result["cpu_threads"] == 6
+    assert cache.exists()
+
+    measured = len(calls)
+    again = whisper_tuning.tune_cpu_settings("base", 8, str(cache), benchmark=fake_benchmark)
+    assert len(calls) == measured
+    assert again["compute_type"] == "int16"
+
+
+def test_cache_is_keyed_by_model_and_thread_limit(tmp_path, monkeypatch):
+    """Otro modelo u otro límite de hilos se calibra por separado"""
+    monkeypatch.setattr(whisper_tuning, "supported_compute_types", lambda: ["int8"])
+    calls = []
+
+    def fake_benchmark(compute_type, threads):
+        calls.append((compute_type, threads))
+        return 1.0 / threads
+
+    cache = tmp_path / "tuning.json"
+    for model, threads in (("base", 4), ("small", 4), ("base", 2)):
+        before = len(calls)
+        whisper_tuning.tune_cpu_settings(model, threads, str(cache), benchmark=fake_benchmark)
+        assert len(calls) > before
+        assert all(t <= threads for _, t in calls[before:])
+
+
+def test_calibration_clip_is_deterministic():
+    """El clip de calibración es siempre el mismo"""
+    a = whisper_tuning.calibration_clip()
+    b = whisper_tuning.calibration_clip()
+    assert (a == b).all() and a.dtype.name == "float32"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Control de admision para el trabajo caro del servidor (decodificaciones de
+Whisper y llamadas al LLM).
+
+Cada recurso tiene un limite de trabajos simultaneos y una cola de espera
+acotada. Lo que no cabe en la cola se rechaza al momento con una estimacion
+de cuando volver a intentarlo (Retry-After), en lugar de dejar que todas las
+peticiones compitan por la CPU y la latencia se dispare para todos.
+"""
+
+from typing import Dict, Optional
+import math
+import threading
+import time
+
+from .jobs import CancelToken
+
+
+class AdmissionRejected(Exception):
+    """No hay hueco ni sitio en la cola del recurso."""
+
+    def __init__(self, resource: str, retry_after: int):
+        super().__init__(f"'{resource}' saturado; reintentar en {retry_after}s")
+        self.resource = resource
+        self.retry_after = retry_after
+
+
+class Slot:
+    """Hueco (o varios) concedido en un recurso; se libera una sola vez."""
+
+    def __init__(self, limiter: "ResourceLimiter", wait_seconds: float, count: int = 1):
+        self._limiter = limiter
+        self._acquired_at = time.monotonic()
+        self._released = False
+        self.wait_seconds = wait_seconds
+        self.count = count
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release(time.monotonic() - self._acquired_at, self.count)
+
+    def __enter__(self) -> "Slot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class ResourceLimiter:
+    """Limite de concurrencia con cola de espera acotada para un recurso."""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 queue_timeout: float = 30.0):
+        """
+        Args:
+            name: Nombre del recurso (para errores y estadisticas)
+            max_concurrent: Trabajos simultaneos permitidos
+            max_queue: Peticiones que pueden esperar; el resto recibe 429
+            queue_timeout: Espera maxima en cola antes de rechazar
+        """
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_avg: Optional[float] = None  # Duracion media de un trabajo (EWMA)
+
+    def acquire(self, cancel: Optional[CancelToken] = None,
+                enforce_queue_limit: bool = True, count: int = 1) -> Slot:
+        """
+        Espera un hueco en el recurso.
+
+        Args:
+            cancel: Senal de cancelacion; se deja la cola si se cancela
+            enforce_queue_limit: False para trabajo interno que no debe
+                                 rechazarse (solo espera su turno)
+            count: Huecos que se toman de una vez (como mucho max_concurrent);
+                   se conceden todos juntos, asi que dos peticiones no pueden
+                   quedarse cada una con una parte y bloquearse entre si
+
+        Raises:
+            AdmissionRejected: si la cola esta llena o se agota la espera
+            JobCancelled: si se cancela mientras espera
+        """
+        count = min(max(1, int(count)), self.max_concurrent)
+        start = time.monotonic()
+        with self._cond:
+            if self.active + count > self.max_concurrent or self.waiting:
+                if enforce_queue_limit and self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise AdmissionRejected(self.name, self._retry_after())
+                self.waiting += 1
+                try:
+                    self._wait_for_slot(start, cancel, enforce_queue_limit, count)
+                finally:
+                    self.waiting -= 1
+            self.active += count
+            self.admitted += 1
+            waited = time.monotonic() - start
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return Slot(self, waited, count)
+
+    def try_acquire(self) -> Optional[Slot]:
+        """Toma un hueco solo si esta libre y nadie espera (None si no)."""
+        with self._cond:
+            if self.active >= self.max_concurrent or self.waiting:
+                return None
+            self.active += 1
+            self.admitted += 1
+        return Slot(self, 0.0)
+
+    def _wait_for_slot(self, start: float, cancel: Optional[CancelToken],
+                       enforce_timeout: bool, count: int = 1) -> None:
+        deadline = start + self.queue_timeout if enforce_timeout else None
+        while self.active + count > self.max_concurrent:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            timeout = 0.1 if cancel is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise AdmissionRejected(self.name, self._retry_after())
+                timeout = min(timeout, remaining) if timeout else remaining
+            self._cond.wait(timeout)
+
+    def _release(self, held_seconds: float, count: int = 1) -> None:
+        with self._cond:
+            self.active -= count
+            if self._hold_avg is None:
+                self._hold_avg = held_seconds
+            else:
+                self._hold_avg = 0.8 * self._hold_avg + 0.2 * held_seconds
+            self._cond.notify_all()
+
+    def _retry_after(self) -> int:
+        """Segundos estimados hasta que haya hueco para una peticion nueva."""
+        hold = self._hold_avg if self._hold_avg is not None else 1.0
+        return max(1, int(math.ceil(hold * (self.waiting + 1) / self.max_concurrent)))
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "queue_wait_avg_ms": round(1000 * self._wait_total / self.admitted, 1) if self.admitted else 0.0,
+                "queue_wait_max_ms": round(1000 * self._wait_max, 1),
+            }
+
+
+class AdmissionController:
+    """Conjunto de limitadores por recurso ('whisper', 'llm'...)."""
+
+    def __init__(self, limits: Dict[str, Dict], queue_timeout: float = 30.0):
+        """
+        Args:
+            limits: {recurso: {'max_concurrent': n, 'max_queue': m}}
+            queue_timeout: Espera maxima en cola
+        """
+        self.resources = {
+            name: ResourceLimiter(name, limit["max_concurrent"], limit["max_queue"], queue_timeout)
+            for name, limit in limits.items()
+        }
+
+    def acquire(self, resource: str, cancel: Optional[CancelToken] = None,
+                enforce_queue_limit: bool = True, count: int = 1) -> Slot:
+        return self.resources[resource].acquire(cancel, enforce_queue_limit, count)
+
+    def try_acquire(self, resource: str) -> Optional[Slot]:
+        return self.resources[resource].try_acquire()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        return {name: limiter.get_stats() for name, limiter in self.resources.items()}
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Buffer de captura con pre-roll para extraer segmentos de voz sin copias.
+Las posiciones son absolutas (samples desde el inicio de la captura), las
+mismas que reporta el VAD en tiempo real.
+"""
+
+import numpy as np
+
+
+class AudioSegmentBuffer:
+    """
+    Buffer lineal preasignado que conserva solo el audio aun necesario:
+    en reposo, los ultimos `pre_roll` segundos; durante una frase, todo el
+    audio desde su inicio. Los segmentos se devuelven como vistas de numpy.
+    """
+
+    def __init__(self, sample_rate: int = 16000, pre_roll: float = 0.3,
+                 capacity_seconds: float = 30.0, retain_margin: float = 0.1):
+        """
+        Inicializa el buffer.
+
+        Args:
+            sample_rate: Frecuencia de muestreo
+            pre_roll: Segundos de audio a conservar antes del inicio de voz
+            capacity_seconds: Capacidad inicial (crece si una frase no cabe)
+            retain_margin: Margen extra retenido para cubrir la latencia del VAD
+        """
+        self.sample_rate = sample_rate
+        self.pre_roll_samples = int(pre_roll * sample_rate)
+        self.retain_samples = self.pre_roll_samples + int(retain_margin * sample_rate)
+
+        self._data = np.zeros(max(int(capacity_seconds * sample_rate), self.retain_samples * 2),
+                              dtype=np.float32)
+        self._base = 0      # Posicion absoluta de self._data[0]
+        self._length = 0    # Samples validos en self._data
+        self._keep_from = 0  # Posicion absoluta a partir de la cual no se puede descartar
+
+    @property
+    def start_sample(self) -> int:
+        """Posicion absoluta del sample mas antiguo disponible."""
+        return max(self._base, self._keep_from)
+
+    @property
+    def total_samples(self) -> int:
+        """Posicion absoluta del siguiente sample a escribir."""
+        return self._base + self._length
+
+    def __len__(self) -> int:
+        return self.total_samples - self.start_sample
+
+    def append(self, block: np.ndarray) -> None:
+        """Anade un bloque de audio al final del buffer."""
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        n = len(block)
+        if self._length + n > len(self._data):
+            self._make_room(n)
+        self._data[self._length:self._length + n] = block
+        self._length += n
+
+    def segment(self, start: int, end: int) -> np.ndarray:
+        """
+        Devuelve el audio entre dos posiciones absolutas como vista (sin copia).
+
+        La vista es valida hasta la siguiente llamada a append(); los limites
+        se ajustan al audio disponible.
+        """
+        start = max(start, self.start_sample)
+        end = min(end, self.total_samples)
+        if end <= start:
+            return self._data[:0]
+        return self._data[start - self._base:end - self._base]
+
+    def quietest_point(self, start: int, end: int, frame_size: int = 480) -> int:
+        """
+        Busca el frame de menor energia entre dos posiciones absolutas.
+
+        Returns:
+            Posicion absoluta del centro de ese frame (o `end` si no hay
+            audio suficiente para un frame)
+        """
+        audio = self.segment(start, end)
+        n_frames = len(audio) // frame_size
+        if n_frames == 0:
+            return min(end, self.total_samples)
+        frames = audio[:n_frames * frame_size].reshape(n_frames, frame_size)
+        energies = np.einsum('ij,ij->i', frames, frames)
+        start = max(start, self.start_sample)
+        return start + int(np.argmin(energies)) * frame_size + frame_size // 2
+
+    def release(self, upto: int) -> None:
+        """Permite descartar el audio anterior a `upto` (posicion absoluta)."""
+        self._keep_from = max(self._keep_from, min(upto, self.total_samples))
+
+    def retain_pre_roll(self) -> None:
+        """En reposo: permite descartar todo salvo el pre-roll mas reciente."""
+        self.release(self.total_samples - self.retain_samples)
+
+    def clear(self) -> None:
+        """Descarta todo el audio manteniendo las posiciones absolutas."""
+        self.release(self.total_samples)
+
+    def _make_room(self, needed: int) -> None:
+        """Compacta el audio retenido al inicio y, si no basta, amplia la capacidad."""
+        keep = self.start_sample
+        offset = keep - self._base
+        retained = self._length - offset
+        if retained + needed > len(self._data):
+            capacity = len(self._data)
+            while retained + needed > capacity:
+                capacity *= 2
+            data = np.zeros(capacity, dtype=np.float32)
+            data[:retained] = self._data[offset:self._length]
+            self._data = data
+        elif offset > 0:
+            self._data[:retained] = self._data[offset:self._length]
+        self._base = keep
+        self._length = retained
@@ -10,7 +10,6 @@ import time
 import wave
 
 import numpy as np
-import sounddevice as sd
 
 
 class AudioHandler:
@@ -42,6 +41,7 @@ class AudioHandler:
     def _check_devices(self):
         """Verifica los dispositivos de audio disponibles."""
         try:
+            import sounddevice as sd
             devices = sd.query_devices()
             print("Dispositivos de audio disponibles:")
             for i, device in enumerate(devices):
@@ -67,6 +67,7 @@ class AudioHandler:
         self.is_recording = True
 
         try:
+            import sounddevice as sd
             self.stream = sd.InputStream(
                 device=self.input_device,
                 channels=self.channels,
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor local compatible con la API de chat de OpenAI, para pruebas y
+mediciones sin red ni API key.
+
+Responde a POST /v1/chat/completions (con y sin streaming) y a GET /v1/models
+con latencia, variacion (jitter), tasa de errores y velocidad de generacion
+configurables. La respuesta repite el texto del prompt; si se pide un objeto
+JSON, devuelve ese texto en cada clave que enumere el prompt. Con una semilla
+los retardos y los errores son reproducibles.
+
+Uso:
+    python -m utils.fake_llm_server --port 8099 --latency 0.3 --jitter 0.1
+    # y en .env: LLM_BASE_URL=http://127.0.0.1:8099/v1
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+
+def _reply_for(params: Dict[str, Any]) -> str:
+    """Contenido de la respuesta: el texto del ultimo mensaje tras el prompt."""
+    messages = params.get("messages") or []
+    content = str(messages[-1].get("content", "")) if messages else ""
+    # Los prompts terminan en "<instruccion>\n\n<texto>" o "Texto:\n<texto>"
+    text = re.split(r"\n\n|Texto:\n", content)[-1].strip()
+    if (params.get("response_format") or {}).get("type") == "json_object":
+        keys = re.findall(r'^- "(\w+)":', content, re.MULTILINE)
+        return json.dumps({key: text for key in keys or ["text"]}, ensure_ascii=False)
+    return text
+
+
+def _tokens(text: str) -> List[str]:
+    """Trocea la respuesta en 'tokens' (palabras con su espacio)."""
+    return re.findall(r"\S+\s*|\s+", text) or [""]
+
+
+class FakeLLMServer:
+    """Servidor HTTP en un hilo; se usa con start()/stop() o como contexto."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.2,
+                 jitter: float = 0.05, error_rate: float = 0.0,
+                 tokens_per_second: float = 50.0, seed: Optional[int] = None):
+        """
+        Args:
+            host: Interfaz de escucha
+            port: Puerto (0 = uno libre)
+            latency: Segundos hasta el primer token
+            jitter: Variacion maxima (+/-) de la latencia, en segundos
+            error_rate: Proporcion de peticiones que responden 500 (0..1)
+            tokens_per_second: Velocidad de generacion (0 = instantanea)
+            seed: Semilla para que retardos y errores sean reproducibles
+        """
+        self.latency = max(0.0, float(latency))
+        self.jitter = max(0.0, float(jitter))
+        self.error_rate = min(1.0, max(0.0, float(error_rate)))
+        self.tokens_per_second = max(0.0, float(tokens_per_second))
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.streams = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        """Arranca el servidor en segundo plano y devuelve su URL base."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                            kwargs={"poll_interval": 0.05},
+                                            name="fake-llm", daemon=True)
+            self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "streams": self.streams,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def _plan(self) -> Dict[str, Any]:
+        """Sortea el retardo y si la peticion falla (con el lock, para reproducir)."""
+        with self._lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.error_rate
+            self.requests += 1
+            self.errors += int(fail)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return {"delay": max(0.0, delay), "fail": fail}
+
+    def _done(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [
+                        {"id": "fake-llm", "object": "model", "owned_by": "local"}
+                    ]})
+                else:
+                    self._send_json(404, {"error": {"message": "no encontrado", "type": "not_found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    params = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {"error": {"message": "JSON no valido", "type": "invalid_request_error"}})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "no encontrado", "type": "not_found"}})
+                    return
+
+                plan = server._plan()
+                try:
+                    time.sleep(plan["delay"])
+                    if plan["fail"]:
+                        self._send_json(500, {"error": {"message": "error simulado", "type": "server_error"}})
+                    elif params.get("stream"):
+                        self._stream(params)
+                    else:
+                        self._complete(params)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # El cliente abandono la peticion
+                finally:
+                    server._done()
+
+            def _complete(self, params):
+                content = _reply_for(params)
+                tokens = _tokens(content)
+                if server.tokens_per_second:
+                    time.sleep(len(tokens) / server.tokens_per_second)
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": params.get("model", "fake-llm"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens),
+                              "total_tokens": len(tokens)},
+                })
+
+            def _stream(self, params):
+                with server._lock:
+                    server.streams += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+                base = {"id": completion_id, "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": params.get("model", "fake-llm")}
+                for i, token in enumerate(_tokens(_reply_for(params))):
+                    if i and server.tokens_per_second:
+                        time.sleep(1.0 / server.tokens_per_second)
+                    delta = {"content": token} if i else {"role": "assistant", "content": token}
+                    self._write_event(dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+                self._write_event(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_event(self, data):
+                self._write_chunk(f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+            def _write_chunk(self, payload: bytes):
+                self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Linea de comandos: sirve hasta Ctrl+C."""
+    parser = argparse.ArgumentParser(description="Servidor LLM local compatible con OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.2, help="Segundos hasta el primer token")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Variacion maxima de la latencia")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporcion de respuestas 500")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0,
+                        help="Velocidad de generacion (0 = instantanea)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para reproducir retardos y errores")
+    args = parser.parse_args(argv)
+
+    server = FakeLLMServer(args.host, args.port, args.latency, args.jitter,
+                           args.error_rate, args.tokens_per_second, args.seed)
+    print(f"Servidor LLM local en {server.base_url} (usar como LLM_BASE_URL)")
+    try:
+        server.start()
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"Estadisticas: {server.get_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
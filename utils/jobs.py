@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trabajos cancelables (transcripcion y post-procesado de una grabacion).
+
+Cada trabajo lleva una senal de cancelacion que se comprueba entre segmento
+y segmento de Whisper y antes y durante las llamadas al LLM, de modo que al
+cancelar se deja de gastar CPU (y peticiones) en audio que ya no interesa.
+"""
+
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import threading
+import uuid
+
+
+class JobCancelled(Exception):
+    """El trabajo se cancelo antes de terminar."""
+
+
+class CancelToken:
+    """Senal de cancelacion compartida por las partes de un trabajo."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelado") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Espera hasta `timeout` segundos a la cancelacion; True si se cancelo."""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled(self.reason or "cancelado")
+
+
+class Job:
+    """Estado de un trabajo registrado."""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.token = CancelToken()
+        self.status = "running"
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "reason": self.token.reason,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobRegistry:
+    """Registro en memoria de los trabajos recientes."""
+
+    def __init__(self, max_finished: int = 50):
+        """
+        Args:
+            max_finished: Trabajos terminados que se conservan para consultas
+        """
+        self.max_finished = max_finished
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def create(self, kind: str) -> Job:
+        job = Job(kind)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status == "running"]
+
+    def cancel(self, job_id: str, reason: str = "cancelado") -> Optional[Job]:
+        """Cancela un trabajo en curso; devuelve el trabajo (o None si no existe)."""
+        job = self.get(job_id)
+        if job is not None and job.status == "running":
+            job.token.cancel(reason)
+            self.finish(job, "cancelled")
+        return job
+
+    def finish(self, job: Job, status: str = "done") -> None:
+        with self._lock:
+            if job.status == "running":
+                job.status = "cancelled" if job.token.cancelled else status
+                job.finished_at = datetime.now()
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if job.status != "running"]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
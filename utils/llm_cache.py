@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de respuestas del LLM.
+
+La clave combina proveedor, modelo, tipo de prompt, version de las plantillas,
+hash del texto y temperatura: pedir otra vez el resumen de un dictado ya
+resumido no vuelve a llamar al proveedor. Hay un LRU en memoria y, si se
+indica un fichero, un segundo nivel en SQLite; ambos con caducidad (TTL).
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def llm_cache_key(provider: str, model: str, prompt_type: str, template_version: int,
+                  text: str, temperature: float) -> str:
+    """Clave de cache para una peticion al LLM."""
+    text_hash = hashlib.blake2b(text.encode("utf-8"), digest_size=20).hexdigest()
+    params = [provider, model, prompt_type, template_version, text_hash, temperature]
+    return hashlib.blake2b(json.dumps(params).encode("utf-8"), digest_size=20).hexdigest()
+
+
+class LLMResponseCache:
+    """LRU en memoria con un segundo nivel opcional en SQLite, con TTL."""
+
+    def __init__(self, max_entries: int = 256, db_path: Optional[str] = None,
+                 ttl_seconds: float = 7 * 24 * 3600):
+        """
+        Args:
+            max_entries: Entradas en memoria
+            db_path: Fichero SQLite del nivel persistente (None para desactivarlo)
+            ttl_seconds: Antiguedad maxima de una respuesta guardada
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+                )
+                self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Aviso: cache de respuestas del LLM solo en memoria ({e})")
+                self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Devuelve la respuesta guardada para la clave, o None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._memory[key]
+
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM responses WHERE key = ? AND created >= ?",
+                        (key, now - self.ttl_seconds)
+                    ).fetchone()
+                except sqlite3.Error:
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Guarda una respuesta en ambos niveles."""
+        created = time.time()
+        with self._lock:
+            self._remember(key, value, created)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                        (key, value, created)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Aviso: no se pudo guardar en la cache del LLM: {e}")
+
+    def clear(self) -> None:
+        """Vacia ambos niveles."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Clientes HTTP del proveedor LLM compartidos por todo el proceso.
+
+Un cliente por (API key, URL base) con pool de conexiones keep-alive,
+timeouts explicitos de conexion y lectura y reintentos acotados (el SDK de
+OpenAI reintenta errores de red, 408, 409, 429 y 5xx con espera exponencial
+con jitter y respeta Retry-After). Al arrancar se puede precalentar la
+conexion para que la primera peticion no pague el handshake TLS.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import threading
+
+# URL base de cada proveedor cuando no se configura LLM_BASE_URL
+DEFAULT_BASE_URLS = {
+    "openrouter": "https://openrouter.ai/api/v1",
+    "openai": "https://api.openai.com/v1",
+}
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _load_openai():
+    """Importa el SDK de OpenAI solo cuando hace falta un cliente (LLM opcional)."""
+    try:
+        import openai  # type: ignore
+        return openai
+    except Exception:
+        return None
+
+
+def resolve_base_url(provider: str, base_url: Optional[str] = None) -> str:
+    """URL base efectiva: la configurada o la del proveedor."""
+    if base_url:
+        return base_url.rstrip("/")
+    return DEFAULT_BASE_URLS.get((provider or "openai").lower(), DEFAULT_BASE_URLS["openai"])
+
+
+def get_llm_client(api_key: str, provider: str = "openai", base_url: Optional[str] = None,
+                   max_connections: int = 10, keepalive_expiry: float = 60.0,
+                   connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                   max_retries: int = 2) -> Any:
+    """
+    Devuelve el cliente compartido para la API key y la URL base; lo crea
+    la primera vez.
+
+    Args:
+        api_key: API key del proveedor
+        provider: 'openai' u 'openrouter' (para la URL base por defecto)
+        base_url: URL base de una API compatible con OpenAI
+        max_connections: Conexiones simultaneas (y keep-alive) del pool
+        keepalive_expiry: Segundos que se conserva una conexion ociosa
+        connect_timeout: Tiempo maximo para abrir la conexion
+        read_timeout: Tiempo maximo entre bytes de la respuesta
+        max_retries: Reintentos ante errores transitorios
+
+    Raises:
+        ImportError: si el SDK de OpenAI no esta instalado
+    """
+    url = resolve_base_url(provider, base_url)
+    key = (api_key, url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+
+        openai = _load_openai()
+        if openai is None:
+            raise ImportError("el paquete 'openai' no esta instalado")
+        # Limits es la clase del cliente HTTP que usa el SDK instalado
+        limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        timeout = openai.Timeout(read_timeout, connect=connect_timeout)
+        client = openai.OpenAI(
+            api_key=api_key,
+            base_url=url,
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=openai.DefaultHttpxClient(limits=limits, timeout=timeout),
+        )
+        _clients[key] = client
+        return client
+
+
+def prewarm_llm_client(client: Any, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Abre una conexion con el proveedor (GET /models, sin coste) para que
+    quede en el pool keep-alive. Los errores se ignoran: solo es una
+    optimizacion.
+    """
+    def run():
+        try:
+            client.with_options(max_retries=0, timeout=10.0).models.list()
+        except Exception as e:
+            print(f"Aviso: no se pudo precalentar la conexion con el LLM: {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="llm-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def close_llm_clients() -> None:
+    """Cierra los clientes compartidos y sus conexiones."""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
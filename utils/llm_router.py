@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Enrutado de peticiones al LLM entre varios endpoints compatibles con OpenAI.
+
+Por cada endpoint se lleva una media movil exponencial (EWMA) de la latencia
+y de la tasa de errores; cada peticion va al endpoint sano mas rapido y, si
+falla, al siguiente. Opcionalmente, si el elegido no ha respondido cuando se
+alcanza su p95 de latencia, se lanza una copia (hedging) al siguiente y se
+usa la primera respuesta que llegue. En streaming la latencia es la de la
+cabecera de la respuesta y la copia que pierde se cierra.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+import threading
+import time
+
+
+def _close_result(future: Future) -> None:
+    """Cierra la respuesta de una copia descartada (libera su conexion)."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    close = getattr(future.result(), "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+class Endpoint:
+    """Un endpoint del LLM y sus estadisticas."""
+
+    def __init__(self, name: str, client: Any, model: str,
+                 extra_headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            name: Nombre del endpoint (para estadisticas)
+            client: Cliente compatible con OpenAI (client.chat.completions.create)
+            model: Modelo a pedir en este endpoint
+            extra_headers: Cabeceras adicionales propias del proveedor
+        """
+        self.name = name
+        self.client = client
+        self.model = model
+        self.extra_headers = extra_headers or {}
+        self.latency: Optional[float] = None  # EWMA en segundos
+        self.error_rate = 0.0  # EWMA de fallos (0..1)
+        self.latencies: Deque[float] = deque(maxlen=100)
+        self.calls = 0
+        self.errors = 0
+        self.hedges = 0
+        self.last_error = 0.0
+
+    def p95(self) -> Optional[float]:
+        """Percentil 95 de las ultimas latencias (None con pocas muestras)."""
+        if len(self.latencies) < 10:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+
+class LLMRouter:
+    """
+    Se usa como un cliente de OpenAI (`router.chat.completions.create(...)`),
+    asi que TextProcessor no distingue entre un proveedor y varios.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], hedge: bool = False, alpha: float = 0.2,
+                 error_threshold: float = 0.5, cooldown: float = 30.0):
+        """
+        Args:
+            endpoints: Endpoints disponibles (al menos uno)
+            hedge: Lanzar una copia de la peticion al alcanzar el p95
+            alpha: Peso de la ultima muestra en las medias moviles
+            error_threshold: Tasa de errores a partir de la cual un endpoint
+                             se considera caido
+            cooldown: Segundos tras el ultimo error para volver a probar un
+                      endpoint caido
+        """
+        if not endpoints:
+            raise ValueError("LLMRouter necesita al menos un endpoint")
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.alpha = alpha
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(endpoints) + 2,
+                                            thread_name_prefix="llm-router")
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints sanos de mas rapido a mas lento, seguidos de los caidos."""
+        now = time.monotonic()
+        with self._lock:
+            def healthy(endpoint: Endpoint) -> bool:
+                return (endpoint.error_rate < self.error_threshold
+                        or now - endpoint.last_error > self.cooldown)
+
+            # Sin latencia medida cuenta como 0: asi se prueba cada endpoint
+            by_latency = sorted(self.endpoints, key=lambda e: e.latency or 0.0)
+            return ([e for e in by_latency if healthy(e)]
+                    + [e for e in by_latency if not healthy(e)])
+
+    def create(self, **params: Any) -> Any:
+        """Equivalente a client.chat.completions.create, enrutado."""
+        candidates = self.ranked()
+        if self.hedge and len(candidates) > 1:
+            return self._hedged(candidates, params)
+
+        last_error: Optional[Exception] = None
+        for endpoint in candidates:
+            try:
+                return self._call(endpoint, params)
+            except Exception as e:
+                last_error = e
+                print(f"Aviso: fallo en el endpoint LLM '{endpoint.name}': {e}")
+        raise last_error  # type: ignore[misc]
+
+    def _hedged(self, candidates: List[Endpoint], params: Dict[str, Any]) -> Any:
+        """Lanza el primario y, si no responde antes de su p95, una copia al siguiente."""
+        primary = candidates[0]
+        pending = {self._executor.submit(self._call, primary, params): primary}
+        delay = primary.p95()
+        backups = iter(candidates[1:])
+        last_error: Optional[Exception] = None
+
+        while pending:
+            done, _ = wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                backup = next(backups, None)
+                if backup is not None:
+                    with self._lock:
+                        primary.hedges += 1
+                    pending[self._executor.submit(self._call, backup, params)] = backup
+                delay = None  # Solo una copia por espera
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                # Las copias que lleguen despues no se leen: cerrar sus streams
+                for loser in pending:
+                    loser.add_done_callback(_close_result)
+                return result
+            # Fallo sin respuestas pendientes: probar el siguiente
+            if not pending:
+                backup = next(backups, None)
+                if backup is not None:
+                    pending[self._executor.submit(self._call, backup, params)] = backup
+        raise last_error  # type: ignore[misc]
+
+    def _call(self, endpoint: Endpoint, params: Dict[str, Any]) -> Any:
+        request = dict(params, model=endpoint.model)
+        if endpoint.extra_headers:
+            request["extra_headers"] = {**endpoint.extra_headers, **params.get("extra_headers", {})}
+        start = time.monotonic()
+        try:
+            response = endpoint.client.chat.completions.create(**request)
+        except Exception:
+            self._record(endpoint, None)
+            raise
+        self._record(endpoint, time.monotonic() - start)
+        return response
+
+    def _record(self, endpoint: Endpoint, latency: Optional[float]) -> None:
+        with self._lock:
+            endpoint.calls += 1
+            failed = latency is None
+            endpoint.error_rate = (1 - self.alpha) * endpoint.error_rate + self.alpha * (1.0 if failed else 0.0)
+            if failed:
+                endpoint.errors += 1
+                endpoint.last_error = time.monotonic()
+                return
+            endpoint.latencies.append(latency)
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency = (1 - self.alpha) * endpoint.latency + self.alpha * latency
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            stats = {}
+            for endpoint in self.endpoints:
+                p95 = endpoint.p95()
+                stats[endpoint.name] = {
+                    "model": endpoint.model,
+                    "latency_ms": round(1000 * endpoint.latency, 1) if endpoint.latency is not None else None,
+                    "p95_ms": round(1000 * p95, 1) if p95 is not None else None,
+                    "error_rate": round(endpoint.error_rate, 3),
+                    "calls": endpoint.calls,
+                    "errors": endpoint.errors,
+                    "hedges": endpoint.hedges,
+                }
+            return stats
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacen local de modelos Whisper.
+
+Cada modelo se descarga una sola vez (`prefetch`) a un directorio propio y se
+anota en un manifiesto con el tamano y el SHA-256 de cada archivo. Al arrancar
+se carga siempre desde la ruta local, sin consultar el hub, y la integridad se
+comprueba con el tamano y la fecha de modificacion; el hash solo se recalcula
+para los archivos que han cambiado desde la ultima verificacion.
+
+Uso:
+    python -m utils.model_store prefetch base small
+    python -m utils.model_store verify
+    python -m utils.model_store list
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+MANIFEST_NAME = "manifest.json"
+
+# Bloque de lectura para el hash de archivos grandes (modelos de cientos de MB)
+_HASH_BLOCK = 4 * 1024 * 1024
+
+
+class ModelStoreError(Exception):
+    """El modelo no esta en el almacen o sus archivos no coinciden con el manifiesto."""
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download_with_faster_whisper(name: str, output_dir: str) -> str:
+    """Descarga el modelo del hub con la utilidad de faster-whisper."""
+    from faster_whisper.utils import download_model  # type: ignore
+    return download_model(name, output_dir=output_dir)
+
+
+class ModelStore:
+    """Directorio gestionado de modelos con manifiesto de tamanos y checksums."""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Directorio del almacen (se crea al descargar el primer modelo)
+        """
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST_NAME
+
+    def model_dir(self, name: str) -> Path:
+        """Directorio local de un modelo (los ids del hub 'org/modelo' se aplanan)."""
+        return self.root / name.replace("/", "--")
+
+    def entries(self) -> Dict[str, Dict]:
+        """Modelos registrados en el manifiesto."""
+        return self._load_manifest().get("models", {})
+
+    def has_model(self, name: str) -> bool:
+        return name in self.entries()
+
+    def prefetch(self, name: str,
+                 downloader: Optional[Callable[[str, str], str]] = None) -> Dict:
+        """
+        Descarga un modelo al almacen y lo registra en el manifiesto.
+
+        Args:
+            name: Nombre del modelo (tiny, base, ...) o id del hub
+            downloader: Funcion (nombre, directorio) -> ruta; por defecto la
+                        de faster-whisper
+
+        Returns:
+            Entrada del manifiesto del modelo
+        """
+        target = self.model_dir(name)
+        target.mkdir(parents=True, exist_ok=True)
+        (downloader or _download_with_faster_whisper)(name, str(target))
+
+        files: Dict[str, Dict] = {}
+        for path in sorted(target.rglob("*")):
+            relative = path.relative_to(target)
+            # Las caches y bloqueos del hub no forman parte del modelo
+            if not path.is_file() or any(part.startswith(".") for part in relative.parts):
+                continue
+            stat = path.stat()
+            files[relative.as_posix()] = {
+                "size": stat.st_size,
+                "sha256": _sha256(path),
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        if not files:
+            raise ModelStoreError(f"La descarga de '{name}' no produjo archivos")
+
+        entry = {
+            "path": target.relative_to(self.root).as_posix(),
+            "files": files,
+            "total_size": sum(f["size"] for f in files.values()),
+            "prefetched_at": datetime.now().isoformat(),
+        }
+        manifest = self._load_manifest()
+        manifest.setdefault("models", {})[name] = entry
+        self._save_manifest(manifest)
+        return entry
+
+    def local_path(self, name: str) -> str:
+        """
+        Ruta local de un modelo ya verificado, para cargarlo sin acceso a red.
+
+        Raises:
+            ModelStoreError: si el modelo no esta registrado o esta incompleto
+        """
+        problems = self.verify([name], full=False).get(name)
+        if problems:
+            raise ModelStoreError(f"Modelo '{name}' no disponible en {self.root}: {problems[0]}")
+        return str(self.model_dir(name))
+
+    def verify(self, names: Optional[Iterable[str]] = None,
+               full: bool = True) -> Dict[str, List[str]]:
+        """
+        Comprueba que los archivos de cada modelo coinciden con el manifiesto.
+
+        Args:
+            names: Modelos a comprobar (por defecto, todos los registrados)
+            full: Recalcular el hash de todos los archivos; si es False solo se
+                  recalcula para los que cambiaron de fecha desde la ultima
+                  verificacion
+
+        Returns:
+            Diccionario {modelo: [problemas]}; vacio si todo esta correcto
+        """
+        manifest = self._load_manifest()
+        models = manifest.get("models", {})
+        problems: Dict[str, List[str]] = {}
+        updated = False
+
+        for name in (list(names) if names is not None else list(models)):
+            entry = models.get(name)
+            if entry is None:
+                problems[name] = ["no esta en el manifiesto (ejecuta prefetch)"]
+                continue
+            base = self.root / entry["path"]
+            model_problems = []
+            for relative, expected in entry["files"].items():
+                path = base / relative
+                try:
+                    stat = path.stat()
+                except OSError:
+                    model_problems.append(f"falta {relative}")
+                    continue
+                if stat.st_size != expected["size"]:
+                    model_problems.append(f"tamano distinto en {relative}")
+                    continue
+                if not full and stat.st_mtime_ns == expected.get("mtime_ns"):
+                    continue
+                if _sha256(path) != expected["sha256"]:
+                    model_problems.append(f"checksum distinto en {relative}")
+                    continue
+                # Archivo integro: no volver a hashearlo mientras no cambie
+                if expected.get("mtime_ns") != stat.st_mtime_ns:
+                    expected["mtime_ns"] = stat.st_mtime_ns
+                    updated = True
+            if model_problems:
+                problems[name] = model_problems
+
+        if updated:
+            try:
+                self._save_manifest(manifest)
+            except OSError:
+                pass  # Almacen de solo lectura: se volvera a hashear la proxima vez
+        return problems
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"models": {}}
+
+    def _save_manifest(self, manifest: Dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Linea de comandos: prefetch, verify y list."""
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config.config import config  # type: ignore
+
+    parser = argparse.ArgumentParser(description="Almacen local de modelos Whisper")
+    parser.add_argument("--dir", default=config.whisper_model_dir,
+                        help="Directorio del almacen (WHISPER_MODEL_DIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    prefetch = sub.add_parser("prefetch", help="Descargar modelos al almacen")
+    prefetch.add_argument("models", nargs="*", help="Modelos (por defecto WHISPER_MODEL)")
+    verify = sub.add_parser("verify", help="Comprobar que el almacen contiene los modelos")
+    verify.add_argument("models", nargs="*", help="Modelos requeridos (por defecto, todos)")
+    verify.add_argument("--quick", action="store_true",
+                        help="Solo rehashear archivos modificados desde la ultima verificacion")
+    sub.add_parser("list", help="Listar los modelos del almacen")
+    args = parser.parse_args(argv)
+
+    store = ModelStore(args.dir)
+    if args.command == "prefetch":
+        for name in args.models or [config.whisper_model]:
+            print(f"Descargando '{name}' en {store.model_dir(name)}...")
+            entry = store.prefetch(name)
+            print(f"  {len(entry['files'])} archivos, {entry['total_size'] / 1e6:.1f} MB")
+        return 0
+
+    if args.command == "verify":
+        problems = store.verify(args.models or None, full=not args.quick)
+        if not args.models and not store.entries():
+            problems = {"(almacen)": [f"no hay modelos en {store.root}"]}
+        for name, issues in problems.items():
+            for issue in issues:
+                print(f"ERROR {name}: {issue}")
+        if not problems:
+            print("Almacen correcto")
+        return 1 if problems else 0
+
+    for name, entry in store.entries().items():
+        print(f"{name}: {entry['total_size'] / 1e6:.1f} MB ({len(entry['files'])} archivos, "
+              f"descargado {entry['prefetched_at']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,63 @@ Usa análisis de energía de audio para detectar voz.
 import numpy as np
 from typing import List, Tuple, Optional
 import collections
-import time
+
+
+class NoiseFloorEstimator:
+    """Estimador adaptativo del nivel de ruido de fondo (energía RMS)"""
+    
+    def __init__(self, initial_floor: Optional[float] = None,
+                 attack: float = 0.01, release: float = 0.1,
+                 min_floor: float = 1e-4):
+        """
+        Inicializa el estimador
+        
+        Args:
+            initial_floor: Nivel inicial (None para tomar el primer frame)
+            attack: Velocidad de subida del nivel (lenta, para no seguir a la voz)
+            release: Velocidad de bajada del nivel (rápida, ante silencio real)
+            min_floor: Nivel mínimo para evitar umbrales nulos en silencio digital
+        """
+        self.floor = initial_floor
+        self.attack = attack
+        self.release = release
+        self.min_floor = min_floor
+    
+    def update(self, energy: float) -> float:
+        """
+        Actualiza el nivel de ruido con la energía de un frame
+        
+        Args:
+            energy: Energía RMS del frame (solo de frames sin voz)
+            
+        Returns:
+            Nivel de ruido actualizado
+        """
+        if self.floor is None:
+            self.floor = max(energy, self.min_floor)
+        else:
+            rate = self.attack if energy > self.floor else self.release
+            self.floor = max(self.floor + (energy - self.floor) * rate, self.min_floor)
+        return self.floor
+    
+    def threshold(self, margin: float, minimum: float = 0.0) -> float:
+        """
+        Umbral de energía relativo al nivel de ruido
+        
+        Args:
+            margin: Factor multiplicativo sobre el nivel de ruido
+            minimum: Umbral absoluto mínimo
+            
+        Returns:
+            Umbral de energía
+        """
+        if self.floor is None:
+            return minimum
+        return max(self.floor * margin, minimum)
+    
+    def reset(self):
+        """Olvida el nivel de ruido estimado"""
+        self.floor = None
 
 
 class SimpleVADDetector:
@@ -45,11 +101,23 @@ class SimpleVADDetector:
         if len(audio_frame) == 0:
             return False
         
-        # Calcular energía RMS
-        energy = np.sqrt(np.mean(audio_frame**2))
-        
         # Detectar voz si la energía supera el umbral
-        return energy > self.sensitivity
+        return self.frame_energy(audio_frame) > self.sensitivity
+    
+    def frame_energy(self, audio_frame: np.ndarray) -> float:
+        """
+        Calcula la energía RMS de un frame
+        
+        Args:
+            audio_frame: Frame de audio
+            
+        Returns:
+            Energía RMS (0.0 si el frame está vacío)
+        """
+        if len(audio_frame) == 0:
+            return 0.0
+        frame = np.asarray(audio_frame, dtype=np.float32)
+        return float(np.sqrt(np.dot(frame, frame) / len(frame)))
     
     def detect_speech_segments(self, audio_data: np.ndarray, 
                              min_speech_duration: float = 0.5,
@@ -158,99 +226,241 @@ class RealTimeSimpleVAD:
     """VAD en tiempo real usando análisis de energía"""
     
     def __init__(self, sample_rate: int = 16000, sensitivity: float = 0.01,
-                 min_speech_duration: float = 0.5, min_silence_duration: float = 1.0):
+                 min_speech_duration: float = 0.5, min_silence_duration: float = 1.0,
+                 adaptive: bool = True, noise_margin: float = 3.0,
+                 min_speech_ratio: float = 0.3,
+                 max_utterance_duration: Optional[float] = None,
+                 cut_search_window: float = 2.0):
         """
         Inicializa VAD en tiempo real
         
         Args:
             sample_rate: Frecuencia de muestreo
-            sensitivity: Sensibilidad del detector
+            sensitivity: Sensibilidad del detector (umbral mínimo si es adaptativo)
             min_speech_duration: Duración mínima de voz
             min_silence_duration: Duración mínima de silencio
+            adaptive: Ajustar el umbral al nivel de ruido de fondo estimado
+            noise_margin: Factor sobre el nivel de ruido para considerar voz
+            min_speech_ratio: Proporción mínima de frames con voz en un segmento
+                              para enviarlo a transcripción
+            max_utterance_duration: Duración máxima de una frase antes de forzar
+                                    un corte (None para no limitar)
+            cut_search_window: Segundos finales de la frase donde buscar el
+                               frame de menor energía para el corte forzado
         """
         self.vad = SimpleVADDetector(sample_rate, sensitivity)
         self.min_speech_duration = min_speech_duration
         self.min_silence_duration = min_silence_duration
         
-        # Estado del detector
+        # Umbral adaptativo
+        self.base_sensitivity = sensitivity
+        self.adaptive = adaptive
+        self.noise_margin = noise_margin
+        self.noise_floor = NoiseFloorEstimator()
+        self.min_speech_ratio = min_speech_ratio
+        
+        # Estado del detector (posiciones absolutas en samples)
+        self.sample_rate = sample_rate
         self.is_speaking = False
-        self.speech_start_time = None
-        self.silence_start_time = None
+        self.speech_start_sample = None
+        self.silence_start_sample = None
+        self.samples_processed = 0
+        self.speech_start_forced = False
+        
+        # Corte forzado de frases largas en el frame de menor energía
+        self.max_utterance_samples = int(max_utterance_duration * sample_rate) if max_utterance_duration else None
+        self.recent_energies = collections.deque(
+            maxlen=max(1, int(cut_search_window * sample_rate) // self.vad.frame_size))
         
-        # Buffer de audio para análisis
-        self.audio_buffer = []
+        # Frames del segmento actual
+        self.segment_frames = 0
+        self.segment_speech_frames = 0
+        self.trailing_silence_frames = 0
+        
+        # Segmentos descartados antes de transcribir
+        self.suppressed_segments = 0
+        self.suppressed_audio_seconds = 0.0
+        
+        # Buffer de audio pendiente de analizar (menos de un frame)
+        self.audio_buffer = np.zeros(0, dtype=np.float32)
         self.frame_size = self.vad.frame_size
         
         print(f"🔄 VAD Simple en tiempo real iniciado")
     
     def process_frame(self, audio_frame: np.ndarray) -> dict:
         """
-        Procesa un frame de audio y retorna estado
+        Procesa un bloque de audio (de cualquier tamaño) y retorna estado
         
         Args:
-            audio_frame: Frame de audio
+            audio_frame: Bloque de audio
             
         Returns:
-            Diccionario con estado del VAD
+            Diccionario con estado del VAD. Al terminar (o descartarse) una
+            frase incluye 'speech_start_sample' y 'speech_end_sample'
         """
-        current_time = time.time()
+        audio = np.asarray(audio_frame, dtype=np.float32).reshape(-1)
+        if len(self.audio_buffer):
+            audio = np.concatenate([self.audio_buffer, audio])
         
-        # Agregar frame al buffer
-        self.audio_buffer.extend(audio_frame)
+        event = None
+        offset = 0
+        # Analizar todos los frames completos disponibles
+        while offset + self.frame_size <= len(audio):
+            result = self._process_vad_frame(audio[offset:offset + self.frame_size])
+            if result is not None:
+                event = result
+            offset += self.frame_size
+        self.audio_buffer = audio[offset:]
         
-        # Procesar solo si tenemos suficientes samples
-        if len(self.audio_buffer) >= self.frame_size:
-            frame = np.array(self.audio_buffer[:self.frame_size])
-            self.audio_buffer = self.audio_buffer[self.frame_size:]
+        if event is not None:
+            return event
+        return {
+            'is_speaking': self.is_speaking,
+            'speech_ended': False,
+            'speech_duration': None
+        }
+    
+    def _process_vad_frame(self, frame: np.ndarray) -> Optional[dict]:
+        """Actualiza el estado con un frame; retorna un evento si termina una frase"""
+        frame_start = self.samples_processed
+        self.samples_processed += self.frame_size
+        
+        energy = self.vad.frame_energy(frame)
+        if self.adaptive:
+            if self.noise_floor.floor is None:
+                self.noise_floor.update(energy)
+            self.vad.sensitivity = self.noise_floor.threshold(self.noise_margin, self.base_sensitivity)
+        is_speech = energy > self.vad.sensitivity
+        if self.max_utterance_samples:
+            self.recent_energies.append((frame_start, energy))
+        if self.adaptive and not is_speech:
+            # Solo los frames sin voz: si la voz entrara en el nivel de ruido,
+            # en una frase larga el umbral acabaría por encima de la propia voz
+            self.noise_floor.update(energy)
+        
+        if self.is_speaking:
+            self.segment_frames += 1
+            if is_speech:
+                self.segment_speech_frames += 1
+                self.trailing_silence_frames = 0
+            else:
+                self.trailing_silence_frames += 1
+        
+        if is_speech and not self.is_speaking:
+            # Inicio de voz
+            self.is_speaking = True
+            self.speech_start_sample = frame_start
+            self.silence_start_sample = None
+            self.speech_start_forced = False
+            self.segment_frames = 1
+            self.segment_speech_frames = 1
+            self.trailing_silence_frames = 0
             
-            is_speech = self.vad.is_speech(frame)
+        elif not is_speech and self.is_speaking:
+            # Posible fin de voz
+            if self.silence_start_sample is None:
+                self.silence_start_sample = frame_start
             
-            if is_speech and not self.is_speaking:
-                # Inicio de voz
-                self.is_speaking = True
-                self.speech_start_time = current_time
-                self.silence_start_time = None
+            # Verificar si el silencio es suficientemente largo
+            silence_duration = (self.samples_processed - self.silence_start_sample) / self.sample_rate
+            if silence_duration >= self.min_silence_duration:
+                # Fin de voz confirmado
+                speech_duration = (self.silence_start_sample - self.speech_start_sample) / self.sample_rate
+                self.is_speaking = False
                 
-            elif not is_speech and self.is_speaking:
-                # Posible fin de voz
-                if self.silence_start_time is None:
-                    self.silence_start_time = current_time
-                
-                # Verificar si el silencio es suficientemente largo
-                silence_duration = current_time - self.silence_start_time
-                if silence_duration >= self.min_silence_duration:
-                    # Fin de voz confirmado
-                    speech_duration = self.silence_start_time - self.speech_start_time
+                # Tras un corte forzado la cola de la frase siempre se entrega
+                if speech_duration >= self.min_speech_duration or self.speech_start_forced:
+                    event = {
+                        'is_speaking': False,
+                        'speech_ended': True,
+                        'speech_duration': speech_duration,
+                        'speech_start_sample': self.speech_start_sample,
+                        'speech_end_sample': self.silence_start_sample,
+                        'continued': self.speech_start_forced
+                    }
                     
-                    if speech_duration >= self.min_speech_duration:
-                        self.is_speaking = False
-                        return {
-                            'is_speaking': False,
-                            'speech_ended': True,
-                            'speech_duration': speech_duration
-                        }
-            
-            elif is_speech and self.is_speaking:
-                # Continuando hablando
-                self.silence_start_time = None
+                    # Descartar segmentos con poca voz (ruido sostenido)
+                    voiced_frames = self.segment_frames - self.trailing_silence_frames
+                    event['speech_ratio'] = self.segment_speech_frames / max(voiced_frames, 1)
+                    if event['speech_ratio'] < self.min_speech_ratio and not self.speech_start_forced:
+                        self.suppressed_segments += 1
+                        self.suppressed_audio_seconds += speech_duration
+                        event['speech_ended'] = False
+                        event['segment_rejected'] = True
+                    return event
+                
+                # Voz demasiado corta: se descarta y se vuelve al reposo
+        
+        elif is_speech and self.is_speaking:
+            # Continuando hablando
+            self.silence_start_sample = None
+        
+        # Frase demasiado larga: cortar sin esperar al silencio
+        if (self.is_speaking and self.max_utterance_samples
+                and self.samples_processed - self.speech_start_sample >= self.max_utterance_samples):
+            return self._force_cut()
+        
+        return None
+    
+    def _force_cut(self) -> dict:
+        """Corta la frase en curso en el frame de menor energía reciente"""
+        candidates = [(energy, start) for start, energy in self.recent_energies
+                      if start > self.speech_start_sample]
+        if candidates:
+            cut = min(candidates)[1]
+        else:
+            cut = self.samples_processed
+        
+        event = {
+            'is_speaking': True,
+            'speech_ended': True,
+            'forced_cut': True,
+            'continued': self.speech_start_forced,
+            'speech_duration': (cut - self.speech_start_sample) / self.sample_rate,
+            'speech_start_sample': self.speech_start_sample,
+            'speech_end_sample': cut
+        }
         
+        # La frase continúa a partir del corte
+        self.speech_start_sample = cut
+        self.speech_start_forced = True
+        if self.silence_start_sample is not None and self.silence_start_sample < cut:
+            self.silence_start_sample = cut
+        self.segment_frames = 0
+        self.segment_speech_frames = 0
+        self.trailing_silence_frames = 0
+        return event
+    
+    def get_stats(self) -> dict:
+        """Retorna estadísticas del detector"""
         return {
-            'is_speaking': self.is_speaking,
-            'speech_ended': False,
-            'speech_duration': None
+            'noise_floor': self.noise_floor.floor,
+            'threshold': self.vad.sensitivity,
+            'suppressed_segments': self.suppressed_segments,
+            'suppressed_audio_seconds': self.suppressed_audio_seconds,
         }
     
     def reset(self):
         """Reinicia el estado del detector"""
         self.is_speaking = False
-        self.speech_start_time = None
-        self.silence_start_time = None
-        self.audio_buffer = []
+        self.speech_start_sample = None
+        self.silence_start_sample = None
+        self.samples_processed = 0
+        self.speech_start_forced = False
+        self.recent_energies.clear()
+        self.segment_frames = 0
+        self.segment_speech_frames = 0
+        self.trailing_silence_frames = 0
+        self.audio_buffer = np.zeros(0, dtype=np.float32)
 
 
 # Función para detectar automáticamente qué VAD usar
 def create_vad_detector(sample_rate: int = 16000, sensitivity: int = 2, 
-                       use_webrtc: bool = True) -> object:
+                       use_webrtc: bool = True, cascade: bool = False,
+                       adaptive: bool = True, noise_margin: float = 3.0,
+                       min_speech_ratio: float = 0.3,
+                       max_utterance_duration: Optional[float] = None,
+                       cut_search_window: float = 2.0) -> object:
     """
     Crea un detector VAD, intentando usar webrtcvad primero, 
     luego cayendo a la implementación simple
@@ -259,6 +469,17 @@ def create_vad_detector(sample_rate: int = 16000, sensitivity: int = 2,
         sample_rate: Frecuencia de muestreo
         sensitivity: Sensibilidad del detector
         use_webrtc: Intentar usar webrtcvad primero
+        cascade: Anteponer a webrtcvad un filtro de energía con nivel de ruido
+                 adaptativo (webrtcvad solo evalúa los frames que lo superan)
+        adaptive: VAD simple: ajustar el umbral al nivel de ruido estimado
+        noise_margin: VAD simple: factor sobre el nivel de ruido para
+                      considerar voz
+        min_speech_ratio: VAD simple: proporción mínima de frames con voz en
+                          un segmento para enviarlo a transcripción
+        max_utterance_duration: Duración máxima de una frase antes de forzar
+                                un corte (None para no limitar)
+        cut_search_window: Segundos finales de la frase donde buscar el frame
+                           de menor energía para el corte forzado
         
     Returns:
         Instancia del detector VAD
@@ -267,8 +488,13 @@ def create_vad_detector(sample_rate: int = 16000, sensitivity: int = 2,
         try:
             import webrtcvad
             from .vad_detector import VADDetector, RealTimeVAD
-            print("✅ Usando webrtcvad (WebRTC VAD)")
-            return RealTimeVAD(sample_rate, sensitivity)
+            if cascade:
+                print("✅ Usando VAD en cascada (energía + WebRTC VAD)")
+            else:
+                print("✅ Usando webrtcvad (WebRTC VAD)")
+            return RealTimeVAD(sample_rate, sensitivity, cascade=cascade,
+                               max_utterance_duration=max_utterance_duration,
+                               cut_search_window=cut_search_window)
         except ImportError:
             print("⚠️  webrtcvad no disponible, usando VAD simple")
     
@@ -276,4 +502,8 @@ def create_vad_detector(sample_rate: int = 16000, sensitivity: int = 2,
     sensitivity_map = {0: 0.005, 1: 0.01, 2: 0.02, 3: 0.05}
     simple_sensitivity = sensitivity_map.get(sensitivity, 0.02)
     
-    return RealTimeSimpleVAD(sample_rate, simple_sensitivity)
+    return RealTimeSimpleVAD(sample_rate, simple_sensitivity,
+                             adaptive=adaptive, noise_margin=noise_margin,
+                             min_speech_ratio=min_speech_ratio,
+                             max_utterance_duration=max_utterance_duration,
+                             cut_search_window=cut_search_window)
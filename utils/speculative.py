@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Post-procesado especulativo en segundo plano.
+
+Cada dictado nuevo se encola y, cuando el servidor esta ocioso, un hilo
+calcula de antemano sus salidas (resumen, traduccion...) para que al pedirlas
+se sirvan al instante. El trabajo esta limitado en ritmo (intervalo minimo
+entre trabajos) y en coste (presupuesto de tokens estimados por ventana de
+tiempo); lo que no cabe en el presupuesto se descarta, no se retrasa. Las
+peticiones del usuario tienen prioridad: un trabajo sin hueco libre, o
+desplazado por una de ellas (`preempt`), vuelve a la cola sin gastar
+presupuesto.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+import threading
+import time
+
+from .jobs import CancelToken, JobCancelled
+
+
+class SpeculativeDeferred(Exception):
+    """El trabajo no puede hacerse ahora (p. ej. no hay hueco libre en el LLM)."""
+
+
+class SpeculativeWorker:
+    """Hilo que procesa trabajos encolados solo cuando `is_idle()` lo permite."""
+
+    def __init__(self, process: Callable[[str, str, CancelToken], Any],
+                 is_idle: Callable[[], bool], min_interval: float = 10.0,
+                 token_budget: int = 50000, budget_window: float = 24 * 3600,
+                 max_pending: int = 10, poll_interval: float = 0.5):
+        """
+        Args:
+            process: Funcion (clave, texto, cancel) que hace y guarda el trabajo;
+                     lanza SpeculativeDeferred si ahora no puede hacerlo
+            is_idle: Indica si se puede usar el LLM sin quitarselo al usuario
+            min_interval: Segundos minimos entre el inicio de dos trabajos
+            token_budget: Tokens estimados permitidos por ventana (0 = sin limite)
+            budget_window: Duracion de la ventana del presupuesto, en segundos
+            max_pending: Trabajos en cola; al superarlo se descartan los mas antiguos
+            poll_interval: Cada cuanto se vuelve a comprobar si hay ocio
+        """
+        self._process = process
+        self._is_idle = is_idle
+        self.min_interval = max(0.0, float(min_interval))
+        self.token_budget = max(0, int(token_budget))
+        self.budget_window = float(budget_window)
+        self.max_pending = max(1, int(max_pending))
+        self.poll_interval = poll_interval
+
+        self._pending: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._spent: Deque[Tuple[float, int]] = deque()  # (instante, tokens)
+        self._cond = threading.Condition()
+        self._cancel = CancelToken()
+        self._thread: Optional[threading.Thread] = None
+        self._last_start = 0.0
+        # Trabajo en curso: su senal de cancelacion y si se ha borrado entretanto
+        self._current_key: Optional[str] = None
+        self._current_token: Optional[CancelToken] = None
+        self._current_discarded = False
+        self.completed = 0
+        self.failed = 0
+        self.over_budget = 0
+        self.dropped = 0
+        self.deferred = 0
+        self.preempted = 0
+
+    def submit(self, key: str, text: str, cost: int) -> None:
+        """Encola un trabajo (sustituye al pendiente con la misma clave)."""
+        with self._cond:
+            if self._cancel.cancelled:
+                return
+            self._pending.pop(key, None)
+            self._pending[key] = (text, max(0, int(cost)))
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="speculative", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def discard(self, key: str) -> None:
+        """Quita un trabajo pendiente (p. ej. el dictado se ha borrado)."""
+        with self._cond:
+            self._pending.pop(key, None)
+            if key == self._current_key:
+                self._current_discarded = True
+
+    def preempt(self, reason: str = "peticion del usuario") -> None:
+        """Cancela el trabajo en curso para dejar el LLM libre; vuelve a la cola."""
+        with self._cond:
+            if self._current_token is not None:
+                self._current_token.cancel(reason)
+
+    def stop(self) -> None:
+        """Cancela el trabajo en curso y detiene el hilo."""
+        with self._cond:
+            self._cancel.cancel("servidor detenido")
+            if self._current_token is not None:
+                self._current_token.cancel("servidor detenido")
+            self._pending.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def tokens_spent(self) -> int:
+        """Tokens estimados gastados dentro de la ventana del presupuesto."""
+        with self._cond:
+            return self._spent_in_window(time.monotonic())
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "completed": self.completed,
+                "failed": self.failed,
+                "over_budget": self.over_budget,
+                "dropped": self.dropped,
+                "deferred": self.deferred,
+                "preempted": self.preempted,
+                "tokens_spent": self._spent_in_window(time.monotonic()),
+                "token_budget": self.token_budget,
+            }
+
+    def _spent_in_window(self, now: float) -> int:
+        while self._spent and now - self._spent[0][0] > self.budget_window:
+            self._spent.popleft()
+        return sum(tokens for _, tokens in self._spent)
+
+    def _next_job(self) -> Optional[Tuple[str, str, int, Tuple[float, int]]]:
+        """Espera a que haya trabajo, ocio y ritmo; None al detenerse."""
+        with self._cond:
+            while True:
+                if self._cancel.cancelled:
+                    return None
+                now = time.monotonic()
+                ready_at = self._last_start + self.min_interval
+                if self._pending and now >= ready_at and self._is_idle():
+                    key, (text, cost) = self._pending.popitem(last=False)
+                    if self.token_budget and self._spent_in_window(now) + cost > self.token_budget:
+                        self.over_budget += 1
+                        print(f"Post-procesado especulativo de {key} omitido: presupuesto de tokens agotado")
+                        continue
+                    charge = (now, cost)
+                    self._spent.append(charge)
+                    self._last_start = now
+                    self._current_key = key
+                    self._current_token = CancelToken()
+                    self._current_discarded = False
+                    return key, text, cost, charge
+                if not self._pending:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(timeout=max(self.poll_interval, ready_at - now))
+
+    def _requeue(self, key: str, text: str, cost: int, charge: Tuple[float, int]) -> None:
+        """Devuelve el trabajo en curso al principio de la cola y su coste al presupuesto."""
+        try:
+            self._spent.remove(charge)
+        except ValueError:
+            pass  # Ya fuera de la ventana
+        if self._current_discarded or key in self._pending:
+            return  # Borrado o sustituido por uno mas nuevo
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending[key] = (text, cost)
+        self._pending.move_to_end(key, last=False)
+
+    def _run(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            key, text, cost, charge = job
+            try:
+                self._process(key, text, self._current_token)
+                with self._cond:
+                    self.completed += 1
+            except (SpeculativeDeferred, JobCancelled) as e:
+                with self._cond:
+                    if self._cancel.cancelled:
+                        return
+                    if isinstance(e, SpeculativeDeferred):
+                        self.deferred += 1
+                    else:
+                        self.preempted += 1
+                    self._requeue(key, text, cost, charge)
+                    self._cond.wait(timeout=self.poll_interval)  # No reintentar en bucle
+            except Exception as e:
+                with self._cond:
+                    self.failed += 1
+                print(f"Error en el post-procesado especulativo de {key}: {e}")
+            finally:
+                with self._cond:
+                    self._current_key = None
+                    self._current_token = None
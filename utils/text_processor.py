@@ -4,37 +4,208 @@
 Procesamiento de texto con y sin LLM, y gestion simple de transcripciones.
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Callable, Iterator, Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from types import SimpleNamespace
 import json
 import os
+import queue
 import re
+import threading
 
-try:
-    import openai  # type: ignore
-except Exception:
-    openai = None  # LLM opcional
+from .jobs import CancelToken, JobCancelled
+from .llm_cache import LLMResponseCache, llm_cache_key
+from .llm_client import _load_openai, get_llm_client, resolve_base_url
+from .llm_router import Endpoint, LLMRouter
+
+# Version de las plantillas de prompt: forma parte de la clave de la cache de
+# respuestas, asi que hay que subirla al cambiar cualquier prompt
+PROMPT_TEMPLATE_VERSION = 1
+
+# Cabeceras de atribucion que pide OpenRouter
+_OPENROUTER_HEADERS = {"HTTP-Referer": "http://127.0.0.1:5000", "X-Title": "Whisper Dictation"}
+
+# Hilos para las llamadas al LLM cancelables. Se dimensiona con el pool de
+# conexiones del cliente (LLM_MAX_CONNECTIONS): mas llamadas simultaneas no
+# tendrian conexion
+_llm_executor: Optional[ThreadPoolExecutor] = None
+_llm_executor_size = 0
+_llm_executor_lock = threading.Lock()
+
+
+def _get_llm_executor(min_workers: int = 4) -> ThreadPoolExecutor:
+    """Pool compartido; se sustituye por uno mayor si se piden mas hilos."""
+    global _llm_executor, _llm_executor_size
+    with _llm_executor_lock:
+        if _llm_executor is None or _llm_executor_size < min_workers:
+            previous = _llm_executor
+            _llm_executor = ThreadPoolExecutor(max_workers=min_workers, thread_name_prefix="llm")
+            _llm_executor_size = min_workers
+            if previous is not None:
+                # Termina lo que ya tiene y sus hilos salen, sin esperarlos aqui
+                previous.shutdown(wait=False)
+        return _llm_executor
+
+
+def _close_response(response: Any) -> None:
+    """Cierra una respuesta en streaming (corta la conexion si sigue abierta)."""
+    close = getattr(response, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _completion_from_text(content: str) -> Any:
+    """Respuesta con la forma de una chat completion a partir de su texto."""
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+# Tipo de prompt de cada salida que no es una traduccion
+_FIELD_PROMPTS = {"cleaned": "cleanup", "summary": "summary", "tasks": "tasks"}
+
+# Salidas que se pueden pedir en una sola llamada estructurada (modo combinado)
+COMBINED_FIELDS = {
+    "cleaned": "el texto con la puntuacion y el formato corregidos, manteniendo el contenido original",
+    "summary": "un resumen conciso del texto",
+    "translation_en": "una traduccion fiel y natural al ingles",
+    "tasks": "las tareas y puntos importantes, uno por linea empezando por '- '",
+}
+
+
+def _parse_json_object(content: str) -> Dict[str, Any]:
+    """Extrae el objeto JSON de la respuesta (tolera bloques ``` y texto alrededor)."""
+    content = (content or "").strip()
+    try:
+        data = json.loads(content)
+    except ValueError:
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _field_text(value: Any) -> Optional[str]:
+    """Normaliza un campo del JSON a texto (las listas se unen linea a linea)."""
+    if isinstance(value, list):
+        items = [str(item).strip() for item in value if str(item).strip()]
+        value = "\n".join(item if item.startswith("- ") else f"- {item}" for item in items)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimacion de tokens sin tokenizador (unos 4 caracteres por token)."""
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[str]:
+    """
+    Parte el texto en trozos de como mucho `max_tokens` (estimados) cortando
+    en final de frase; una frase mas larga que el limite se corta por palabras.
+    """
+    pieces: List[str] = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words: List[str] = []
+        for word in sentence.split():
+            if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                pieces.append(" ".join(words))
+                words = []
+            words.append(word)
+        if words:
+            pieces.append(" ".join(words))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for piece in pieces:
+        if current and estimate_tokens(" ".join(current + [piece])) > max_tokens:
+            chunks.append(" ".join(current))
+            current = []
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class TextStream:
+    """
+    Fragmentos de una respuesta del LLM segun llegan. Se itera una sola vez;
+    al agotarse, `text` contiene la respuesta completa (None si fallo).
+    """
+
+    def __init__(self):
+        self._chunks: Iterator[str] = iter(())
+        self.text: Optional[str] = None
+
+    def __iter__(self) -> Iterator[str]:
+        return self._chunks
 
 
 class TextProcessor:
     """Procesador de texto con capacidades de LLM (opcional)."""
 
     def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini",
-                 provider: str = "openai", base_url: Optional[str] = None):
+                 provider: str = "openai", base_url: Optional[str] = None,
+                 cache: Optional[LLMResponseCache] = None,
+                 client_settings: Optional[Dict[str, Any]] = None,
+                 summary_chunk_tokens: int = 3000, summary_workers: int = 4,
+                 endpoints: Optional[List[Dict[str, Optional[str]]]] = None,
+                 hedge: bool = False,
+                 acquire_slot: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            client_settings: Pool, timeouts y reintentos del cliente HTTP
+                             compartido (ver get_llm_client)
+            endpoints: Varios endpoints compatibles con OpenAI
+                       ({name, base_url, api_key, model}; la key y el modelo
+                       vacios toman los generales). Si se indican, cada
+                       peticion va al mas rapido de los sanos (LLMRouter)
+            hedge: Con varios endpoints, duplicar la peticion en el siguiente
+                   si el primero no responde antes de su p95 de latencia
+            summary_chunk_tokens: Tokens de texto a partir de los cuales un
+                                  resumen se hace por trozos (map-reduce)
+            summary_workers: Trozos que se resumen a la vez
+            acquire_slot: Funcion que devuelve un hueco libre del control de
+                          admision (con release()) o None. Si se indica, el
+                          llamante ya tiene un hueco para su primera llamada
+                          y cada trozo que se resume a la vez con ella
+                          necesita uno propio
+        """
         self.api_key = api_key
         self.model = model
         self.provider = (provider or "openai").lower()
         self.base_url = base_url
+        self.cache = cache
+        self.summary_chunk_tokens = max(100, int(summary_chunk_tokens))
+        self.summary_workers = max(1, int(summary_workers))
+        self.acquire_slot = acquire_slot
         self.client = None
+        self.router: Optional[LLMRouter] = None
+        self._llm_workers = max(4, self.summary_workers,
+                                int((client_settings or {}).get("max_connections", 10)))
 
+        openai = _load_openai() if api_key else None
         if api_key and openai is not None:
             try:
-                if self.provider == "openrouter":
-                    base = base_url or "https://openrouter.ai/api/v1"
-                    self.client = openai.OpenAI(api_key=api_key, base_url=base)
+                if endpoints:
+                    self.router = self._build_router(endpoints, client_settings or {}, hedge)
+                    self.client = self.router
+                    names = ", ".join(e.name for e in self.router.endpoints)
+                    print(f"LLM inicializado con enrutado entre: {names}")
                 else:
-                    self.client = openai.OpenAI(api_key=api_key)
-                print(f"LLM inicializado ({self.provider}) - Modelo: {model}")
+                    self.client = get_llm_client(api_key, self.provider, base_url, **(client_settings or {}))
+                    print(f"LLM inicializado ({self.provider}) - Modelo: {model}")
             except Exception as e:
                 print(f"Error al inicializar LLM ({self.provider}): {e}")
                 self.client = None
@@ -43,41 +214,67 @@ class TextProcessor:
         else:
             print("LLM deshabilitado (sin API key)")
 
+    def _build_router(self, endpoints: List[Dict[str, Optional[str]]],
+                      client_settings: Dict[str, Any], hedge: bool) -> LLMRouter:
+        routed = []
+        for entry in endpoints:
+            url = resolve_base_url(self.provider, entry.get("base_url"))
+            client = get_llm_client(entry.get("api_key") or self.api_key, self.provider, url, **client_settings)
+            # Sin reintentos del SDK: ante un fallo el router pasa al siguiente
+            # endpoint, y sumar ambos multiplicaria la latencia en el peor caso
+            client = client.with_options(max_retries=0)
+            headers = _OPENROUTER_HEADERS if "openrouter.ai" in url else None
+            routed.append(Endpoint(entry.get("name") or url, client,
+                                   entry.get("model") or self.model, headers))
+        return LLMRouter(routed, hedge=hedge)
+
     def is_available(self) -> bool:
         return self.client is not None
 
-    def improve_text(self, text: str, prompt_type: str = "cleanup") -> Optional[str]:
+    def _cache_key(self, prompt_type: str, text: str, params: Dict[str, Any]) -> str:
+        """
+        Clave de cache de una peticion. Con enrutado la respuesta puede venir
+        de cualquier endpoint, asi que la clave incluye todas las rutas
+        (endpoint y modelo): cambiar el conjunto no sirve respuestas de otro modelo.
+        """
+        provider, model = self.provider, self.model
+        if self.router is not None:
+            provider = "router"
+            model = ",".join(sorted(f"{e.name}={e.model}" for e in self.router.endpoints))
+        return llm_cache_key(provider, model, prompt_type, PROMPT_TEMPLATE_VERSION,
+                             text, params.get("temperature", 1.0))
+
+    def llm_clients(self) -> List[Any]:
+        """Clientes HTTP en uso (uno por endpoint si hay enrutado)."""
+        if self.router is not None:
+            return [e.client for e in self.router.endpoints]
+        return [self.client] if self.client is not None else []
+
+    def _extra_headers(self) -> Dict[str, str]:
+        # Con enrutado, el router anade las cabeceras de cada endpoint
+        if self.provider == "openrouter" and self.router is None:
+            return dict(_OPENROUTER_HEADERS)
+        return {}
+
+    def improve_text(self, text: str, prompt_type: str = "cleanup",
+                     cancel: Optional[CancelToken] = None) -> Optional[str]:
         if not self.is_available():
             return None
         if not text or not text.strip():
             return text
 
-        prompt = self._get_prompt(prompt_type, text)
         try:
-            extra_headers = {}
-            if self.provider == "openrouter":
-                extra_headers["HTTP-Referer"] = "http://127.0.0.1:5000"
-                extra_headers["X-Title"] = "Whisper Dictation"
-
-            params = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": "Eres un asistente que mejora textos transcritos. Responde solo con el texto mejorado, sin explicaciones."},
-                    {"role": "user", "content": prompt},
-                ],
-                "max_tokens": 2000,
-                "temperature": 0.3,
-            }
-            if extra_headers:
-                params["extra_headers"] = extra_headers
-
-            response = self.client.chat.completions.create(**params)  # type: ignore[attr-defined]
-            return (response.choices[0].message.content or "").strip()
+            if prompt_type == "summary" and estimate_tokens(text) > self.summary_chunk_tokens:
+                return self._summarize_long(text, cancel)
+            return self._complete(prompt_type, text, self._improve_params(prompt_type, text), cancel)
+        except JobCancelled:
+            raise
         except Exception as e:
             print(f"Error al procesar texto con LLM ({self.provider}): {e}")
             return None
 
-    def translate_text(self, text: str, target_lang: str = "en") -> Optional[str]:
+    def translate_text(self, text: str, target_lang: str = "en",
+                       cancel: Optional[CancelToken] = None) -> Optional[str]:
         if not self.is_available():
             return None
         if not text or not text.strip():
@@ -85,34 +282,360 @@ class TextProcessor:
         if target_lang.lower() != "en":
             return None
         try:
-            extra_headers = {}
-            if self.provider == "openrouter":
-                extra_headers["HTTP-Referer"] = "http://127.0.0.1:5000"
-                extra_headers["X-Title"] = "Whisper Dictation"
+            return self._complete("translate_en", text, self._translate_params(text), cancel)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"Error al traducir texto con LLM ({self.provider}): {e}")
+            return None
+
+    def improve_text_stream(self, text: str, prompt_type: str = "cleanup",
+                            cancel: Optional[CancelToken] = None) -> TextStream:
+        """Como improve_text, pero entregando la respuesta segun se genera."""
+        if prompt_type == "summary" and text and estimate_tokens(text) > self.summary_chunk_tokens:
+            stream = TextStream()
+            stream._chunks = self._stream_long_summary(stream, text, cancel)
+            return stream
+        return self._stream(prompt_type, text, lambda: self._improve_params(prompt_type, text), cancel)
+
+    def translate_text_stream(self, text: str, target_lang: str = "en",
+                              cancel: Optional[CancelToken] = None) -> TextStream:
+        """Como translate_text, pero entregando la traduccion segun se genera."""
+        if target_lang.lower() != "en":
+            return TextStream()
+        return self._stream("translate_en", text, lambda: self._translate_params(text), cancel)
+
+    def process_field(self, field: str, text: str,
+                      cancel: Optional[CancelToken] = None) -> Optional[str]:
+        """Obtiene una sola salida de COMBINED_FIELDS con su llamada individual."""
+        if field == "translation_en":
+            return self.translate_text(text, "en", cancel=cancel)
+        return self.improve_text(text, _FIELD_PROMPTS[field], cancel=cancel)
 
+    def process_field_stream(self, field: str, text: str,
+                             cancel: Optional[CancelToken] = None) -> TextStream:
+        """Como process_field, pero entregando la respuesta segun se genera."""
+        if field == "translation_en":
+            return self.translate_text_stream(text, "en", cancel=cancel)
+        return self.improve_text_stream(text, _FIELD_PROMPTS[field], cancel=cancel)
+
+    def _improve_params(self, prompt_type: str, text: str) -> Dict[str, Any]:
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Eres un asistente que mejora textos transcritos. Responde solo con el texto mejorado, sin explicaciones."},
+                {"role": "user", "content": self._get_prompt(prompt_type, text)},
+            ],
+            "max_tokens": 2000,
+            "temperature": 0.3,
+        }
+        extra_headers = self._extra_headers()
+        if extra_headers:
+            params["extra_headers"] = extra_headers
+        return params
+
+    def _translate_params(self, text: str) -> Dict[str, Any]:
+        prompt = (
+            "Traduce fiel y naturalmente al ingles el siguiente texto en espanol. "
+            "Mantén el significado, nombres propios y formato basico. "
+            "Devuelve solo el texto traducido, sin notas ni explicaciones:\n\n" + text
+        )
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "Eres un traductor experto. Responde solo con la traduccion."},
+                {"role": "user", "content": prompt},
+            ],
+            "max_tokens": 2000,
+            "temperature": 0.2,
+        }
+        extra_headers = self._extra_headers()
+        if extra_headers:
+            params["extra_headers"] = extra_headers
+        return params
+
+    def process_combined(self, text: str, fields: List[str],
+                         cancel: Optional[CancelToken] = None) -> Dict[str, Optional[str]]:
+        """
+        Pide todas las salidas de `fields` (claves de COMBINED_FIELDS) en una
+        sola llamada con respuesta JSON, de modo que el texto se envia y se
+        tokeniza una vez. Los campos que falten o no se puedan leer se piden
+        despues con su llamada individual.
+        """
+        fields = [field for field in fields if field in COMBINED_FIELDS]
+        if not self.is_available():
+            return {field: None for field in fields}
+        if not text or not text.strip():
+            return {field: text for field in fields}
+
+        results: Dict[str, Optional[str]] = {}
+        if "summary" in fields and estimate_tokens(text) > self.summary_chunk_tokens:
+            # Un texto largo se resume por trozos, fuera de la llamada combinada
+            results["summary"] = self.improve_text(text, "summary", cancel=cancel)
+            fields = [field for field in fields if field != "summary"]
+            if not fields:
+                return results
+
+        parsed: Dict[str, Any] = {}
+        try:
+            keys = "\n".join(f'- "{field}": {COMBINED_FIELDS[field]}' for field in fields)
             prompt = (
-                "Traduce fiel y naturalmente al ingles el siguiente texto en espanol. "
-                "Mantén el significado, nombres propios y formato basico. "
-                "Devuelve solo el texto traducido, sin notas ni explicaciones:\n\n" + text
+                "Procesa el siguiente texto transcrito y devuelve un objeto JSON con "
+                f"exactamente estas claves (todas con texto):\n{keys}\n\nTexto:\n{text}"
             )
-
             params = {
                 "model": self.model,
                 "messages": [
-                    {"role": "system", "content": "Eres un traductor experto. Responde solo con la traduccion."},
+                    {"role": "system", "content": "Eres un asistente que procesa textos transcritos. Responde solo con un objeto JSON valido, sin explicaciones."},
                     {"role": "user", "content": prompt},
                 ],
-                "max_tokens": 2000,
+                "max_tokens": 2000 * len(fields),
                 "temperature": 0.2,
+                "response_format": {"type": "json_object"},
             }
+            extra_headers = self._extra_headers()
             if extra_headers:
                 params["extra_headers"] = extra_headers
 
-            resp = self.client.chat.completions.create(**params)  # type: ignore[attr-defined]
-            return (resp.choices[0].message.content or "").strip()
+            # Solo se guarda en cache una respuesta con todos los campos legibles
+            def complete(content: str) -> bool:
+                data = _parse_json_object(content)
+                return all(_field_text(data.get(field)) for field in fields)
+
+            content = self._complete("combined:" + ",".join(fields), text, params, cancel, validate=complete)
+            parsed = _parse_json_object(content)
+        except JobCancelled:
+            raise
         except Exception as e:
-            print(f"Error al traducir texto con LLM ({self.provider}): {e}")
-            return None
+            print(f"Error en la llamada combinada al LLM ({self.provider}): {e}")
+
+        for field in fields:
+            value = _field_text(parsed.get(field))
+            if value is None:
+                print(f"Campo '{field}' ausente en la respuesta combinada; llamada individual")
+                value = self.process_field(field, text, cancel=cancel)
+            results[field] = value
+        return results
+
+    def _summarize_long(self, text: str, cancel: Optional[CancelToken] = None) -> str:
+        """Resumen map-reduce: resume los trozos en paralelo y luego los combina."""
+        partials = self._reduce_input(self._summarize_parts(text, cancel), cancel)
+        return self._complete("summary_reduce", partials, self._reduce_params(partials), cancel)
+
+    def _stream_long_summary(self, stream: TextStream, text: str,
+                             cancel: Optional[CancelToken]) -> Iterator[str]:
+        """Como _summarize_long, entregando en streaming el paso final."""
+        try:
+            partials = self._reduce_input(self._summarize_parts(text, cancel), cancel)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"Error al resumir por trozos ({self.provider}): {e}")
+            return
+        yield from self._stream_chunks(stream, "summary_reduce", partials,
+                                       lambda: self._reduce_params(partials), cancel)
+
+    def _summarize_parts(self, text: str, cancel: Optional[CancelToken]) -> List[str]:
+        """
+        Paso map: un resumen por trozo, con hasta `summary_workers` llamadas a
+        la vez. Con `acquire_slot`, la primera via usa el hueco del llamante y
+        las demas se suman cuando consiguen un hueco libre.
+        """
+        chunks = split_into_chunks(text, self.summary_chunk_tokens)
+        total = len(chunks)
+        pending: "queue.Queue" = queue.Queue()
+        for item in enumerate(chunks, 1):
+            pending.put(item)
+        results: Dict[int, Optional[str]] = {}
+        finished = CancelToken()  # Sin trozos por repartir: las vias en espera se retiran
+
+        def summarize(index: int, chunk: str) -> Optional[str]:
+            prompt_type = f"summary_part:{index}/{total}"
+            try:
+                return self._complete(prompt_type, chunk, self._part_params(chunk, index, total), cancel)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                print(f"Error al resumir el trozo {index} de {total}: {e}")
+                return None
+
+        def lane(own_slot: bool) -> None:
+            slot = None
+            try:
+                while own_slot and slot is None:
+                    slot = self.acquire_slot()
+                    if slot is None and finished.wait(0.05):
+                        return
+                while True:
+                    try:
+                        index, chunk = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    results[index] = summarize(index, chunk)
+            finally:
+                if slot is not None:
+                    slot.release()
+
+        lanes = min(self.summary_workers, total)
+        with ThreadPoolExecutor(max_workers=lanes, thread_name_prefix="summary") as pool:
+            futures = [pool.submit(lane, i > 0 and self.acquire_slot is not None) for i in range(lanes)]
+            try:
+                futures[0].result()
+            finally:
+                finished.cancel("trozos repartidos")
+                for future in futures[1:]:
+                    future.result()
+        partials = [results[i] for i in range(1, total + 1) if results.get(i)]
+        if not partials:
+            raise RuntimeError("no se pudo resumir ningun trozo")
+        if len(partials) < total:
+            print(f"Aviso: resumen sin {total - len(partials)} de {total} trozos")
+        return partials
+
+    def _reduce_input(self, partials: List[str], cancel: Optional[CancelToken]) -> str:
+        """Une los resumenes parciales; si aun no caben en un prompt, se resumen otra vez."""
+        joined = "\n\n".join(partials)
+        while len(partials) > 1 and estimate_tokens(joined) > self.summary_chunk_tokens:
+            shorter = self._summarize_parts(joined, cancel)
+            if len(shorter) >= len(partials):
+                break  # No se reduce mas: combinar lo que hay
+            partials = shorter
+            joined = "\n\n".join(partials)
+        return joined
+
+    def _part_params(self, chunk: str, index: int, total: int) -> Dict[str, Any]:
+        prompt = (
+            f"Resume de forma concisa esta parte ({index} de {total}) de una transcripcion "
+            f"larga, conservando datos, decisiones y tareas:\n\n{chunk}"
+        )
+        params = self._improve_params("summary", chunk)
+        params["messages"][1]["content"] = prompt
+        params["max_tokens"] = 500
+        return params
+
+    def _reduce_params(self, partials: str) -> Dict[str, Any]:
+        prompt = (
+            "Estos son resumenes parciales, en orden, de una transcripcion larga. "
+            "Combinalos en un unico resumen conciso y completo, sin repeticiones:\n\n" + partials
+        )
+        params = self._improve_params("summary", partials)
+        params["messages"][1]["content"] = prompt
+        return params
+
+    def _complete(self, prompt_type: str, text: str, params: Dict[str, Any],
+                  cancel: Optional[CancelToken] = None,
+                  validate: Optional[Callable[[str], bool]] = None) -> str:
+        """
+        Devuelve el texto de la respuesta, desde la cache si ya se pidio lo
+        mismo (proveedor, modelo, prompt, version de plantillas, texto y
+        temperatura). Las respuestas vacias o que no pasan `validate` no se guardan.
+        """
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(prompt_type, text, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        response = self._create_completion(params, cancel)
+        content = (response.choices[0].message.content or "").strip()
+        if key is not None and content and (validate is None or validate(content)):
+            self.cache.put(key, content)
+        return content
+
+    def _stream(self, prompt_type: str, text: str, build_params: Callable[[], Dict[str, Any]],
+                cancel: Optional[CancelToken]) -> TextStream:
+        stream = TextStream()
+        stream._chunks = self._stream_chunks(stream, prompt_type, text, build_params, cancel)
+        return stream
+
+    def _stream_chunks(self, stream: TextStream, prompt_type: str, text: str,
+                       build_params: Callable[[], Dict[str, Any]],
+                       cancel: Optional[CancelToken]) -> Iterator[str]:
+        """
+        Pide la respuesta con stream=True y la entrega fragmento a fragmento.
+        La cancelacion se comprueba entre fragmentos y cierra la conexion; una
+        respuesta en cache se entrega de una vez.
+        """
+        if not self.is_available():
+            return
+        if not text or not text.strip():
+            stream.text = text
+            return
+
+        params = build_params()
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(prompt_type, text, params)
+            cached = self.cache.get(key)
+            if cached is not None:
+                stream.text = cached
+                yield cached
+                return
+
+        parts: List[str] = []
+        try:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            response = self.client.chat.completions.create(stream=True, **params)  # type: ignore[attr-defined]
+            try:
+                for chunk in response:
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                _close_response(response)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"Error en la respuesta en streaming del LLM ({self.provider}): {e}")
+            return
+
+        content = "".join(parts).strip()
+        stream.text = content
+        if key is not None and content:
+            self.cache.put(key, content)
+
+    def _create_completion(self, params: Dict[str, Any], cancel: Optional[CancelToken] = None) -> Any:
+        """
+        Llama al LLM. Con una senal de cancelacion la respuesta se pide en
+        streaming desde un hilo del pool: si se cancela, se cierra la respuesta
+        (se corta la conexion con el proveedor), el hilo queda libre y el
+        llamante recibe JobCancelled sin esperar.
+        """
+        if cancel is None:
+            return self.client.chat.completions.create(**params)  # type: ignore[attr-defined]
+
+        cancel.raise_if_cancelled()
+        opened: List[Any] = []
+
+        def run() -> Any:
+            response = self.client.chat.completions.create(stream=True, **params)  # type: ignore[attr-defined]
+            opened.append(response)
+            parts: List[str] = []
+            try:
+                for chunk in response:
+                    if cancel.cancelled:
+                        break
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+            finally:
+                _close_response(response)
+            return _completion_from_text("".join(parts))
+
+        future = _get_llm_executor(self._llm_workers).submit(run)
+        while not wait([future], timeout=0.1).done:
+            if cancel.cancelled:
+                future.cancel()
+                for response in opened:
+                    _close_response(response)
+                break
+        cancel.raise_if_cancelled()
+        return future.result()
 
     def _get_prompt(self, prompt_type: str, text: str) -> str:
         prompts = {
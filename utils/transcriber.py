@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Transcripcion de segmentos de audio con Whisper, comun al CLI y al servidor web.
+"""
+
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+import os
+import tempfile
+import threading
+import wave
+
+import numpy as np
+
+from .jobs import CancelToken
+from .transcription_cache import TranscriptionCache, audio_cache_key
+
+# faster-whisper decodifica arrays de numpy a 16 kHz sin remuestrear
+WHISPER_SAMPLE_RATE = 16000
+
+
+class SegmentResult(NamedTuple):
+    """Segmento decodificado (copia serializable del de faster-whisper)."""
+    text: str
+    start: float
+    end: float
+    avg_logprob: float
+    no_speech_prob: float
+
+
+class TranscriptionResult(NamedTuple):
+    """Resultado de transcribir un trozo de audio."""
+    text: str
+    segments: List[SegmentResult]
+    language: Optional[str]
+    language_probability: float
+    cached: bool
+    dropped_segments: int = 0
+    low_confidence: bool = False
+    cache_keys: Tuple[str, ...] = ()  # Entradas de la cache con este audio
+
+
+def mean_avg_logprob(segments: List[SegmentResult]) -> Optional[float]:
+    """avg_logprob medio de los segmentos ponderado por su duracion (None si no hay)."""
+    weights = [max(s.end - s.start, 0.01) for s in segments]
+    if not weights:
+        return None
+    return sum(s.avg_logprob * w for s, w in zip(segments, weights)) / sum(weights)
+
+
+class LanguageSession:
+    """
+    Idioma detectado en una sesion (una ejecucion del CLI o un cliente web).
+
+    Con WHISPER_LANGUAGE=auto, una vez detectado un idioma con confianza
+    suficiente se fija para los siguientes segmentos y Whisper se ahorra la
+    pasada del codificador de la deteccion. Se vuelve a detectar cuando un
+    segmento decodificado con el idioma fijado sale con baja confianza.
+    """
+
+    def __init__(self, confidence: float = 0.8):
+        """
+        Args:
+            confidence: Probabilidad minima de la deteccion para fijar el idioma
+        """
+        self.confidence = confidence
+        self._state = (None, 0.0)  # (idioma, probabilidad); se sustituye de una vez
+        self.detections = 0
+        self.reused = 0
+
+    @property
+    def language(self) -> Optional[str]:
+        return self._state[0]
+
+    @property
+    def probability(self) -> float:
+        return self._state[1]
+
+    def language_hint(self) -> Optional[str]:
+        """Idioma a fijar en la siguiente decodificacion, o None para detectarlo."""
+        language, probability = self._state
+        return language if language and probability >= self.confidence else None
+
+    def observe(self, language: Optional[str], probability: float) -> None:
+        """Registra el resultado de una deteccion."""
+        self.detections += 1
+        self._state = (language, float(probability))
+
+    def invalidate(self) -> None:
+        """Olvida el idioma fijado para volver a detectarlo."""
+        self._state = (None, 0.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        language, probability = self._state
+        return {
+            "language": language,
+            "probability": round(probability, 3),
+            "detections": self.detections,
+            "reused": self.reused,
+        }
+
+
+class Transcriber:
+    """Envuelve WhisperModel.transcribe con la cache de resultados."""
+
+    def __init__(self, model: Any, model_name: str, language: Optional[str] = None,
+                 sample_rate: int = 16000, beam_size: int = 5, best_of: int = 5,
+                 cache: Optional[TranscriptionCache] = None,
+                 model_settings: Optional[Dict[str, Any]] = None,
+                 language_confidence: float = 0.8,
+                 language_recheck_logprob: float = -1.0,
+                 no_speech_threshold: float = 0.6,
+                 logprob_threshold: float = -1.0):
+        """
+        Args:
+            model: Instancia de WhisperModel
+            model_name: Nombre del modelo (forma parte de la clave de cache)
+            language: Codigo de idioma, o None/'auto' para detectarlo
+            sample_rate: Frecuencia de muestreo del audio capturado
+            beam_size, best_of: Parametros de decodificacion
+            cache: Cache de resultados (None para desactivarla)
+            model_settings: Ajustes de carga (el tipo de computo cambia el resultado)
+            language_confidence: En modo auto, probabilidad para fijar el idioma
+            language_recheck_logprob: En modo auto, avg_logprob medio por debajo
+                                      del cual se vuelve a detectar el idioma
+            no_speech_threshold, logprob_threshold: Se descartan los segmentos
+                con no_speech_prob por encima del primero y avg_logprob por
+                debajo del segundo (texto inventado sobre ruido); si lo que
+                queda tiene avg_logprob medio por debajo del segundo, el
+                resultado se marca como de baja confianza
+        """
+        self.model = model
+        self.model_name = model_name
+        self.language = None if language in (None, "", "auto") else language
+        self.sample_rate = sample_rate
+        self.beam_size = beam_size
+        self.best_of = best_of
+        self.cache = cache
+        self.compute_type = (model_settings or {}).get("compute_type")
+        self.language_confidence = language_confidence
+        self.language_recheck_logprob = language_recheck_logprob
+        self.no_speech_threshold = no_speech_threshold
+        self.logprob_threshold = logprob_threshold
+        # Segmentos descartados en los resultados entregados (el servidor web
+        # transcribe en varios hilos)
+        self.dropped_segments = 0
+        self._stats_lock = threading.Lock()
+        # Sesion por defecto (CLI); el servidor web pasa una por cliente
+        self.session = self.new_session()
+
+    def new_session(self) -> LanguageSession:
+        return LanguageSession(self.language_confidence)
+
+    def transcribe(self, audio: np.ndarray, session: Optional[LanguageSession] = None,
+                   cancel: Optional[CancelToken] = None) -> TranscriptionResult:
+        """
+        Transcribe un trozo de audio float32 en [-1, 1].
+
+        Args:
+            audio: Audio a la frecuencia de captura
+            session: Sesion de idioma para el modo auto (por defecto, la del
+                     transcriptor)
+            cancel: Senal de cancelacion; se comprueba entre segmentos
+
+        Raises:
+            JobCancelled: si se cancela antes de terminar
+        """
+        pcm = _to_pcm(audio)
+        if self.language is not None:
+            return self._count_dropped(self._filter(self._transcribe_pcm(pcm, self.language, cancel)))
+
+        session = session or self.session
+        hint = session.language_hint()
+        result = self._filter(self._transcribe_pcm(pcm, hint, cancel))
+        if self._update_session(session, hint, result):
+            # Segmento dudoso con el idioma fijado: puede que haya cambiado
+            first_keys = result.cache_keys
+            result = self._filter(self._transcribe_pcm(pcm, None, cancel))
+            result = result._replace(cache_keys=first_keys + result.cache_keys)
+            session.observe(result.language, result.language_probability)
+        # Solo cuenta el resultado entregado, no la decodificacion descartada
+        return self._count_dropped(result)
+
+    def transcribe_stream(self, audio: np.ndarray, session: Optional[LanguageSession] = None,
+                          cancel: Optional[CancelToken] = None) -> "TranscriptionStream":
+        """
+        Transcribe entregando cada segmento (ya filtrado) en cuanto se decodifica.
+
+        Whisper decodifica por ventanas de 30 s, asi que en grabaciones largas
+        el primer texto llega tras la primera ventana y no al final. En modo
+        auto, un resultado dudoso con el idioma fijado no se vuelve a
+        decodificar (ya se ha entregado): solo se olvida el idioma para que el
+        siguiente segmento lo detecte de nuevo. Si se cancela, la iteracion
+        termina con JobCancelled.
+        """
+        stream = TranscriptionStream()
+        stream._segments = self._stream(_to_pcm(audio), session, stream, cancel)
+        return stream
+
+    def _stream(self, pcm: np.ndarray, session: Optional[LanguageSession],
+                stream: "TranscriptionStream",
+                cancel: Optional[CancelToken]) -> Iterator[SegmentResult]:
+        language = self.language
+        if language is None:
+            session = session or self.session
+            language = session.language_hint()
+
+        raw: Dict[str, TranscriptionResult] = {}
+        for segment in self._segments(pcm, language, raw, cancel):
+            if self._keep(segment) and segment.text.strip():
+                yield segment
+
+        result = self._count_dropped(self._filter(raw["result"]))
+        if self.language is None:
+            self._update_session(session, language, result)
+        stream.result = result
+
+    def _update_session(self, session: LanguageSession, hint: Optional[str],
+                        result: TranscriptionResult) -> bool:
+        """
+        Actualiza la sesion de idioma con un resultado.
+
+        Returns:
+            True si el idioma fijado ha dado un resultado dudoso y se ha olvidado
+        """
+        if hint is None:
+            if result.segments:
+                session.observe(result.language, result.language_probability)
+            return False
+
+        mean = mean_avg_logprob(result.segments)
+        if mean is None or mean >= self.language_recheck_logprob:
+            session.reused += 1
+            return False
+        session.invalidate()
+        return True
+
+    def _keep(self, segment: SegmentResult) -> bool:
+        """False para los segmentos que Whisper ha generado sobre ruido o silencio."""
+        return not (segment.no_speech_prob > self.no_speech_threshold
+                    and segment.avg_logprob < self.logprob_threshold)
+
+    def _filter(self, result: TranscriptionResult) -> TranscriptionResult:
+        """Descarta los segmentos de ruido y marca los resultados dudosos."""
+        kept = [s for s in result.segments if self._keep(s)]
+        dropped = len(result.segments) - len(kept)
+        mean = mean_avg_logprob(kept)
+        return result._replace(
+            text=" ".join(s.text.strip() for s in kept if s.text.strip()),
+            segments=kept,
+            dropped_segments=dropped,
+            low_confidence=mean is not None and mean < self.logprob_threshold,
+        )
+
+    def _count_dropped(self, result: TranscriptionResult) -> TranscriptionResult:
+        with self._stats_lock:
+            self.dropped_segments += result.dropped_segments
+        return result
+
+    def _transcribe_pcm(self, pcm: np.ndarray, language: Optional[str],
+                        cancel: Optional[CancelToken] = None) -> TranscriptionResult:
+        raw: Dict[str, TranscriptionResult] = {}
+        for _ in self._segments(pcm, language, raw, cancel):
+            pass
+        return raw["result"]
+
+    def _segments(self, pcm: np.ndarray, language: Optional[str],
+                  raw: Dict[str, TranscriptionResult],
+                  cancel: Optional[CancelToken] = None) -> Iterator[SegmentResult]:
+        """
+        Genera los segmentos sin filtrar, de la cache o segun los decodifica
+        Whisper; al terminar deja el resultado completo en raw['result'] y lo
+        guarda en la cache. Al cancelar se deja de consumir el generador de
+        faster-whisper (no se decodifica la siguiente ventana) y no se cachea
+        nada.
+        """
+        key = None
+        if self.cache is not None:
+            key = audio_cache_key(pcm, model=self.model_name, compute_type=self.compute_type,
+                                  sample_rate=self.sample_rate, language=language,
+                                  beam_size=self.beam_size, best_of=self.best_of)
+            hit = self.cache.get(key)
+            if hit is not None:
+                result = _result_from_dict(hit, cached=True)._replace(cache_keys=(key,))
+                yield from result.segments
+                raw["result"] = result
+                return
+
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        segments, info = self._decode(pcm, language)
+        collected = []
+        for segment in segments:
+            collected.append(segment)
+            yield segment
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+
+        result = TranscriptionResult(
+            text=" ".join(s.text.strip() for s in collected if s.text.strip()),
+            segments=collected,
+            language=getattr(info, "language", None),
+            language_probability=float(getattr(info, "language_probability", 0.0) or 0.0),
+            cached=False,
+        )
+        if key is not None:
+            self.cache.put(key, _result_to_dict(result))
+            result = result._replace(cache_keys=(key,))
+        raw["result"] = result
+
+    def _decode(self, pcm: np.ndarray, language: Optional[str]):
+        """
+        Ejecuta Whisper sobre el PCM. Los segmentos se devuelven como
+        generador perezoso: se decodifican a medida que se consumen.
+        """
+        kwargs = dict(language=language, beam_size=self.beam_size, best_of=self.best_of)
+        if self.sample_rate == WHISPER_SAMPLE_RATE:
+            # Mismos valores que al leer un WAV de 16 bits, sin pasar por disco
+            segments, info = self.model.transcribe(pcm.astype(np.float32) / 32768.0, **kwargs)
+            return (_copy_segment(s) for s in segments), info
+
+        # Otras frecuencias: faster-whisper remuestrea al leer el archivo (el
+        # audio se lee entero dentro de transcribe(), antes de decodificar)
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
+            fname = tmp.name
+        try:
+            with wave.open(fname, 'wb') as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(self.sample_rate)
+                wf.writeframes(pcm.tobytes())
+            segments, info = self.model.transcribe(fname, **kwargs)
+            return (_copy_segment(s) for s in segments), info
+        finally:
+            try:
+                os.unlink(fname)
+            except OSError:
+                pass
+
+
+class TranscriptionStream:
+    """
+    Segmentos de una transcripcion en curso. Se itera una sola vez; al
+    agotarse, `result` contiene el resultado completo (filtrado).
+    """
+
+    def __init__(self):
+        self._segments: Iterator[SegmentResult] = iter(())
+        self.result: Optional[TranscriptionResult] = None
+
+    def __iter__(self) -> Iterator[SegmentResult]:
+        return self._segments
+
+
+def _to_pcm(audio: np.ndarray) -> np.ndarray:
+    """Cuantiza a int16, como el WAV que leeria Whisper."""
+    return (np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def _copy_segment(segment: Any) -> SegmentResult:
+    return SegmentResult(
+        text=segment.text,
+        start=float(segment.start),
+        end=float(segment.end),
+        avg_logprob=float(getattr(segment, "avg_logprob", 0.0)),
+        no_speech_prob=float(getattr(segment, "no_speech_prob", 0.0)),
+    )
+
+
+def _result_to_dict(result: TranscriptionResult) -> Dict[str, Any]:
+    return {
+        "text": result.text,
+        "segments": [s._asdict() for s in result.segments],
+        "language": result.language,
+        "language_probability": result.language_probability,
+    }
+
+
+def _result_from_dict(data: Dict[str, Any], cached: bool) -> TranscriptionResult:
+    return TranscriptionResult(
+        text=data["text"],
+        segments=[SegmentResult(**s) for s in data["segments"]],
+        language=data.get("language"),
+        language_probability=float(data.get("language_probability", 0.0)),
+        cached=cached,
+    )
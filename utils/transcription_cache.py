@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de transcripciones direccionada por contenido.
+
+La clave es un hash del PCM de 16 bits (lo que realmente decodifica Whisper)
+junto con el modelo, el idioma y los parametros de decodificacion. Hay dos
+niveles: un LRU en memoria y, si se configura un directorio, un nivel en
+disco con limite de tamano en el que se descartan primero las entradas usadas
+hace mas tiempo. Al borrar un dictado se borran tambien sus entradas
+(`discard`), para no conservar en disco el texto de dictados eliminados.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+
+def audio_cache_key(pcm: np.ndarray, **params: Any) -> str:
+    """
+    Clave de cache para un audio y unos parametros de decodificacion.
+
+    Args:
+        pcm: Audio cuantizado a int16
+        **params: Modelo, idioma, beam_size... (deben ser serializables a JSON)
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """LRU en memoria con un segundo nivel en disco acotado por tamano."""
+
+    def __init__(self, max_entries: int = 64, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = 100 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Entradas en memoria
+            cache_dir: Directorio del nivel en disco (None para desactivarlo)
+            max_disk_bytes: Tamano maximo del nivel en disco
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = int(max_disk_bytes)
+
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None  # Se calcula en la primera escritura
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Devuelve el resultado guardado para la clave, o None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Dict) -> None:
+        """Guarda un resultado (serializable a JSON) en ambos niveles."""
+        with self._lock:
+            self._remember(key, value)
+        self._write_disk(key, value)
+
+    def discard(self, keys: Iterable[str]) -> None:
+        """Borra unas entradas de ambos niveles (p. ej. su dictado se ha borrado)."""
+        for key in keys:
+            with self._lock:
+                self._memory.pop(key, None)
+            if self.cache_dir is None:
+                continue
+            path = self._path(key)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes = max(0, self._disk_bytes - size)
+
+    def clear(self) -> None:
+        """Vacia el nivel en memoria (el de disco se conserva)."""
+        with self._lock:
+            self._memory.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _remember(self, key: str, value: Dict) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # La fecha de modificacion hace de "ultimo uso" para el desalojo
+            os.utime(path, None)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: Dict) -> None:
+        if self.cache_dir is None or self.max_disk_bytes <= 0:
+            return
+        path = self._path(key)
+        try:
+            data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            try:
+                previous = path.stat().st_size  # Se sobrescribe: no contarla dos veces
+            except OSError:
+                previous = 0
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Aviso: no se pudo guardar en la cache de transcripciones: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*/*.json"))
+            else:
+                self._disk_bytes += len(data) - previous
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Borra las entradas usadas hace mas tiempo hasta quedar al 90% del limite."""
+        files = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9)
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
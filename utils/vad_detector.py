@@ -5,9 +5,11 @@ Utiliza webrtcvad para detectar cuando el usuario está hablando.
 
 import webrtcvad
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict
 import collections
 
+from .simple_vad import SimpleVADDetector, NoiseFloorEstimator
+
 
 class VADDetector:
     """Detector de actividad de voz usando WebRTC VAD"""
@@ -180,11 +182,81 @@ class VADDetector:
         return sum(probabilities) / len(probabilities)
 
 
+class CascadeVADDetector(VADDetector):
+    """
+    Detector en dos niveles: un filtro de energía RMS barato descarta los
+    frames claramente silenciosos y solo los que superan el nivel de ruido
+    adaptativo se evalúan con WebRTC VAD
+    """
+    
+    def __init__(self, sample_rate: int = 16000, sensitivity: int = 2,
+                 noise_margin: float = 2.0, min_energy: float = 0.002):
+        """
+        Inicializa el detector en cascada
+        
+        Args:
+            sample_rate: Frecuencia de muestreo
+            sensitivity: Sensibilidad de WebRTC VAD (0-3)
+            noise_margin: Factor sobre el nivel de ruido para pasar al segundo nivel
+            min_energy: Energía mínima absoluta para pasar al segundo nivel
+        """
+        super().__init__(sample_rate, sensitivity)
+        self.energy_gate = SimpleVADDetector(sample_rate, min_energy)
+        self.noise_floor = NoiseFloorEstimator()
+        self.noise_margin = noise_margin
+        self.min_energy = min_energy
+        
+        # Contadores por nivel
+        self.frames_total = 0
+        self.energy_rejected = 0
+        self.webrtc_rejected = 0
+    
+    def is_speech(self, audio_frame: np.ndarray) -> bool:
+        """
+        Detecta si un frame contiene voz, consultando WebRTC VAD solo si
+        la energía supera el nivel de ruido
+        
+        Args:
+            audio_frame: Frame de audio
+            
+        Returns:
+            True si detecta voz, False si es silencio
+        """
+        self.frames_total += 1
+        energy = self.energy_gate.frame_energy(audio_frame)
+        
+        # Primer nivel: filtro de energía con umbral adaptativo
+        self.energy_gate.sensitivity = self.noise_floor.threshold(self.noise_margin, self.min_energy)
+        if energy <= self.energy_gate.sensitivity:
+            self.noise_floor.update(energy)
+            self.energy_rejected += 1
+            return False
+        
+        # Segundo nivel: WebRTC VAD
+        if super().is_speech(audio_frame):
+            return True
+        
+        self.noise_floor.update(energy)
+        self.webrtc_rejected += 1
+        return False
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna los frames descartados por cada nivel"""
+        return {
+            'frames_total': self.frames_total,
+            'energy_rejected': self.energy_rejected,
+            'webrtc_rejected': self.webrtc_rejected,
+            'speech_frames': self.frames_total - self.energy_rejected - self.webrtc_rejected,
+        }
+
+
 class RealTimeVAD:
     """VAD en tiempo real para streaming de audio"""
     
     def __init__(self, sample_rate: int = 16000, sensitivity: int = 2,
-                 min_speech_duration: float = 0.5, min_silence_duration: float = 1.0):
+                 min_speech_duration: float = 0.5, min_silence_duration: float = 1.0,
+                 cascade: bool = False, max_utterance_duration: Optional[float] = None,
+                 cut_search_window: float = 2.0):
         """
         Inicializa VAD en tiempo real
         
@@ -193,83 +265,162 @@ class RealTimeVAD:
             sensitivity: Sensibilidad del detector
             min_speech_duration: Duración mínima de voz
             min_silence_duration: Duración mínima de silencio
+            cascade: Usar el detector en cascada (energía + WebRTC VAD)
+            max_utterance_duration: Duración máxima de una frase antes de forzar
+                                    un corte (None para no limitar)
+            cut_search_window: Segundos finales de la frase donde buscar el
+                               frame de menor energía para el corte forzado
         """
-        self.vad = VADDetector(sample_rate, sensitivity)
+        if cascade:
+            self.vad = CascadeVADDetector(sample_rate, sensitivity)
+        else:
+            self.vad = VADDetector(sample_rate, sensitivity)
+        self.sample_rate = sample_rate
         self.min_speech_duration = min_speech_duration
         self.min_silence_duration = min_silence_duration
         
-        # Estado del detector
+        # Estado del detector (posiciones absolutas en samples)
         self.is_speaking = False
-        self.speech_start_time = None
-        self.silence_start_time = None
+        self.speech_start_sample = None
+        self.silence_start_sample = None
+        self.samples_processed = 0
+        self.speech_start_forced = False
+        
+        # Corte forzado de frases largas en el frame de menor energía
+        self.max_utterance_samples = int(max_utterance_duration * sample_rate) if max_utterance_duration else None
+        self.recent_energies = collections.deque(
+            maxlen=max(1, int(cut_search_window * sample_rate) // self.vad.frame_size))
         
-        # Buffer de audio para análisis
-        self.audio_buffer = []
+        # Buffer de audio pendiente de analizar (menos de un frame)
+        self.audio_buffer = np.zeros(0, dtype=np.float32)
         self.frame_size = self.vad.frame_size
         
         print(f"🔄 VAD en tiempo real iniciado")
     
     def process_frame(self, audio_frame: np.ndarray) -> dict:
         """
-        Procesa un frame de audio y retorna estado
+        Procesa un bloque de audio (de cualquier tamaño) y retorna estado
         
         Args:
-            audio_frame: Frame de audio
+            audio_frame: Bloque de audio
             
         Returns:
-            Diccionario con estado del VAD
+            Diccionario con estado del VAD. Al terminar una frase incluye
+            'speech_start_sample' y 'speech_end_sample' (posiciones absolutas)
         """
-        import time
-        current_time = time.time()
+        audio = np.asarray(audio_frame, dtype=np.float32).reshape(-1)
+        if len(self.audio_buffer):
+            audio = np.concatenate([self.audio_buffer, audio])
+        
+        event = None
+        offset = 0
+        # Analizar todos los frames completos disponibles
+        while offset + self.frame_size <= len(audio):
+            result = self._process_vad_frame(audio[offset:offset + self.frame_size])
+            if result is not None:
+                event = result
+            offset += self.frame_size
+        self.audio_buffer = audio[offset:]
+        
+        if event is not None:
+            return event
+        return {
+            'is_speaking': self.is_speaking,
+            'speech_ended': False,
+            'speech_duration': None
+        }
+    
+    def _process_vad_frame(self, frame: np.ndarray) -> Optional[dict]:
+        """Actualiza el estado con un frame; retorna un evento si termina una frase"""
+        frame_start = self.samples_processed
+        self.samples_processed += self.frame_size
         
-        # Agregar frame al buffer
-        self.audio_buffer.extend(audio_frame)
+        is_speech = self.vad.is_speech(frame)
+        if self.max_utterance_samples:
+            self.recent_energies.append((frame_start, float(np.dot(frame, frame))))
         
-        # Procesar solo si tenemos suficientes samples
-        if len(self.audio_buffer) >= self.frame_size:
-            frame = np.array(self.audio_buffer[:self.frame_size])
-            self.audio_buffer = self.audio_buffer[self.frame_size:]
+        if is_speech and not self.is_speaking:
+            # Inicio de voz
+            self.is_speaking = True
+            self.speech_start_sample = frame_start
+            self.silence_start_sample = None
+            self.speech_start_forced = False
             
-            is_speech = self.vad.is_speech(frame)
+        elif not is_speech and self.is_speaking:
+            # Posible fin de voz
+            if self.silence_start_sample is None:
+                self.silence_start_sample = frame_start
             
-            if is_speech and not self.is_speaking:
-                # Inicio de voz
-                self.is_speaking = True
-                self.speech_start_time = current_time
-                self.silence_start_time = None
+            # Verificar si el silencio es suficientemente largo
+            silence_duration = (self.samples_processed - self.silence_start_sample) / self.sample_rate
+            if silence_duration >= self.min_silence_duration:
+                # Fin de voz confirmado
+                speech_duration = (self.silence_start_sample - self.speech_start_sample) / self.sample_rate
                 
-            elif not is_speech and self.is_speaking:
-                # Posible fin de voz
-                if self.silence_start_time is None:
-                    self.silence_start_time = current_time
+                # Tras un corte forzado la cola de la frase siempre se entrega
+                if speech_duration >= self.min_speech_duration or self.speech_start_forced:
+                    self.is_speaking = False
+                    return {
+                        'is_speaking': False,
+                        'speech_ended': True,
+                        'speech_duration': speech_duration,
+                        'speech_start_sample': self.speech_start_sample,
+                        'speech_end_sample': self.silence_start_sample,
+                        'continued': self.speech_start_forced
+                    }
                 
-                # Verificar si el silencio es suficientemente largo
-                silence_duration = current_time - self.silence_start_time
-                if silence_duration >= self.min_silence_duration:
-                    # Fin de voz confirmado
-                    speech_duration = self.silence_start_time - self.speech_start_time
-                    
-                    if speech_duration >= self.min_speech_duration:
-                        self.is_speaking = False
-                        return {
-                            'is_speaking': False,
-                            'speech_ended': True,
-                            'speech_duration': speech_duration
-                        }
-            
-            elif is_speech and self.is_speaking:
-                # Continuando hablando
-                self.silence_start_time = None
+                # Voz demasiado corta: se descarta y se vuelve al reposo
+                self.is_speaking = False
         
-        return {
-            'is_speaking': self.is_speaking,
-            'speech_ended': False,
-            'speech_duration': None
+        elif is_speech and self.is_speaking:
+            # Continuando hablando
+            self.silence_start_sample = None
+        
+        # Frase demasiado larga: cortar sin esperar al silencio
+        if (self.is_speaking and self.max_utterance_samples
+                and self.samples_processed - self.speech_start_sample >= self.max_utterance_samples):
+            return self._force_cut()
+        
+        return None
+    
+    def _force_cut(self) -> dict:
+        """Corta la frase en curso en el frame de menor energía reciente"""
+        candidates = [(energy, start) for start, energy in self.recent_energies
+                      if start > self.speech_start_sample]
+        if candidates:
+            cut = min(candidates)[1]
+        else:
+            cut = self.samples_processed
+        
+        event = {
+            'is_speaking': True,
+            'speech_ended': True,
+            'forced_cut': True,
+            'continued': self.speech_start_forced,
+            'speech_duration': (cut - self.speech_start_sample) / self.sample_rate,
+            'speech_start_sample': self.speech_start_sample,
+            'speech_end_sample': cut
         }
+        
+        # La frase continúa a partir del corte
+        self.speech_start_sample = cut
+        self.speech_start_forced = True
+        if self.silence_start_sample is not None and self.silence_start_sample < cut:
+            self.silence_start_sample = cut
+        return event
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Retorna estadísticas del detector (vacías si no es en cascada)"""
+        if isinstance(self.vad, CascadeVADDetector):
+            return self.vad.get_stats()
+        return {}
     
     def reset(self):
         """Reinicia el estado del detector"""
         self.is_speaking = False
-        self.speech_start_time = None
-        self.silence_start_time = None
-        self.audio_buffer = []
+        self.speech_start_sample = None
+        self.silence_start_sample = None
+        self.samples_processed = 0
+        self.speech_start_forced = False
+        self.recent_energies.clear()
+        self.audio_buffer = np.zeros(0, dtype=np.float32)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Carga del modelo Whisper con el reparto de hilos del perfil de rendimiento.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import importlib.util
+import os
+
+# faster-whisper (y CTranslate2) solo se importa al cargar el modelo
+WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
+
+
+def load_whisper_model(model_size: str, use_gpu: bool = False,
+                       budget: Optional[Dict[str, Any]] = None,
+                       autotune: bool = False,
+                       tuning_cache: Optional[str] = None,
+                       model_dir: Optional[str] = None,
+                       offline: bool = False) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Crea el modelo Whisper, intentando GPU si se pide y cayendo a CPU.
+
+    Args:
+        model_size: Nombre o ruta del modelo
+        use_gpu: Intentar cargar en CUDA (float16) primero
+        budget: Reparto de CPU (Config.get_performance_budget()); en CPU fija
+                cpu_threads y num_workers
+        autotune: En CPU, usar el tipo de computo e hilos calibrados para este
+                  equipo (se calibra la primera vez)
+        tuning_cache: Archivo donde se guardan las calibraciones
+        model_dir: Almacen local de modelos (utils.model_store); si el modelo
+                   esta en el, se carga desde su ruta sin consultar el hub
+        offline: Exigir que el modelo este en el almacen
+
+    Returns:
+        Tupla (modelo, ajustes) con 'device', 'compute_type', 'cpu_threads',
+        'num_workers' y 'model_path' efectivos
+    """
+    if not WHISPER_AVAILABLE:
+        raise RuntimeError("faster-whisper no esta instalado")
+    from faster_whisper import WhisperModel  # type: ignore
+
+    model_path, local_only = resolve_model_path(model_size, model_dir, offline)
+    budget = budget or {}
+    num_workers = int(budget.get('num_workers', 1))
+
+    if use_gpu:
+        try:
+            model = WhisperModel(model_path, device="cuda", compute_type="float16",
+                                 num_workers=num_workers, local_files_only=local_only)
+            return model, {'device': 'cuda', 'compute_type': 'float16',
+                           'cpu_threads': 0, 'num_workers': num_workers,
+                           'model_path': model_path}
+        except Exception as e:
+            print(f"Aviso: error al cargar Whisper en GPU ({e}); usando CPU")
+
+    compute_type = "int8"
+    cpu_threads = int(budget.get('cpu_threads', 0))
+    if autotune and tuning_cache:
+        try:
+            from .whisper_tuning import _whisper_benchmark, tune_cpu_settings
+            tuned = tune_cpu_settings(model_size, cpu_threads or (os.cpu_count() or 1), tuning_cache,
+                                      benchmark=_whisper_benchmark(model_path))
+            compute_type = tuned['compute_type']
+            cpu_threads = int(tuned['cpu_threads'])
+        except Exception as e:
+            print(f"Aviso: calibracion de Whisper no disponible ({e}); usando int8")
+
+    model = WhisperModel(
+        model_path,
+        device="cpu",
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+        num_workers=num_workers,
+        local_files_only=local_only,
+    )
+    return model, {'device': 'cpu', 'compute_type': compute_type,
+                   'cpu_threads': cpu_threads, 'num_workers': num_workers,
+                   'model_path': model_path}
+
+
+def resolve_model_path(model_size: str, model_dir: Optional[str] = None,
+                       offline: bool = False) -> Tuple[str, bool]:
+    """
+    Decide desde donde cargar el modelo.
+
+    Returns:
+        Tupla (ruta o nombre, solo_local). Con el modelo en el almacen se
+        devuelve su ruta; sin el, en modo offline se falla en vez de
+        intentar una descarga.
+
+    Raises:
+        ModelStoreError: en modo offline, si el modelo no esta en el almacen
+    """
+    if os.path.isdir(model_size):
+        return model_size, True
+    if model_dir:
+        from .model_store import ModelStore, ModelStoreError
+        store = ModelStore(model_dir)
+        try:
+            return store.local_path(model_size), True
+        except ModelStoreError:
+            if offline:
+                raise
+            if store.has_model(model_size):
+                print(f"Aviso: el modelo '{model_size}' del almacen no supera la verificacion; "
+                      "se resolvera por nombre")
+    return model_size, offline
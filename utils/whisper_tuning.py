@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Calibracion del tipo de computo y numero de hilos de Whisper en CPU.
+La primera vez se mide cada combinacion con un clip de prueba y el resultado
+se guarda por (modelo, huella de CPU, limite de hilos); los arranques
+siguientes leen la eleccion del archivo sin volver a medir. La medida tarda,
+asi que conviene hacerla fuera del arranque:
+
+    python -m utils.whisper_tuning [modelo]
+"""
+
+from typing import Callable, Dict, List, Optional
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+# Tipos de computo de CTranslate2 a probar en CPU, por orden de preferencia
+CPU_COMPUTE_TYPES = ["int8", "int8_float32", "int16", "float32"]
+
+# Flags de CPU que cambian que kernels puede usar CTranslate2
+_RELEVANT_CPU_FLAGS = {
+    "avx", "avx2", "fma", "f16c", "avx512f", "avx512bw", "avx512_vnni",
+    "avx_vnni", "amx_int8", "neon", "asimd", "asimddp",
+}
+
+
+def cpu_fingerprint() -> str:
+    """Huella corta del procesador (arquitectura, nucleos y extensiones)."""
+    flags: List[str] = []
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(("flags", "Features")):
+                    flags = sorted(set(line.split(":", 1)[1].split()) & _RELEVANT_CPU_FLAGS)
+                    break
+    except OSError:
+        pass
+    parts = [platform.machine(), platform.processor(), str(os.cpu_count()), ",".join(flags)]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def supported_compute_types() -> List[str]:
+    """Tipos de computo disponibles en CPU para esta instalacion."""
+    try:
+        import ctranslate2  # type: ignore
+        available = set(ctranslate2.get_supported_compute_types("cpu"))
+        types = [t for t in CPU_COMPUTE_TYPES if t in available]
+        return types or ["int8"]
+    except Exception:
+        return ["int8"]
+
+
+def calibration_clip(sample_rate: int = 16000, seconds: float = 5.0) -> np.ndarray:
+    """
+    Clip de calibracion determinista: armonicos con envolvente silabica y
+    ruido leve. Basta para medir el coste del codificador, que domina el tiempo.
+    """
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    rng = np.random.default_rng(1234)
+    voiced = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((140, 280, 560, 1120, 2240)))
+    envelope = np.clip(np.sin(2 * np.pi * 3.5 * t), 0.0, None)
+    clip = 0.2 * voiced * envelope + 0.005 * rng.standard_normal(len(t))
+    return clip.astype(np.float32)
+
+
+def _whisper_benchmark(model_size: str) -> Callable[[str, int], float]:
+    """Mide una transcripcion completa del clip con cada combinacion."""
+    from faster_whisper import WhisperModel  # type: ignore
+
+    clip = calibration_clip()
+
+    def run(compute_type: str, cpu_threads: int) -> float:
+        model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+        # Primera pasada de calentamiento (reserva de memoria, caches)
+        segments, _ = model.transcribe(clip, beam_size=1)
+        list(segments)
+        start = time.perf_counter()
+        segments, _ = model.transcribe(clip, beam_size=5)
+        list(segments)
+        return time.perf_counter() - start
+
+    return run
+
+
+def _load_cache(cache_path: Path) -> Dict[str, Dict]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache_path: Path, cache: Dict[str, Dict]) -> None:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+def tune_cpu_settings(model_size: str, max_threads: int, cache_path: str,
+                      benchmark: Optional[Callable[[str, int], float]] = None) -> Dict:
+    """
+    Devuelve el tipo de computo y los hilos mas rapidos para este equipo.
+
+    Args:
+        model_size: Nombre o ruta del modelo
+        max_threads: Hilos maximos permitidos por el perfil de rendimiento
+        cache_path: Archivo JSON donde se guardan las calibraciones
+        benchmark: Funcion (compute_type, cpu_threads) -> segundos; por
+                   defecto transcribe el clip de calibracion con faster-whisper
+
+    Returns:
+        Diccionario con 'compute_type' y 'cpu_threads' (y metadatos)
+    """
+    max_threads = max(1, int(max_threads))
+    key = f"{model_size}|{cpu_fingerprint()}|{max_threads}"
+    path = Path(cache_path)
+    cache = _load_cache(path)
+    if key in cache:
+        return cache[key]
+
+    print(f"Calibrando Whisper '{model_size}' en CPU (solo la primera vez)...")
+    run = benchmark or _whisper_benchmark(model_size)
+
+    # 1) Tipo de computo con todos los hilos permitidos
+    timings: Dict[str, float] = {}
+    for compute_type in supported_compute_types():
+        try:
+            timings[f"{compute_type}@{max_threads}"] = run(compute_type, max_threads)
+        except Exception as e:
+            print(f"Aviso: no se pudo medir {compute_type}: {e}")
+    if not timings:
+        return {"compute_type": "int8", "cpu_threads": max_threads}
+    best_type = min(timings, key=timings.get).split("@")[0]
+
+    # 2) Numero de hilos con el mejor tipo (mas hilos no siempre es mas rapido)
+    for threads in sorted({max_threads // 2, (max_threads * 3) // 4} - {0, max_threads}):
+        try:
+            timings[f"{best_type}@{threads}"] = run(best_type, threads)
+        except Exception as e:
+            print(f"Aviso: no se pudo medir {best_type} con {threads} hilos: {e}")
+    best = min((k for k in timings if k.startswith(best_type + "@")), key=timings.get)
+
+    result = {
+        "compute_type": best_type,
+        "cpu_threads": int(best.split("@")[1]),
+        "seconds": round(timings[best], 4),
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+        "measured_at": datetime.now().isoformat(),
+    }
+    cache[key] = result
+    try:
+        _save_cache(path, cache)
+    except OSError as e:
+        print(f"Aviso: no se pudo guardar la calibracion: {e}")
+    print(f"Calibracion: {result['compute_type']} con {result['cpu_threads']} hilos")
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Linea de comandos: calibra un modelo y guarda el resultado en WHISPER_TUNING_CACHE."""
+    sys.path.append(str(Path(__file__).parent.parent))
+    from config.config import config  # type: ignore
+    from utils.whisper_loader import resolve_model_path  # type: ignore
+
+    parser = argparse.ArgumentParser(description="Calibracion de Whisper en CPU")
+    parser.add_argument("model", nargs="?", default=config.whisper_model,
+                        help="Modelo (por defecto WHISPER_MODEL)")
+    args = parser.parse_args(argv)
+
+    max_threads = config.get_performance_budget()["cpu_threads"]
+    model_path, _ = resolve_model_path(args.model, config.whisper_model_dir, config.whisper_offline)
+    result = tune_cpu_settings(args.model, max_threads, config.whisper_tuning_cache,
+                               benchmark=_whisper_benchmark(model_path))
+    print(f"Guardado en {config.whisper_tuning_cache}; activa WHISPER_AUTOTUNE=true para usarlo")
+    return 0 if "seconds" in result else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,20 @@ let appState = {
   currentText: ''
 };
 
+// Id de este navegador: el servidor recuerda por cliente el idioma detectado
+function getClientId() {
+  if (appState.clientId) return appState.clientId;
+  let id = null;
+  try { id = localStorage.getItem('clientId'); } catch (e) {}
+  if (!id) {
+    id = (window.crypto && crypto.randomUUID) ? crypto.randomUUID()
+      : Date.now().toString(36) + Math.random().toString(36).slice(2);
+    try { localStorage.setItem('clientId', id); } catch (e) {}
+  }
+  appState.clientId = id;
+  return id;
+}
+
 // Elementos del DOM
 const elements = {
   recordBtn: document.getElementById('record-btn'),
@@ -145,7 +159,7 @@ async function startRecording() {
     const response = await fetch('/api/start_recording', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ use_llm: useLlm })
+      body: JSON.stringify({ use_llm: useLlm, client_id: getClientId() })
     });
     const data = await response.json();
     if (response.ok) {
@@ -168,54 +182,173 @@ async function startRecording() {
 
 // Detener Grabación
 async function stopRecording() {
+  let stillRecording = false;
   try {
     showLoadingOverlay(true);
     const useLlm = !!(elements.useLlmCheckbox && elements.useLlmCheckbox.checked);
-    const response = await fetch('/api/stop_recording', {
+    const response = await fetch('/api/stop_recording/stream', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify({ use_llm: useLlm })
     });
-    const data = await response.json();
-    if (response.ok) {
-      if (data.result && data.result.success) {
-        showCurrentTranscription(data.result.text);
-        await loadRecentDictations();
-        showToast('Transcripción completada', 'success');
-      } else {
-        throw new Error((data.result && data.result.error) || 'Error al procesar audio');
+    if (response.status === 429) {
+      // Servidor saturado: la grabación sigue, se puede volver a detener más tarde
+      stillRecording = true;
+      const retryAfter = response.headers.get('Retry-After') || '?';
+      showToast(`Servidor ocupado, vuelve a intentarlo en ${retryAfter} s`, 'warning');
+      return;
+    }
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw new Error(data.error || 'Error al detener Grabación');
+    }
+    // Mostrar el texto según llega cada segmento
+    const result = await readTranscriptionStream(response, (partial) => {
+      showLoadingOverlay(false);
+      showPartialTranscription(partial);
+    });
+    if (result && result.success) {
+      showCurrentTranscription(result.text);
+      await loadRecentDictations();
+      showToast('Transcripción completada', 'success');
+      if (result.llm_pending) {
+        // El LLM no respondió a tiempo: su versión llegará al dictado más tarde
+        pollLlmResult(result.dictation_id);
       }
     } else {
-      throw new Error(data.error || 'Error al detener Grabación');
+      throw new Error((result && result.error) || 'Error al procesar audio');
     }
   } catch (error) {
     console.error('Error al detener Grabación:', error);
     showToast('Error al procesar audio: ' + error.message, 'error');
   } finally {
-    appState.isRecording = false;
-    updateRecordingUI(false);
-    stopRecordingTimer();
     showLoadingOverlay(false);
+    if (!stillRecording) {
+      appState.isRecording = false;
+      updateRecordingUI(false);
+      stopRecordingTimer();
+    }
+  }
+}
+
+// Esperar el texto mejorado por el LLM de un dictado entregado sin él
+async function pollLlmResult(dictationId, attempts = 60) {
+  for (let i = 0; i < attempts; i++) {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    try {
+      const response = await fetch(`/api/dictations/${dictationId}`);
+      if (!response.ok) return;
+      const data = await response.json();
+      const status = data.dictation && data.dictation.metadata && data.dictation.metadata.llm_status;
+      if (status === 'done') {
+        showCurrentTranscription(data.dictation.text);
+        await loadRecentDictations();
+        showToast('Texto mejorado con IA', 'success');
+        return;
+      }
+      if (status !== 'pending') return;
+    } catch (error) {
+      console.error('Error al consultar el dictado:', error);
+      return;
+    }
   }
 }
 
+// Leer la respuesta NDJSON de /api/stop_recording/stream
+async function readTranscriptionStream(response, onPartial) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = '';
+  let improved = '';
+  let result = null;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event = JSON.parse(line);
+      if (event.type === 'segment') {
+        partial = partial ? `${partial} ${event.text}` : event.text;
+        onPartial(partial);
+      } else if (event.type === 'llm') {
+        // Texto mejorado por el LLM según llega
+        improved += event.text;
+        onPartial(improved);
+      } else if (event.type === 'result') {
+        result = event.result;
+      }
+    }
+  }
+  if (buffer.trim()) {
+    const event = JSON.parse(buffer);
+    if (event.type === 'result') result = event.result;
+  }
+  return result;
+}
+
+// Post-procesado en streaming (Server-Sent Events de /api/postprocess/stream):
+// llama a onPartial con el texto acumulado y devuelve el texto final
+async function streamPostprocess(operation, text, onPartial) {
+  const response = await fetch('/api/postprocess/stream', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ text, operation })
+  });
+  if (!response.ok) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || 'Error en el post-procesado');
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      const eventLine = message.split('\n').find((l) => l.startsWith('event: '));
+      const dataLine = message.split('\n').find((l) => l.startsWith('data: '));
+      if (!eventLine || !dataLine) continue;
+      const event = eventLine.slice(7);
+      const data = JSON.parse(dataLine.slice(6));
+      if (event === 'delta') {
+        partial += data.text;
+        onPartial(partial);
+      } else if (event === 'done') {
+        return data.text;
+      } else if (event === 'error') {
+        throw new Error(data.error);
+      }
+    }
+  }
+  if (!partial) throw new Error('Respuesta incompleta del LLM');
+  return partial;
+}
+
 // Generar resumen bajo demanda
 async function generateSummary() {
   if (!appState.currentText) return showToast('No hay Transcripción disponible', 'warning');
   if (!(appState.systemStatus && appState.systemStatus.llm_available)) return showToast('LLM no está disponible', 'warning');
   try {
     elements.summaryBtn && (elements.summaryBtn.disabled = true);
-    const resp = await fetch('/api/postprocess', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ text: appState.currentText, do_summary: true, do_translate_en: false })
+    // El resumen se va mostrando según lo genera el LLM
+    let shown = false;
+    const summary = await streamPostprocess('summary', appState.currentText, (partial) => {
+      if (!shown) {
+        showSummary(partial);
+        shown = true;
+      } else {
+        elements.summaryBox.innerHTML = `<p>${escapeHtml(partial)}</p>`;
+      }
     });
-    const data = await resp.json();
-    if (resp.ok && data.result && data.result.summary) {
-      showSummary(data.result.summary);
-    } else {
-      throw new Error(data.error || 'No fue posible generar el resumen');
-    }
+    showSummary(summary);
   } catch (e) {
     console.error('Error al generar resumen:', e);
     showToast('Error al generar resumen', 'error');
@@ -230,17 +363,16 @@ async function translateCurrentText() {
   if (!(appState.systemStatus && appState.systemStatus.llm_available)) return showToast('LLM no está disponible', 'warning');
   try {
     elements.translateBtn && (elements.translateBtn.disabled = true);
-    const resp = await fetch('/api/postprocess', {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ text: appState.currentText, do_summary: false, do_translate_en: true })
+    let shown = false;
+    const translation = await streamPostprocess('translation_en', appState.currentText, (partial) => {
+      if (!shown) {
+        showTranslation(partial);
+        shown = true;
+      } else {
+        elements.translationBox.innerHTML = `<p>${escapeHtml(partial)}</p>`;
+      }
     });
-    const data = await resp.json();
-    if (resp.ok && data.result && data.result.translation_en) {
-      showTranslation(data.result.translation_en);
-    } else {
-      throw new Error(data.error || 'No fue posible traducir');
-    }
+    showTranslation(translation);
   } catch (e) {
     console.error('Error al traducir:', e);
     showToast('Error al traducir', 'error');
@@ -311,6 +443,13 @@ function showCurrentTranscription(text) {
   }, 100);
 }
 
+function showPartialTranscription(text) {
+  const box = elements.currentTranscription;
+  if (!box) return;
+  box.innerHTML = `<p>${escapeHtml(text)}</p>`;
+  box.classList.add('has-content');
+}
+
 // Dictados
 async function loadRecentDictations() {
   try {
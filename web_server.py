@@ -7,16 +7,21 @@ Incluye UI web, grabacion de audio y postprocesado opcional con LLM.
 
 from __future__ import annotations
 
-import os
 import sys
 import json
-import tempfile
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_cors import CORS
+from werkzeug.serving import BaseWSGIServer
 
 # Rutas de proyecto
 BASE_DIR = Path(__file__).parent.resolve()
@@ -25,20 +30,52 @@ sys.path.append(str(BASE_DIR / "config"))
 sys.path.append(str(BASE_DIR / "utils"))
 
 from config.config import config  # type: ignore
-from utils.audio_handler import AudioHandler  # type: ignore
-from utils.simple_vad import create_vad_detector  # type: ignore
-from utils.text_processor import TextProcessor, TranscriptionManager  # type: ignore
+from utils.admission import AdmissionController, AdmissionRejected, Slot  # type: ignore
+from utils.jobs import CancelToken, Job, JobCancelled, JobRegistry  # type: ignore
+from utils.speculative import SpeculativeDeferred, SpeculativeWorker  # type: ignore
+from utils.text_processor import COMBINED_FIELDS, TextProcessor, TranscriptionManager, estimate_tokens  # type: ignore
+from utils.whisper_loader import WHISPER_AVAILABLE, load_whisper_model  # type: ignore
+
+# numpy, sounddevice y faster-whisper se importan al inicializar los
+# componentes, no al importar el modulo
+if TYPE_CHECKING:
+    import numpy as np
+    from utils.audio_handler import AudioHandler  # type: ignore
+    from utils.audio_buffer import AudioSegmentBuffer  # type: ignore
+    from utils.transcriber import LanguageSession, Transcriber, TranscriptionResult  # type: ignore
 
 # Whisper (opcional, pero recomendado)
-try:
-    from faster_whisper import WhisperModel  # type: ignore
-    WHISPER_AVAILABLE = True
-except Exception:
+if not WHISPER_AVAILABLE:
     print("Aviso: faster-whisper no esta instalado. La transcripcion no estara disponible.")
-    WhisperModel = None  # type: ignore
-    WHISPER_AVAILABLE = False
 
-import numpy as np
+
+# Sesiones de idioma recordadas (una por cliente); se olvidan las menos recientes
+MAX_LANGUAGE_SESSIONS = 32
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Servidor WSGI que atiende las peticiones con un numero fijo de hilos."""
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, threads: int = 4, **kwargs) -> None:
+        super().__init__(host, port, app, **kwargs)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
 
 
 class WebDictationServer:
@@ -61,7 +98,8 @@ class WebDictationServer:
         CORS(self.app)
 
         # Componentes
-        self.whisper_model: Optional[WhisperModel] = None  # type: ignore
+        self.whisper_model: Optional[Any] = None
+        self.transcriber: Optional[Transcriber] = None
         self.audio_handler: Optional[AudioHandler] = None
         self.vad_detector = None
         self.text_processor: Optional[TextProcessor] = None
@@ -69,9 +107,55 @@ class WebDictationServer:
 
         # Estado
         self.is_recording: bool = False
-        self.audio_buffer: List[float] = []
+        self.audio_buffer: Optional[AudioSegmentBuffer] = None
         self._current_use_llm: bool = False
 
+        # Reparto de CPU del perfil de rendimiento
+        self.performance_budget: Dict = config.get_performance_budget()
+
+        # Trozos de grabaciones largas transcritos mientras se sigue grabando
+        self._transcription_executor = ThreadPoolExecutor(
+            max_workers=self.performance_budget['transcription_pool_size'],
+            thread_name_prefix='whisper'
+        )
+        self._chunk_futures: List[Tuple[int, Future]] = []  # (sample inicial, futuro)
+        self._chunk_start: int = 0
+
+        # Trabajos cancelables: uno por grabacion (captura, transcripcion y LLM)
+        self.jobs = JobRegistry()
+        self._current_job: Optional[Job] = None
+
+        # Control de admision: decodificaciones de Whisper y llamadas al LLM
+        # simultaneas, con cola acotada (429 + Retry-After si esta llena)
+        self.admission = AdmissionController(**config.get_admission_config())
+
+        # Operaciones de /api/postprocess (resumen, traduccion) en paralelo; cada
+        # una ya tiene su hueco de LLM al entrar, asi que el pool no hace cola
+        self.postprocess_timeout: float = config.postprocess_timeout
+        self.llm_combined: bool = config.llm_combined
+        # Plazo de la mejora con LLM al detener la grabacion (0 = sin limite)
+        self.llm_deadline: float = config.llm_deadline
+        self._postprocess_executor = ThreadPoolExecutor(
+            max_workers=self.admission.resources['llm'].max_concurrent,
+            thread_name_prefix='postprocess'
+        )
+
+        # Post-procesado especulativo: salidas de cada dictado nuevo calculadas
+        # en ratos ociosos y guardadas con el, para servirlas al instante
+        speculative = config.get_speculative_config()
+        self.speculative_fields: List[str] = [f for f in speculative['fields'] if f in COMBINED_FIELDS]
+        self.speculative: Optional[SpeculativeWorker] = None
+        if speculative['enabled'] and self.speculative_fields:
+            self.speculative = SpeculativeWorker(
+                self._speculate, self._llm_idle,
+                min_interval=speculative['min_interval'],
+                token_budget=speculative['token_budget'],
+            )
+
+        # Idioma detectado por cliente (WHISPER_LANGUAGE=auto), LRU acotado
+        self._language_sessions: "OrderedDict[str, LanguageSession]" = OrderedDict()
+        self._language_session: Optional[LanguageSession] = None
+
         self._setup_routes()
         self._initialize_components()
         print("Servidor web inicializado")
@@ -113,7 +197,17 @@ class WebDictationServer:
                     'whisper_language': config.whisper_language,
                     'llm_enabled': config.llm_enabled,
                     'llm_provider': config.llm_provider,
-                }
+                },
+                'performance': self.performance_budget,
+                'transcription_cache': (self.transcriber.cache.get_stats()
+                                        if self.transcriber and self.transcriber.cache else None),
+                'dropped_segments': self.transcriber.dropped_segments if self.transcriber else 0,
+                'admission': self.admission.get_stats(),
+                'llm_cache': (self.text_processor.cache.get_stats()
+                              if self.text_processor and self.text_processor.cache else None),
+                'llm_router': (self.text_processor.router.get_stats()
+                               if getattr(self.text_processor, 'router', None) else None),
+                'speculative': self.speculative.get_stats() if self.speculative else None,
             })
 
         @self.app.route('/api/start_recording', methods=['POST'])
@@ -124,8 +218,11 @@ class WebDictationServer:
             data = request.get_json(silent=True) or {}
             self._current_use_llm = bool(data.get('use_llm', False))
             try:
-                self._start_recording(self._current_use_llm)
-                return jsonify({'status': 'success', 'message': 'Grabacion iniciada'})
+                # Id que el navegador guarda en localStorage; sin el, la IP
+                client_id = str(data.get('client_id') or '').strip()[:64]
+                job = self._start_recording(self._current_use_llm,
+                                            session_key=client_id or request.remote_addr or '')
+                return jsonify({'status': 'success', 'message': 'Grabacion iniciada', 'job_id': job.id})
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
@@ -136,9 +233,58 @@ class WebDictationServer:
             try:
                 result = self._stop_recording(self._current_use_llm)
                 return jsonify({'status': 'success', 'result': result})
+            except AdmissionRejected as e:
+                return _rejected_response(e)
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @self.app.route('/api/stop_recording/stream', methods=['POST'])
+        def stop_recording_stream():
+            """Como /api/stop_recording, pero en NDJSON: un evento por segmento y el resultado al final."""
+            if not self.is_recording:
+                return jsonify({'error': 'No se esta grabando'}), 400
+            try:
+                events, job, slot = self._stop_recording_events(self._current_use_llm)
+            except AdmissionRejected as e:
+                return _rejected_response(e)
+
+            def generate():
+                finished = False
+                try:
+                    for event in events:
+                        yield json.dumps(event, ensure_ascii=False) + '\n'
+                    finished = True
+                finally:
+                    # Cliente desconectado a mitad: liberar la CPU
+                    if not finished and job is not None:
+                        self._cancel_job(job.id, 'cliente desconectado')
+
+            def on_close():
+                # Tambien si la respuesta se cierra sin llegar a iterarse: el
+                # generador no ha empezado y su finally no se ejecuta
+                if job is not None and job.status == 'running':
+                    self._cancel_job(job.id, 'cliente desconectado')
+                if slot is not None:
+                    slot.release()
+
+            response = Response(generate(), mimetype='application/x-ndjson')
+            response.call_on_close(on_close)
+            return response
+
+        @self.app.route('/api/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id):
+            job = self.jobs.get(job_id)
+            if job is None:
+                return jsonify({'error': 'Trabajo no encontrado'}), 404
+            return jsonify({'status': 'success', 'job': job.to_dict()})
+
+        @self.app.route('/api/jobs/<job_id>', methods=['DELETE'])
+        def cancel_job(job_id):
+            job = self._cancel_job(job_id, 'cancelado por el cliente')
+            if job is None:
+                return jsonify({'error': 'Trabajo no encontrado'}), 404
+            return jsonify({'status': 'success', 'job': job.to_dict()})
+
         @self.app.route('/api/dictations')
         def get_dictations():
             try:
@@ -172,44 +318,147 @@ class WebDictationServer:
             try:
                 data = request.get_json(silent=True) or {}
                 text = (data.get('text') or '').strip()
-                do_summary = bool(data.get('do_summary', True))
-                do_translate_en = bool(data.get('do_translate_en', False))
+                requested = {
+                    'summary': bool(data.get('do_summary', True)),
+                    'translation_en': bool(data.get('do_translate_en', False)),
+                    'tasks': bool(data.get('do_tasks', False)),
+                    'cleaned': bool(data.get('do_cleanup', False)),
+                }
+                fields = [field for field, wanted in requested.items() if wanted]
+                result: Dict[str, Optional[str]] = {'summary': None, 'translation_en': None}
+                result.update({field: None for field in fields})
                 if not text:
-                    return jsonify({'status': 'success', 'result': {'summary': None, 'translation_en': None}})
-
-                summary = None
-                translation_en = None
-                if self.text_processor and self.text_processor.is_available():
-                    if do_summary:
-                        try:
-                            summary = self.text_processor.improve_text(text, 'summary')
-                        except Exception as e:
-                            print(f"Error en resumen: {e}")
-                    if do_translate_en:
-                        try:
-                            translation_en = self.text_processor.translate_text(text, 'en')
-                        except Exception as e:
-                            print(f"Error en traduccion: {e}")
-                else:
+                    return jsonify({'status': 'success', 'result': result})
+
+                # Salidas ya calculadas en segundo plano para este dictado
+                precomputed = self._precomputed(text, data.get('dictation_id'))
+                served = [field for field in fields if field in precomputed]
+                result.update({field: precomputed[field] for field in served})
+                fields = [field for field in fields if field not in precomputed]
+
+                errors: Dict[str, str] = {}
+                if fields and self.text_processor and self.text_processor.is_available():
+                    processor = self.text_processor
+                    if self.llm_combined and len(fields) > 1:
+                        # Una sola llamada con todas las salidas en JSON
+                        outputs, errors = self._run_postprocess({
+                            'combined': lambda cancel: processor.process_combined(text, fields, cancel=cancel)
+                        })
+                        combined = outputs.get('combined') or {}
+                        error = errors.pop('combined', None)
+                        for field in fields:
+                            result[field] = combined.get(field)
+                            if result[field] is None:
+                                errors[field] = error or 'sin respuesta del LLM'
+                    else:
+                        outputs, errors = self._run_postprocess({
+                            field: (lambda cancel, field=field: processor.process_field(field, text, cancel=cancel))
+                            for field in fields
+                        })
+                        result.update(outputs)
+                elif fields:
                     print('LLM no disponible para post-procesado')
 
-                return jsonify({'status': 'success', 'result': {
-                    'summary': summary,
-                    'translation_en': translation_en
-                }})
+                response = {'status': 'success', 'result': result}
+                if served:
+                    response['precomputed'] = served
+                if errors:
+                    response['errors'] = errors
+                return jsonify(response)
+            except AdmissionRejected as e:
+                return _rejected_response(e)
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @self.app.route('/api/postprocess/stream', methods=['POST'])
+        def postprocess_stream():
+            """
+            Una operacion de post-procesado ('summary', 'translation_en', 'tasks'
+            o 'cleaned') en Server-Sent Events: un evento 'delta' por fragmento
+            del LLM y un evento 'done' con el texto completo.
+            """
+            data = request.get_json(silent=True) or {}
+            text = (data.get('text') or '').strip()
+            operation = data.get('operation', 'summary')
+            if operation not in ('summary', 'translation_en', 'tasks', 'cleaned'):
+                return jsonify({'error': f'Operacion no soportada: {operation}'}), 400
+            if not text:
+                return jsonify({'error': 'Texto vacio'}), 400
+            precomputed = self._precomputed(text, data.get('dictation_id')).get(operation)
+            if precomputed:
+                # Ya calculado en segundo plano: todo el texto de una vez
+                events = _sse_event('delta', {'text': precomputed}) + _sse_event('done', {'text': precomputed})
+                return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+            if not (self.text_processor and self.text_processor.is_available()):
+                return jsonify({'error': 'LLM no disponible'}), 503
+            try:
+                slot = self._acquire_llm()
+            except AdmissionRejected as e:
+                return _rejected_response(e)
+
+            cancel = CancelToken()
+            stream = self.text_processor.process_field_stream(operation, text, cancel=cancel)
+
+            def generate():
+                finished = False
+                try:
+                    for delta in stream:
+                        yield _sse_event('delta', {'text': delta})
+                    if stream.text is None:
+                        yield _sse_event('error', {'error': 'sin respuesta del LLM'})
+                    else:
+                        yield _sse_event('done', {'text': stream.text})
+                    finished = True
+                finally:
+                    # Cliente desconectado a mitad: cortar la respuesta del LLM
+                    if not finished:
+                        cancel.cancel('cliente desconectado')
+                    slot.release()
+
+            response = Response(generate(), mimetype='text/event-stream',
+                                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+            # Tambien si la respuesta se cierra sin llegar a iterarse
+            response.call_on_close(slot.release)
+            return response
+
     def _initialize_components(self) -> None:
         try:
-            if WHISPER_AVAILABLE and WhisperModel is not None:  # type: ignore
+            from utils.audio_handler import AudioHandler  # type: ignore
+            from utils.llm_cache import LLMResponseCache  # type: ignore
+            from utils.llm_client import prewarm_llm_client  # type: ignore
+            from utils.simple_vad import create_vad_detector  # type: ignore
+            from utils.transcriber import Transcriber  # type: ignore
+            from utils.transcription_cache import TranscriptionCache  # type: ignore
+
+            if WHISPER_AVAILABLE:
                 print("Cargando modelo Whisper...")
-                self.whisper_model = WhisperModel(
+                self.whisper_model, whisper_settings = load_whisper_model(
                     config.whisper_model,
-                    device='cpu',
-                    compute_type='int8'
+                    use_gpu=False,
+                    budget=self.performance_budget,
+                    autotune=config.whisper_autotune,
+                    tuning_cache=config.whisper_tuning_cache,
+                    model_dir=config.whisper_model_dir,
+                    offline=config.whisper_offline
+                )
+                self.performance_budget['whisper'] = whisper_settings
+                cache_config = config.get_transcription_cache_config()
+                cache = TranscriptionCache(**cache_config) if cache_config.pop('enabled') else None
+                self.transcriber = Transcriber(
+                    self.whisper_model,
+                    model_name=config.whisper_model,
+                    language=config.whisper_language,
+                    sample_rate=config.sample_rate,
+                    cache=cache,
+                    model_settings=whisper_settings,
+                    language_confidence=config.language_detection_confidence,
+                    language_recheck_logprob=config.language_recheck_logprob,
+                    no_speech_threshold=config.segment_no_speech_threshold,
+                    logprob_threshold=config.segment_logprob_threshold,
                 )
-                print(f"Modelo Whisper cargado: {config.whisper_model}")
+                print(f"Modelo Whisper cargado: {config.whisper_model} "
+                      f"({whisper_settings['compute_type']}, {whisper_settings['cpu_threads']} hilos, "
+                      f"{whisper_settings['num_workers']} workers)")
             else:
                 print("Whisper no disponible; la transcripcion estara deshabilitada")
 
@@ -226,12 +475,26 @@ class WebDictationServer:
             )
 
             print("Configurando procesamiento de texto...")
+            llm_cache_config = config.get_llm_cache_config()
+            llm_cache = LLMResponseCache(**llm_cache_config) if llm_cache_config.pop('enabled') else None
             self.text_processor = TextProcessor(
                 api_key=config.openai_api_key,
                 model=config.openai_model,
                 provider=config.llm_provider,
                 base_url=config.llm_base_url,
+                cache=llm_cache,
+                client_settings=config.get_llm_client_config(),
+                summary_chunk_tokens=config.llm_summary_chunk_tokens,
+                summary_workers=config.llm_summary_workers,
+                endpoints=config.get_llm_endpoints(),
+                # Los trozos de un resumen largo que van en paralelo con el
+                # primero usan huecos de LLM libres, sin quitarselos a la cola
+                acquire_slot=lambda: self.admission.try_acquire('llm'),
+                hedge=config.llm_hedge,
             )
+            if config.llm_prewarm and self.text_processor.is_available():
+                for client in self.text_processor.llm_clients():
+                    prewarm_llm_client(client)
 
             self.transcription_manager = TranscriptionManager(config.output_dir)
             print("Componentes inicializados correctamente")
@@ -239,31 +502,100 @@ class WebDictationServer:
             print(f"Error al inicializar componentes: {e}")
             # No relanzar para permitir que la UI cargue y se puedan ver estados
 
-    def _start_recording(self, use_llm: bool = False) -> None:
-        self.audio_buffer = []
+    def _start_recording(self, use_llm: bool = False, session_key: str = '') -> Job:
+        from utils.audio_buffer import AudioSegmentBuffer  # type: ignore
+
+        # Una grabacion nueva deja obsoleta la transcripcion anterior
+        for previous in self.jobs.active():
+            self._cancel_job(previous.id, 'nueva grabacion')
+        job = self.jobs.create('dictation')
+        self._current_job = job
+
+        if self.transcriber:
+            session = self._language_sessions.pop(session_key, None) or self.transcriber.new_session()
+            self._language_sessions[session_key] = session
+            while len(self._language_sessions) > MAX_LANGUAGE_SESSIONS:
+                self._language_sessions.popitem(last=False)
+            self._language_session = session
+        self.audio_buffer = AudioSegmentBuffer(sample_rate=config.sample_rate, pre_roll=0.0)
+        self._chunk_futures = []
+        self._chunk_start = 0
         self._current_use_llm = use_llm
+        max_samples = int(config.max_utterance_duration * config.sample_rate)
+        window_samples = int(config.cut_search_window * config.sample_rate)
 
         def cb(indata, frames, t, status):
             if not self.is_recording:
                 return
             try:
-                self.audio_buffer.extend(indata.flatten().tolist())
-                # Limitar buffer a ~60s
-                max_buffer_size = config.sample_rate * 300
-                if len(self.audio_buffer) > max_buffer_size:
-                    self.audio_buffer = self.audio_buffer[-max_buffer_size:]
+                self.audio_buffer.append(indata)
+                # Grabacion larga: cortar en el punto mas silencioso y transcribir
+                # ese trozo en segundo plano (no se descarta audio)
+                total = self.audio_buffer.total_samples
+                if max_samples and total - self._chunk_start >= max_samples:
+                    cut = self.audio_buffer.quietest_point(total - window_samples, total)
+                    chunk = self.audio_buffer.segment(self._chunk_start, cut).copy()
+                    self._chunk_futures.append((self._chunk_start, self._transcription_executor.submit(
+                        self._transcribe_audio, chunk, job.token)))
+                    self.audio_buffer.release(cut)
+                    self._chunk_start = cut
             except Exception as e:
                 print(f"Error procesando audio: {e}")
 
         if not self.audio_handler:
+            self.jobs.finish(job, 'error')
             raise RuntimeError('Audio no disponible')
         self.audio_handler.start_recording(cb)
         self.is_recording = True
         print("Grabacion iniciada")
+        return job
+
+    def _cancel_job(self, job_id: str, reason: str) -> Optional[Job]:
+        """
+        Cancela un trabajo: si aun se esta grabando se detiene la captura, los
+        trozos pendientes no llegan a transcribirse y los que estan en curso
+        (Whisper o LLM) se interrumpen en su siguiente comprobacion.
+        """
+        job = self.jobs.cancel(job_id, reason)
+        if job is None or job is not self._current_job:
+            return job
+        if self.is_recording:
+            self.is_recording = False
+            try:
+                if self.audio_handler:
+                    self.audio_handler.stop_recording()
+            except Exception:
+                pass
+        for _, future in self._chunk_futures:
+            future.cancel()
+        print(f"Trabajo {job.id} cancelado: {reason}")
+        return job
 
     def _stop_recording(self, use_llm: bool = False) -> Dict:
+        result: Dict = {}
+        events, _, _ = self._stop_recording_events(use_llm)
+        for event in events:
+            if event['type'] == 'result':
+                result = event['result']
+        return result
+
+    def _stop_recording_events(self, use_llm: bool = False
+                               ) -> Tuple[Iterator[Dict], Optional[Job], Optional[Slot]]:
+        """
+        Detiene la grabacion y devuelve un generador de eventos: uno
+        {'type': 'segment'} por cada segmento en cuanto se transcribe y, al
+        final, {'type': 'result'} con lo mismo que /api/stop_recording.
+        Tambien devuelve el trabajo y el hueco de Whisper, que el generador
+        libera al terminar; si no llega a iterarse, debe liberarlos quien lo
+        abandona (Slot.release es idempotente).
+        """
         if not self.is_recording:
-            return {'error': 'No se esta grabando'}
+            return iter([{'type': 'result', 'result': {'error': 'No se esta grabando'}}]), None, None
+
+        # Si Whisper esta saturado se rechaza antes de parar: la grabacion
+        # sigue y el cliente puede reintentar sin perder audio
+        job = self._current_job or self.jobs.create('dictation')
+        slot = self.admission.acquire('whisper', cancel=job.token)
 
         self.is_recording = False
         try:
@@ -272,77 +604,317 @@ class WebDictationServer:
         except Exception:
             pass
 
-        if len(self.audio_buffer) == 0:
-            return {'error': 'No se capturo audio'}
+        chunks, self._chunk_futures = self._chunk_futures, []
+        return self._transcription_events(chunks, use_llm, job, slot), job, slot
+
+    def _transcription_events(self, chunks: List[Tuple[int, Future]], use_llm: bool,
+                              job: Job, slot: Slot) -> Iterator[Dict]:
+        if self.audio_buffer is None or self.audio_buffer.total_samples == 0:
+            slot.release()
+            self.jobs.finish(job, 'error')
+            yield {'type': 'result', 'result': {'error': 'No se capturo audio'}}
+            return
 
+        status = 'error'
         try:
-            # numpy array
-            audio_data = np.array(self.audio_buffer, dtype=np.float32)
-            if self.audio_handler:
+            from utils.transcriber import mean_avg_logprob  # type: ignore
+
+            if not self.transcriber:
+                yield {'type': 'result', 'result': {'error': 'Whisper no disponible'}}
+                return
+
+            duration = float(self.audio_buffer.total_samples) / float(config.sample_rate)
+            audio_data = self.audio_buffer.segment(self._chunk_start, self.audio_buffer.total_samples)
+            if not chunks and self.audio_handler:
                 audio_data = self.audio_handler.trim_silence(audio_data)
-            if len(audio_data) == 0:
-                return {'error': 'Audio vacio despues de limpiar silencios'}
+                if len(audio_data) == 0:
+                    yield {'type': 'result', 'result': {'error': 'Audio vacio despues de limpiar silencios'}}
+                    return
 
-            # Guardar WAV temporal
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                fname = tmp.name
-            try:
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                import wave
-                with wave.open(fname, 'wb') as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2)
-                    wf.setframerate(config.sample_rate)
-                    wf.writeframes(audio_int16.tobytes())
-
-                if not self.whisper_model:
-                    return {'error': 'Whisper no disponible'}
-
-                segments, info = self.whisper_model.transcribe(
-                    fname,
-                    language=(config.whisper_language if config.whisper_language != 'auto' else None),
-                    beam_size=5,
-                    best_of=5,
-                )
-            finally:
-                try:
-                    os.unlink(fname)
-                except Exception:
-                    pass
+            # Trozos ya enviados (en orden) + el resto de la grabacion, que se
+            # entrega segmento a segmento segun lo decodifica Whisper
+            results = []
+            for start_sample, future in chunks:
+                job.token.raise_if_cancelled()
+                chunk_result = future.result()
+                if chunk_result is None:
+                    continue
+                results.append(chunk_result)
+                for segment in chunk_result.segments:
+                    if segment.text.strip():
+                        yield _segment_event(segment, start_sample)
+            if len(audio_data):
+                stream = self.transcriber.transcribe_stream(audio_data, session=self._language_session,
+                                                            cancel=job.token)
+                for segment in stream:
+                    yield _segment_event(segment, self._chunk_start)
+                results.append(stream.result)
+            slot.release()
 
-            text = " ".join(s.text for s in segments).strip()
+            text = " ".join(r.text for r in results if r.text).strip()
+            dropped = sum(r.dropped_segments for r in results)
             if not text:
-                return {'error': 'No se detecto texto en el audio'}
+                yield {'type': 'result', 'result': {'error': 'No se detecto texto en el audio',
+                                                    'dropped_segments': dropped}}
+                return
 
-            processed = self._process_text(text, use_llm)
-            dictation_id = self._save_dictation(processed, audio_data)
+            # Texto dudoso: no merece la llamada al LLM
+            mean = mean_avg_logprob([s for r in results for s in r.segments])
+            low_confidence = mean is not None and mean < config.segment_logprob_threshold
+            if use_llm and low_confidence:
+                print("Transcripcion de baja confianza: se omite el LLM")
+
+            processed, pending = yield from self._process_text_events(text, use_llm and not low_confidence,
+                                                                      cancel=job.token)
+            job.token.raise_if_cancelled()
+            dictation_id = self._save_dictation(processed, duration)
+            dictation = self.transcription_manager.get_transcription(dictation_id) if self.transcription_manager else None
+            if dictation is not None:
+                # Entradas de la cache de transcripciones con este audio: se
+                # borran junto con el dictado
+                dictation['transcription_cache_keys'] = [key for r in results for key in r.cache_keys]
             self._cleanup_old_dictations()
+            if pending is not None:
+                # El texto del LLM se incorpora al dictado cuando llegue
+                if dictation is not None:
+                    dictation.setdefault('metadata', {})['llm_status'] = 'pending'
+                pending.add_done_callback(lambda future: self._attach_llm_result(dictation_id, future))
+            else:
+                self._queue_speculative(dictation_id, processed)
 
-            return {
+            yield {'type': 'result', 'result': {
                 'success': True,
                 'text': processed,
                 'original_text': text,
                 'dictation_id': dictation_id,
-                'duration': float(len(audio_data)) / float(config.sample_rate),
-            }
+                'duration': duration,
+                'dropped_segments': dropped,
+                'low_confidence': low_confidence,
+                'llm_pending': pending is not None,
+                'job_id': job.id,
+            }}
+            status = 'done'
+        except (JobCancelled, CancelledError):
+            yield {'type': 'result', 'result': {'error': 'Transcripcion cancelada', 'cancelled': True,
+                                                'job_id': job.id}}
         except Exception as e:
             print(f"Error al procesar audio: {e}")
-            return {'error': str(e)}
+            yield {'type': 'result', 'result': {'error': str(e)}}
+        finally:
+            slot.release()
+            self.jobs.finish(job, status)
+
+    def _transcribe_audio(self, audio_data: np.ndarray,
+                          cancel: Optional[CancelToken] = None) -> Optional[TranscriptionResult]:
+        """
+        Transcribe un trozo de audio con Whisper (None si no hay modelo o audio).
+        Los trozos de grabaciones largas ya estan acotados por el pool de
+        transcripcion, asi que no pasan por el control de admision.
+        """
+        if not self.transcriber or len(audio_data) == 0:
+            return None
+        return self.transcriber.transcribe(audio_data, session=self._language_session, cancel=cancel)
 
-    def _process_text(self, text: str, use_llm: bool = False) -> str:
+    def _process_text_events(self, text: str, use_llm: bool = False,
+                             cancel: Optional[CancelToken] = None) -> Iterator[Dict]:
+        """
+        Limpia el texto y, con LLM, emite un evento {'type': 'llm'} por cada
+        fragmento de la respuesta segun llega. Devuelve (valor de retorno del
+        generador) una tupla (texto, pendiente): si el LLM no termina antes de
+        `llm_deadline` segundos se devuelve el texto limpio y `pendiente` es el
+        futuro con el texto mejorado, que sigue generandose en segundo plano.
+        """
+        cleaned = text
         try:
             cleaned = self.text_processor.cleanup_text(text) if self.text_processor else text
-            if use_llm and getattr(config, 'llm_enabled', False) and self.text_processor and self.text_processor.is_available():
-                print("Mejorando texto con IA.")
-                improved = self.text_processor.improve_text(cleaned, 'cleanup')
-                if improved:
-                    cleaned = improved
-            return cleaned
+            if not (use_llm and getattr(config, 'llm_enabled', False)
+                    and self.text_processor and self.text_processor.is_available()):
+                return cleaned, None
+            print("Mejorando texto con IA.")
+            slot = self._acquire_llm(cancel=cancel)
+            stream = self.text_processor.improve_text_stream(cleaned, 'cleanup', cancel=cancel)
+            deltas: queue.Queue = queue.Queue()
+
+            def consume() -> Optional[str]:
+                try:
+                    for delta in stream:
+                        deltas.put(delta)
+                    return stream.text
+                finally:
+                    deltas.put(None)
+                    slot.release()
+
+            future = self._postprocess_executor.submit(consume)
+            deadline = time.monotonic() + self.llm_deadline if self.llm_deadline > 0 else None
+            while True:
+                try:
+                    delta = deltas.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    print(f"El LLM no respondio en {self.llm_deadline:g}s: se entrega el texto limpio")
+                    return cleaned, future
+                if delta is None:
+                    break
+                yield {'type': 'llm', 'text': delta}
+            improved = future.result()
+            return (improved or cleaned), None
+        except AdmissionRejected as e:
+            # LLM saturado: se entrega el texto limpio sin mejorar
+            print(f"LLM saturado, se omite la mejora: {e}")
+            return cleaned, None
+        except JobCancelled:
+            raise
+        except Exception as e:
+            print(f"Error en _process_text_events: {e}")
+            return cleaned, None
+
+    def _attach_llm_result(self, dictation_id: str, future: Future) -> None:
+        """Sustituye el texto de un dictado por el del LLM cuando llega tarde."""
+        try:
+            improved = future.result()
         except Exception as e:
-            print(f"Error en _process_text: {e}")
-            return text
+            print(f"El LLM fallo tras el plazo para {dictation_id}: {e}")
+            improved = None
+        dictation = self.transcription_manager.get_transcription(dictation_id) if self.transcription_manager else None
+        if dictation is None:
+            return
+        metadata = dictation.setdefault('metadata', {})
+        if not improved:
+            metadata['llm_status'] = 'failed'
+            self._queue_speculative(dictation_id, dictation['text'])
+            return
+        dictation['text'] = improved
+        metadata['llm_status'] = 'done'
+        text_file = metadata.get('text_file')
+        if text_file and self.text_processor:
+            self.text_processor.save_text(improved, text_file, 'txt')
+        print(f"Texto mejorado por el LLM anadido al dictado {dictation_id}")
+        self._queue_speculative(dictation_id, improved)
+
+    def _acquire_llm(self, cancel: Optional[CancelToken] = None, count: int = 1) -> Slot:
+        """Hueco de LLM para una peticion del usuario: aparta antes lo especulativo."""
+        if self.speculative:
+            self.speculative.preempt()
+        return self.admission.acquire('llm', cancel=cancel, count=count)
+
+    def _llm_idle(self) -> bool:
+        """Sin grabacion en curso ni llamadas al LLM activas o en cola."""
+        llm = self.admission.resources['llm'].get_stats()
+        return not self.is_recording and llm['active'] == 0 and llm['waiting'] == 0
+
+    def _queue_speculative(self, dictation_id: str, text: str) -> None:
+        """Encola el post-procesado especulativo de un dictado, si esta activo."""
+        if not (self.speculative and text and self.text_processor and self.text_processor.is_available()):
+            return
+        # Coste estimado: el texto se envia una vez y cada salida mide algo parecido
+        cost = estimate_tokens(text) * (1 + len(self.speculative_fields))
+        self.speculative.submit(dictation_id, text, cost)
+
+    def _speculate(self, dictation_id: str, text: str, cancel: CancelToken) -> None:
+        """Calcula las salidas de SPECULATIVE_FIELDS y las guarda en el dictado."""
+        processor = self.text_processor
+        dictation = self.transcription_manager.get_transcription(dictation_id) if self.transcription_manager else None
+        if processor is None or dictation is None or dictation['text'] != text:
+            return  # Borrado o con otro texto desde que se encolo
+        fields = self.speculative_fields
+        # Sin esperar en la cola: si no hay hueco libre, el trabajo se reintenta luego
+        slot = self.admission.try_acquire('llm')
+        if slot is None:
+            raise SpeculativeDeferred("sin hueco libre en el LLM")
+        with slot:
+            if self.llm_combined and len(fields) > 1:
+                outputs = processor.process_combined(text, fields, cancel=cancel)
+            else:
+                outputs = {field: processor.process_field(field, text, cancel=cancel) for field in fields}
+        cancel.raise_if_cancelled()  # Desplazado por el usuario: no guardar salidas a medias
+        if dictation['text'] != text:
+            return
+        stored = dictation.setdefault('metadata', {}).setdefault('postprocess', {})
+        stored.update({field: value for field, value in outputs.items() if value})
+        print(f"Post-procesado especulativo guardado en el dictado {dictation_id}: {', '.join(sorted(stored))}")
+
+    def _precomputed(self, text: str, dictation_id: Optional[str] = None) -> Dict[str, str]:
+        """Salidas ya calculadas del dictado con este texto (o con ese id)."""
+        if not self.transcription_manager:
+            return {}
+        if dictation_id:
+            candidates = [self.transcription_manager.get_transcription(dictation_id)]
+        else:
+            candidates = self.transcription_manager.get_recent_transcriptions(10)
+        for dictation in candidates:
+            if dictation and (dictation.get('text') or '').strip() == text:
+                return dict(dictation.get('metadata', {}).get('postprocess') or {})
+        return {}
+
+    def _run_postprocess(self, operations: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Lanza las operaciones de post-procesado a la vez, cada una con su
+        tiempo maximo, y devuelve (resultados, errores). La latencia total es
+        la de la operacion mas lenta; si una falla o se agota su tiempo se
+        cancela y se devuelven las demas.
+
+        Los huecos de LLM (tantos como operaciones, sin pasar de
+        LLM_MAX_CONCURRENT) se toman de una vez; si hay mas operaciones que
+        huecos, las que sobran esperan en fila a que acabe otra.
+
+        Raises:
+            AdmissionRejected: si no hay hueco en el LLM
+        """
+        names = list(operations)
+        width = min(len(names), self.admission.resources['llm'].max_concurrent)
+        slot = self._acquire_llm(count=width)
+
+        tokens = {name: CancelToken() for name in names}
+        futures: Dict[str, Future] = {name: Future() for name in names}
+        todo = queue.Queue()
+        for name in names:
+            todo.put(name)
+        lanes_left = [width]
+        lanes_lock = threading.Lock()
+
+        def lane():
+            try:
+                while True:
+                    try:
+                        name = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    future = futures[name]
+                    if not future.set_running_or_notify_cancel():
+                        continue  # Agotada antes de empezar
+                    try:
+                        future.set_result(operations[name](tokens[name]))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with lanes_lock:
+                    lanes_left[0] -= 1
+                    last = lanes_left[0] == 0
+                if last:
+                    slot.release()
+
+        for _ in range(width):
+            self._postprocess_executor.submit(lane)
+        deadline = time.monotonic() + self.postprocess_timeout
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                if results[name] is None:
+                    errors[name] = 'sin respuesta del LLM'
+            except FutureTimeout:
+                tokens[name].cancel('tiempo agotado')
+                futures[name].cancel()
+                results[name] = None
+                errors[name] = 'tiempo agotado'
+            except Exception as e:
+                results[name] = None
+                errors[name] = str(e)
+            if name in errors:
+                print(f"Error en post-procesado ({name}): {errors[name]}")
+        return results, errors
 
-    def _save_dictation(self, text: str, audio_data: np.ndarray) -> str:
+    def _save_dictation(self, text: str, duration: Optional[float]) -> str:
         try:
             ts = datetime.now()
             filename_base = f"dictado_{ts.strftime('%Y%m%d_%H%M%S')}"
@@ -355,11 +927,11 @@ class WebDictationServer:
                 with open(text_filename, 'w', encoding='utf-8') as f:
                     f.write(text)
 
-            duration = float(len(audio_data)) / float(config.sample_rate) if audio_data is not None else None
             dictation_id = self.transcription_manager.add_transcription(
                 text=text,
                 audio_file=None,
                 metadata={
+                    'text_file': text_filename,
                     'duration': duration,
                     'model': getattr(config, 'whisper_model', ''),
                     'language': getattr(config, 'whisper_language', ''),
@@ -406,6 +978,7 @@ class WebDictationServer:
                 filepath.unlink()
                 print(f"Archivo eliminado: {filename}")
             self.transcription_manager.transcriptions = [t for t in self.transcription_manager.transcriptions if t['id'] != dictation_id]
+            self._forget_dictation(d)
             return True
         except Exception as e:
             print(f"Error al eliminar dictado {dictation_id}: {e}")
@@ -423,13 +996,64 @@ class WebDictationServer:
                         filepath.unlink()
                         print(f"Archivo eliminado: {filename}")
                     self.transcription_manager.transcriptions = [t for t in self.transcription_manager.transcriptions if t['id'] != trans['id']]
+                    self._forget_dictation(trans)
                 except Exception as e:
                     print(f"Error al eliminar dictado {trans['id']}: {e}")
 
+    def _forget_dictation(self, dictation: Dict) -> None:
+        """Descarta lo pendiente y lo cacheado de un dictado borrado."""
+        if self.speculative:
+            self.speculative.discard(dictation['id'])
+        if self.transcriber and self.transcriber.cache:
+            self.transcriber.cache.discard(dictation.get('transcription_cache_keys', []))
+
+    def http_threads(self) -> int:
+        """
+        Hilos HTTP: los del perfil mas uno por cada peticion que puede estar
+        ocupando o esperando un hueco de admision (streams incluidos), para
+        que esas peticiones no dejen sin hilo a /api/status y demas.
+        """
+        pinned = sum(limiter.max_concurrent + limiter.max_queue
+                     for limiter in self.admission.resources.values())
+        return self.performance_budget['web_threads'] + pinned
+
     def run(self, host='127.0.0.1', port=5000, debug=False):
         print(f"Iniciando servidor web en http://{host}:{port}")
         print("Abre tu navegador y ve a la URL mostrada arriba")
-        self.app.run(host=host, port=port, debug=debug, threaded=True)
+        if debug:
+            self.app.run(host=host, port=port, debug=debug, threaded=True)
+            return
+        server = PooledWSGIServer(host, port, self.app, threads=self.http_threads())
+        try:
+            server.serve_forever()
+        finally:
+            if self.speculative:
+                self.speculative.stop()
+            server.server_close()
+
+
+def _rejected_response(error: AdmissionRejected):
+    """Respuesta 429 con Retry-After para un recurso saturado."""
+    response = jsonify({'error': str(error), 'resource': error.resource, 'retry_after': error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def _sse_event(event: str, data: Dict) -> str:
+    """Mensaje Server-Sent Events con datos JSON."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _segment_event(segment, start_sample: int) -> Dict:
+    """Evento NDJSON de un segmento, con tiempos relativos al inicio de la grabacion."""
+    offset = start_sample / float(config.sample_rate)
+    return {
+        'type': 'segment',
+        'text': segment.text.strip(),
+        'start': round(offset + segment.start, 2),
+        'end': round(offset + segment.end, 2),
+    }
 
 
 def main():
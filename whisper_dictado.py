@@ -9,7 +9,8 @@ import sys
 import os
 import time
 import signal
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from pathlib import Path
 from typing import Optional
 
@@ -18,42 +19,48 @@ sys.path.append(str(Path(__file__).parent))
 sys.path.append(str(Path(__file__).parent / "config"))
 sys.path.append(str(Path(__file__).parent / "utils"))
 
-# Importar módulos locales
+# Importar módulos locales (los que dependen de numpy, sounddevice,
+# faster-whisper u openai se importan al inicializar los componentes, para
+# que --help y la configuración no paguen su carga)
 from config.config import config
-from utils.audio_handler import AudioHandler, AudioRecorder
-from utils.simple_vad import create_vad_detector
+from utils.jobs import CancelToken, JobCancelled
 from utils.text_processor import TextProcessor, TranscriptionManager
+from utils.whisper_loader import WHISPER_AVAILABLE, load_whisper_model
 
-# Importar Whisper
-try:
-    from faster_whisper import WhisperModel
-    WHISPER_AVAILABLE = True
-except ImportError:
-    print("❌ Error: faster-whisper no está instalado")
-    print("💡 Instala con: pip install faster-whisper")
-    WHISPER_AVAILABLE = False
-    sys.exit(1)
+# Espera máxima al detener para transcribir los segmentos pendientes
+SEGMENT_DRAIN_TIMEOUT = 60.0
 
 
 class WhisperDictation:
     """Clase principal para dictado inteligente"""
     
-    def __init__(self):
-        """Inicializa el sistema de dictado"""
+    def __init__(self, audio_only: bool = False):
+        """
+        Inicializa el sistema de dictado
+        
+        Args:
+            audio_only: Inicializar solo el audio (para --test-audio)
+        """
         self.whisper_model = None
+        self.transcriber = None
         self.audio_handler = None
         self.vad_detector = None
         self.text_processor = None
         self.transcription_manager = None
         self.is_running = False
-        self.audio_buffer = []  # Buffer de audio como atributo de clase
+        self.audio_buffer = None  # Buffer de captura (AudioSegmentBuffer)
+        self.transcription_rtf = None  # Segundos de CPU por segundo de audio transcrito
+        self.cancel_token = CancelToken()  # Corta la transcripción y el LLM en curso si se descarta lo pendiente
+        # Los segmentos se transcriben fuera del callback de audio, de uno en
+        # uno y en orden, para no bloquear la captura
+        self._segment_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
         
         # Configurar manejo de señales
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
         print("🎙️  Inicializando sistema de dictado inteligente...")
-        self._initialize_components()
+        self._initialize_components(audio_only)
     
     def _signal_handler(self, signum, frame):
         """Maneja señales de interrupción"""
@@ -61,39 +68,58 @@ class WhisperDictation:
         self.stop()
         sys.exit(0)
     
-    def _initialize_components(self):
+    def _initialize_components(self, audio_only: bool = False):
         """Inicializa todos los componentes del sistema"""
         try:
+            from utils.audio_handler import AudioHandler
+            from utils.llm_cache import LLMResponseCache
+            from utils.llm_client import prewarm_llm_client
+            from utils.simple_vad import create_vad_detector
+            from utils.transcriber import Transcriber
+            from utils.transcription_cache import TranscriptionCache
+            
+            if audio_only:
+                print("🎤 Configurando audio...")
+                self.audio_handler = AudioHandler(**config.get_audio_config())
+                return
+            
             # Inicializar Whisper
             print("🧠 Cargando modelo Whisper...")
             
-            # Determinar dispositivo y tipo de computación
-            if config.whisper_use_gpu:
-                try:
-                    # Intentar usar GPU
-                    self.whisper_model = WhisperModel(
-                        config.whisper_model,
-                        device="cuda",
-                        compute_type="float16"
-                    )
-                    print(f"✅ Modelo Whisper cargado en GPU: {config.whisper_model}")
-                except Exception as e:
-                    print(f"⚠️  Error al cargar en GPU: {e}")
-                    print("🔄 Cambiando a CPU...")
-                    self.whisper_model = WhisperModel(
-                        config.whisper_model,
-                        device="cpu",
-                        compute_type="int8"
-                    )
-                    print(f"✅ Modelo Whisper cargado en CPU: {config.whisper_model}")
+            # Determinar dispositivo y reparto de hilos según el perfil
+            budget = config.get_performance_budget()
+            self.whisper_model, whisper_settings = load_whisper_model(
+                config.whisper_model,
+                use_gpu=config.whisper_use_gpu,
+                budget=budget,
+                autotune=config.whisper_autotune,
+                tuning_cache=config.whisper_tuning_cache,
+                model_dir=config.whisper_model_dir,
+                offline=config.whisper_offline
+            )
+            if whisper_settings["device"] == "cuda":
+                print(f"✅ Modelo Whisper cargado en GPU: {config.whisper_model}")
             else:
-                # Usar CPU directamente
-                self.whisper_model = WhisperModel(
-                    config.whisper_model,
-                    device="cpu",
-                    compute_type="int8"
-                )
-                print(f"✅ Modelo Whisper cargado en CPU: {config.whisper_model}")
+                print(f"✅ Modelo Whisper cargado en CPU: {config.whisper_model} "
+                      f"({whisper_settings['compute_type']}, {whisper_settings['cpu_threads']} hilos, "
+                      f"perfil {budget['profile']})")
+            
+            cache_config = config.get_transcription_cache_config()
+            cache = None
+            if cache_config.pop("enabled"):
+                cache = TranscriptionCache(**cache_config)
+            self.transcriber = Transcriber(
+                self.whisper_model,
+                model_name=config.whisper_model,
+                language=config.whisper_language,
+                sample_rate=config.sample_rate,
+                cache=cache,
+                model_settings=whisper_settings,
+                language_confidence=config.language_detection_confidence,
+                language_recheck_logprob=config.language_recheck_logprob,
+                no_speech_threshold=config.segment_no_speech_threshold,
+                logprob_threshold=config.segment_logprob_threshold
+            )
             
             # Inicializar manejador de audio
             print("🎤 Configurando audio...")
@@ -106,17 +132,35 @@ class WhisperDictation:
             self.vad_detector = create_vad_detector(
                 sample_rate=config.sample_rate,
                 sensitivity=vad_config["sensitivity"],
-                use_webrtc=True  # Intentar usar webrtcvad primero
+                use_webrtc=True,  # Intentar usar webrtcvad primero
+                cascade=vad_config["cascade"],
+                adaptive=vad_config["adaptive"],
+                noise_margin=vad_config["noise_margin"],
+                min_speech_ratio=vad_config["min_speech_ratio"],
+                max_utterance_duration=vad_config["max_utterance_duration"],
+                cut_search_window=vad_config["cut_search_window"]
             )
             
             # Inicializar procesador de texto
             print("📝 Configurando procesamiento de texto...")
+            llm_cache_config = config.get_llm_cache_config()
+            llm_cache = LLMResponseCache(**llm_cache_config) if llm_cache_config.pop("enabled") else None
             self.text_processor = TextProcessor(
                 api_key=config.openai_api_key,
                 model=config.openai_model,
                 provider=config.llm_provider,
-                base_url=config.llm_base_url
+                base_url=config.llm_base_url,
+                cache=llm_cache,
+                client_settings=config.get_llm_client_config(),
+                summary_chunk_tokens=config.llm_summary_chunk_tokens,
+                summary_workers=config.llm_summary_workers,
+                endpoints=config.get_llm_endpoints(),
+                hedge=config.llm_hedge
             )
+            if config.llm_enabled and config.llm_prewarm and self.text_processor.is_available():
+                # Abrir ya la conexión con el proveedor (TLS) en segundo plano
+                for client in self.text_processor.llm_clients():
+                    prewarm_llm_client(client)
             
             # Inicializar manejador de transcripciones
             self.transcription_manager = TranscriptionManager(config.output_dir)
@@ -138,8 +182,19 @@ class WhisperDictation:
         print("💡 Presiona Ctrl+C para detener")
         print("=" * 50)
         
+        from utils.audio_buffer import AudioSegmentBuffer
+        
         self.is_running = True
-        self.audio_buffer = []  # Reiniciar buffer
+        # Instantánea de configuración: el callback solo lee atributos
+        settings = config.snapshot
+        # Reiniciar buffer: solo retiene el pre-roll y la frase en curso
+        self.audio_buffer = AudioSegmentBuffer(
+            sample_rate=settings.sample_rate,
+            pre_roll=settings.vad_pre_roll
+        )
+        hangover_samples = int(settings.vad_hangover * settings.sample_rate)
+        if hasattr(self.vad_detector, "reset"):
+            self.vad_detector.reset()  # Posiciones del VAD alineadas con el buffer
         
         def audio_callback(indata, frames, time, status):
             """Callback para procesar audio en tiempo real"""
@@ -149,36 +204,44 @@ class WhisperDictation:
             # Manejar errores de audio
             if status:
                 if "overflow" in str(status):
-                    print(f"\n⚠️  Overflow de audio - reduciendo buffer")
-                    # Limpiar buffer parcialmente para evitar overflow
-                    if len(self.audio_buffer) > config.sample_rate * 10:  # Más de 10 segundos
-                        self.audio_buffer = self.audio_buffer[-config.sample_rate * 5:]  # Mantener solo últimos 5 segundos
+                    print(f"\n⚠️  Overflow de audio")
                 else:
                     print(f"\n⚠️  Error de audio: {status}")
             
-            # Agregar al buffer (limitar tamaño)
+            # Agregar al buffer
             new_data = indata.flatten()
-            self.audio_buffer.extend(new_data)
-            
-            # Limitar tamaño del buffer para evitar problemas de memoria
-            max_buffer_size = config.sample_rate * 30  # Máximo 30 segundos
-            if len(self.audio_buffer) > max_buffer_size:
-                self.audio_buffer = self.audio_buffer[-max_buffer_size:]
+            self.audio_buffer.append(new_data)
             
             # Procesar con VAD
             vad_result = self.vad_detector.process_frame(new_data)
             
             # Mostrar estado en tiempo real
-            if config.realtime_display:
+            if settings.realtime_display:
                 status_icon = "🎤" if vad_result['is_speaking'] else "🔇"
-                buffer_sec = len(self.audio_buffer) / config.sample_rate
+                buffer_sec = len(self.audio_buffer) / settings.sample_rate
                 print(f"\r{status_icon} {'Hablando...' if vad_result['is_speaking'] else 'Escuchando...'} ({buffer_sec:.1f}s)", end="", flush=True)
             
-            # Si terminó de hablar, procesar audio
+            # Si terminó de hablar, procesar [inicio - pre-roll, fin + hang-over].
+            # Los cortes forzados de frases largas no llevan pre-roll ni
+            # hang-over para que los trozos consecutivos no se solapen
             if vad_result.get('speech_ended'):
-                if len(self.audio_buffer) > config.sample_rate * 0.5:  # Al menos 0.5 segundos
-                    self._process_audio_segment(self.audio_buffer.copy())
-                    self.audio_buffer.clear()
+                segment_start = vad_result['speech_start_sample']
+                if not vad_result.get('continued'):
+                    segment_start -= self.audio_buffer.pre_roll_samples
+                segment_end = vad_result['speech_end_sample']
+                if not vad_result.get('forced_cut'):
+                    segment_end += hangover_samples
+                segment = self.audio_buffer.segment(segment_start, segment_end)
+                # Al menos 0.5 segundos, salvo la cola de una frase cortada
+                if len(segment) > settings.sample_rate * 0.5 or vad_result.get('continued'):
+                    # Copia: la vista del buffer circular se sobrescribe al seguir grabando
+                    self._segment_executor.submit(self._process_audio_segment, segment.copy())
+                self.audio_buffer.release(segment_end)
+            
+            # En reposo (o tras un segmento descartado por ruido) solo se
+            # conserva el pre-roll
+            if not vad_result['is_speaking']:
+                self.audio_buffer.retain_pre_roll()
         
         # Iniciar grabación
         self.audio_handler.start_recording(audio_callback)
@@ -199,58 +262,36 @@ class WhisperDictation:
         print(f"\n🔄 Procesando audio ({len(audio_data)/config.sample_rate:.1f}s)...")
         
         try:
+            import numpy as np
+            
             # Convertir lista a array de numpy si es necesario
             if isinstance(audio_data, list):
                 audio_data = np.array(audio_data)
             
-            # Limpiar audio
-            audio_data = self.audio_handler.trim_silence(audio_data)
-            
-            if len(audio_data) == 0:
-                print("⚠️  Audio vacío después de limpiar silencios")
-                return
-            
             # Transcribir con Whisper
             print("🧠 Transcribiendo...")
+            transcribe_start = time.process_time()
+            
+            # Mostrar cada segmento en cuanto Whisper lo decodifica
+            stream = self.transcriber.transcribe_stream(audio_data, cancel=self.cancel_token)
+            for segment in stream:
+                if config.realtime_display:
+                    print(f"   💬 {segment.text.strip()}", flush=True)
+            result = stream.result
+            text = result.text
+            if result.cached:
+                print("⚡ Transcripción recuperada de la cache")
+            
+            # Coste de transcripción por segundo de audio (media móvil)
+            if not result.cached:
+                rtf = (time.process_time() - transcribe_start) / (len(audio_data) / config.sample_rate)
+                if self.transcription_rtf is None:
+                    self.transcription_rtf = rtf
+                else:
+                    self.transcription_rtf = 0.8 * self.transcription_rtf + 0.2 * rtf
             
-            # Convertir audio a formato compatible con Whisper
-            import tempfile
-            import wave
-            
-            # Crear archivo temporal
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                temp_filename = temp_file.name
-                
-                # Guardar audio en formato WAV
-                audio_int16 = (audio_data * 32767).astype(np.int16)
-                with wave.open(temp_filename, 'wb') as wav_file:
-                    wav_file.setnchannels(1)
-                    wav_file.setsampwidth(2)  # 16 bits
-                    wav_file.setframerate(config.sample_rate)
-                    wav_file.writeframes(audio_int16.tobytes())
-            
-            try:
-                # Transcribir desde archivo
-                segments, info = self.whisper_model.transcribe(
-                    temp_filename,
-                    language=config.whisper_language if config.whisper_language != "auto" else None,
-                    beam_size=5,
-                    best_of=5
-                )
-            finally:
-                # Limpiar archivo temporal
-                import os
-                try:
-                    os.unlink(temp_filename)
-                except:
-                    pass
-            
-            # Combinar segmentos
-            text = ""
-            for segment in segments:
-                text += segment.text + " "
-            
-            text = text.strip()
+            if result.dropped_segments:
+                print(f"🔇 {result.dropped_segments} segmento(s) descartados por baja confianza")
             
             if not text:
                 print("⚠️  No se detectó texto en el audio")
@@ -258,24 +299,38 @@ class WhisperDictation:
             
             print(f"📝 Transcripción: {text}")
             
-            # Procesar texto
-            processed_text = self._process_text(text)
+            # Procesar texto (sin LLM si la transcripción es dudosa)
+            processed_text = self._process_text(text, use_llm=not result.low_confidence)
             
             # Guardar transcripción
             self._save_transcription(processed_text, audio_data)
             
+        except JobCancelled:
+            print("\n⏹️  Transcripción cancelada")
         except Exception as e:
             print(f"❌ Error al procesar audio: {e}")
     
-    def _process_text(self, text: str) -> str:
+    def _process_text(self, text: str, use_llm: bool = True) -> str:
         """Procesa el texto transcrito"""
         # Limpieza básica
         cleaned_text = self.text_processor.cleanup_text(text)
         
+        if config.llm_enabled and not use_llm:
+            print("⏭️  Transcripción de baja confianza: se omite el LLM")
+        
         # Post-procesado con LLM si está habilitado
-        if config.llm_enabled and self.text_processor.is_available():
+        if use_llm and config.llm_enabled and self.text_processor.is_available():
             print("🤖 Mejorando texto con LLM...")
-            improved_text = self.text_processor.improve_text(cleaned_text, "cleanup")
+            if config.realtime_display:
+                # Mostrar la respuesta según llega
+                stream = self.text_processor.improve_text_stream(cleaned_text, "cleanup", cancel=self.cancel_token)
+                print("   ✨ ", end="", flush=True)
+                for delta in stream:
+                    print(delta, end="", flush=True)
+                print()
+                improved_text = stream.text
+            else:
+                improved_text = self.text_processor.improve_text(cleaned_text, "cleanup", cancel=self.cancel_token)
             if improved_text:
                 cleaned_text = improved_text
         
@@ -325,9 +380,51 @@ class WhisperDictation:
         if self.audio_handler:
             self.audio_handler.stop_recording()
             self.audio_handler.cleanup()
+        self._drain_segments()
+        
+        # Estadísticas del VAD en cascada
+        vad_stats = self.vad_detector.get_stats() if hasattr(self.vad_detector, "get_stats") else {}
+        if vad_stats.get("frames_total"):
+            print(f"📊 VAD: {vad_stats['frames_total']} frames, "
+                  f"{vad_stats['energy_rejected']} descartados por energía, "
+                  f"{vad_stats['webrtc_rejected']} descartados por webrtcvad")
+        if vad_stats.get("suppressed_segments"):
+            saved = ""
+            if self.transcription_rtf is not None:
+                saved = f", ~{vad_stats['suppressed_audio_seconds'] * self.transcription_rtf:.1f}s de CPU ahorrados"
+            print(f"📊 VAD: {vad_stats['suppressed_segments']} segmentos de ruido descartados "
+                  f"({vad_stats['suppressed_audio_seconds']:.1f}s de audio{saved})")
+
+        if self.transcriber and self.transcriber.dropped_segments:
+            print(f"📊 Whisper: {self.transcriber.dropped_segments} segmentos descartados por baja confianza")
         
+        # Detección de idioma reutilizada en modo auto
+        if self.transcriber and self.transcriber.language is None and self.transcriber.session.detections:
+            session = self.transcriber.session.get_stats()
+            print(f"📊 Idioma: {session['language']} ({session['detections']} detecciones, "
+                  f"{session['reused']} segmentos sin detección)")
+
         print("🛑 Sistema detenido")
     
+    def _drain_segments(self):
+        """
+        Termina de transcribir los segmentos ya capturados (lo último que se
+        dijo antes de detener). Un segundo Ctrl+C o SEGMENT_DRAIN_TIMEOUT
+        los descartan y cortan el que esté en curso.
+        """
+        # Un solo hilo: la tarea vacía termina después de todo lo encolado
+        drained = self._segment_executor.submit(lambda: None)
+        try:
+            if not drained.done():
+                print("\n⏳ Terminando de transcribir lo pendiente (Ctrl+C otra vez para descartarlo)...")
+            drained.result(timeout=SEGMENT_DRAIN_TIMEOUT)
+        except (KeyboardInterrupt, FutureTimeout):
+            print("\n⚠️  Transcripciones pendientes descartadas")
+            self.cancel_token.cancel("sistema detenido")
+            self._segment_executor.shutdown(wait=False, cancel_futures=True)
+            return
+        self._segment_executor.shutdown(wait=True)
+    
     def test_audio(self):
         """Prueba la configuración de audio"""
         print("🎤 Probando configuración de audio...")
@@ -363,8 +460,13 @@ def main():
     print("🔧 Configuración:")
     config.print_config()
     
+    if not args.test_audio and not WHISPER_AVAILABLE:
+        print("❌ Error: faster-whisper no está instalado")
+        print("💡 Instala con: pip install faster-whisper")
+        sys.exit(1)
+    
     # Crear instancia del sistema
-    dictation = WhisperDictation()
+    dictation = WhisperDictation(audio_only=args.test_audio)
     
     # Probar audio si se solicita
     if args.test_audio: